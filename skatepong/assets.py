@@ -0,0 +1,241 @@
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import glob
+import hashlib
+import math
+import os
+import re
+import struct
+import tempfile
+import pygame
+import skatepong.log as skt_log
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+logger = skt_log.get_logger("assets")
+
+def to_display_format(surf, alpha = False):
+    """
+    Converts a surface to the display pixel format (faster blits).
+    Note : without display mode (texture renderer, frames drawn on a
+    32 bits canvas), opaque surfaces are converted to 32 bits and alpha
+    surfaces kept as they are.
+    """
+    if pygame.display.get_surface() is None:
+        return surf if alpha else surf.convert(32)
+    return surf.convert_alpha() if alpha else surf.convert()
+
+class Asset_manager():
+    """
+    Provides images and texts ready to blit for one window resolution.
+
+    - Loaded lazily, on first use.
+    - Images : variant closest to the window resolution, scaled once.
+    - Converted once in display format and kept in memory.
+    - Cached on disk (raw pixels, per resolution) so that next launches
+      skip PNG decoding, scaling and text rendering.
+    """
+    IMG_DIR = os.path.join(os.path.dirname(os.path.dirname( \
+              os.path.abspath(__file__))), "splash_screen")
+    CACHE_HEADER = struct.Struct("<IId") # width, height, source mtime
+
+    def __init__(self, win_w, win_h, cache_dir = None, img_dir = None):
+        self.win_w = win_w
+        self.win_h = win_h
+        self.img_dir = img_dir or self.IMG_DIR
+        self.cache_dir = None
+        if cache_dir is not None:
+            self.cache_dir = os.path.join(cache_dir, \
+                             str(win_w) + "x" + str(win_h))
+        self.surfaces = {} # Key -> surface in display format
+        self.fonts = {} # (font name, size) -> pygame font
+
+    #-------------------------------------------------------------------
+    # IMAGES
+    #-------------------------------------------------------------------
+
+    def pick_variant(self, name):
+        """
+        Returns the path of image '<name>_<w>x<h>.png' closest to window.
+        """
+        best_path = None
+        best_dist = None
+        pattern = re.compile(re.escape(name) + r"_(\d+)x(\d+)\.png$")
+        for path in glob.glob(os.path.join(self.img_dir, name + "_*.png")):
+            match = pattern.search(os.path.basename(path))
+            if match is None:
+                continue
+            w, h = int(match.group(1)), int(match.group(2))
+            dist = abs(math.log(w / self.win_w)) \
+                   + abs(math.log(h / self.win_h))
+            if best_dist is None or dist < best_dist:
+                best_path = path
+                best_dist = dist
+        if best_path is None:
+            raise FileNotFoundError("No image variant for " + name)
+        return best_path
+
+    def image(self, name, bg_color = (0, 0, 0)):
+        """
+        Returns image 'name' fitted to the window (aspect ratio kept).
+        """
+        key = "img_" + name
+        surf = self.surfaces.get(key)
+        if surf is None:
+            path = self.pick_variant(name)
+            mtime = os.path.getmtime(path)
+            surf = self.load_cached(key, mtime, alpha = False)
+            if surf is None:
+                src = pygame.image.load(path)
+                scale = min(self.win_w / src.get_width(), \
+                            self.win_h / src.get_height())
+                size = (int(src.get_width() * scale), \
+                        int(src.get_height() * scale))
+                surf = pygame.Surface((self.win_w, self.win_h))
+                surf.fill(bg_color)
+                scaled = pygame.transform.smoothscale( \
+                         to_display_format(src, alpha = True), size)
+                surf.blit(scaled, ((self.win_w - size[0]) // 2, \
+                                   (self.win_h - size[1]) // 2))
+                self.save_cached(key, mtime, surf, alpha = False)
+            surf = to_display_format(surf)
+            self.surfaces[key] = surf
+        return surf
+
+    #-------------------------------------------------------------------
+    # TEXTS
+    #-------------------------------------------------------------------
+
+    def font(self, font_nm, font_sz):
+        """
+        Returns the font object (created once).
+        """
+        key = (font_nm, font_sz)
+        font = self.fonts.get(key)
+        if font is None:
+            font = pygame.font.SysFont(font_nm, font_sz)
+            self.fonts[key] = font
+        return font
+
+    def text(self, font_nm, font_sz, txt, color, bg_color = None):
+        """
+        Returns the pre-rendered text surface.
+        """
+        key = (font_nm, font_sz, txt, color, bg_color)
+        surf = self.surfaces.get(key)
+        if surf is None:
+            alpha = bg_color is None
+            disk_key = "txt_" + hashlib.sha1( \
+                       repr(key).encode("utf-8")).hexdigest()
+            surf = self.load_cached(disk_key, 0, alpha)
+            if surf is None:
+                surf = self.font(font_nm, font_sz).render(txt, True, \
+                       color, bg_color)
+                self.save_cached(disk_key, 0, surf, alpha)
+            surf = to_display_format(surf, alpha)
+            self.surfaces[key] = surf
+        return surf
+
+    def draw_text(self, win, font_nm, font_sz, txt, x, y, color, \
+                  bg_color = None):
+        """
+        Same as tools.draw_text, using pre-rendered text surfaces.
+        """
+        txt_surf = self.text(font_nm, font_sz, txt, color, bg_color)
+        txt_rect = txt_surf.get_rect()
+        txt_rect.center = (x, y)
+        win.blit(txt_surf, txt_rect)
+        return txt_rect
+
+    def get_max_w_txt(self, font_nm, font_sz, *txts):
+        """
+        Same as tools.get_max_w_txt, using cached font objects.
+        """
+        font = self.font(font_nm, font_sz)
+        max_w_txt = 0
+        for txt in txts:
+            txt_w = font.size(txt)[0]
+            if txt_w > max_w_txt:
+                max_w_txt = txt_w
+        return max_w_txt
+
+    #-------------------------------------------------------------------
+    # DISK CACHE
+    #-------------------------------------------------------------------
+
+    def cache_path(self, key):
+        return os.path.join(self.cache_dir, key + ".raw")
+
+    def load_cached(self, key, mtime, alpha):
+        """
+        Returns the surface cached on disk, None if missing or outdated.
+        """
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self.cache_path(key), "rb") as f:
+                data = f.read()
+            w, h, src_mtime = self.CACHE_HEADER.unpack_from(data)
+            if src_mtime != mtime:
+                return None
+            return pygame.image.frombytes( \
+                   data[self.CACHE_HEADER.size:], (w, h), \
+                   "RGBA" if alpha else "RGB")
+        except (OSError, ValueError, struct.error, pygame.error):
+            return None
+
+    def save_cached(self, key, mtime, surf, alpha):
+        """
+        Writes the surface raw pixels on disk (atomic rename).
+        """
+        if self.cache_dir is None:
+            return
+        tmp_path = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok = True)
+            fd, tmp_path = tempfile.mkstemp(dir = self.cache_dir, \
+                                            prefix = ".asset")
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.CACHE_HEADER.pack(surf.get_width(), \
+                        surf.get_height(), mtime))
+                f.write(pygame.image.tobytes(surf, \
+                        "RGBA" if alpha else "RGB"))
+            os.replace(tmp_path, self.cache_path(key))
+        except (OSError, pygame.error) as err:
+            logger.warning("Asset not cached on disk : %s", key, \
+                           extra = {"error" : repr(err)})
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+def main():
+    """
+    Function for test purposes only.
+    """
+    skt_log.setup_logging()
+    pygame.init()
+    win = pygame.display.set_mode([1280, 720])
+    assets = Asset_manager(1280, 720, os.path.join( \
+             tempfile.gettempdir(), "skatepong_assets"))
+    print("Variant :", assets.pick_variant("skatepong_splash_screen"))
+    win.blit(assets.image("skatepong_splash_screen"), (0, 0))
+    assets.draw_text(win, "comicsans", 72, "SKATEPONG", 640, 360, \
+                     (255, 255, 255))
+    pygame.display.update()
+    pygame.time.wait(2000)
+
+if __name__ == '__main__':
+    main()
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
@@ -0,0 +1,149 @@
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import argparse
+import random
+import time
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+def predict_y(x, y, vx, vy, target_x, r, win_h):
+    """
+    Returns the ball center y when its center reaches target_x, None if
+    the ball moves away from it.
+
+    Closed form : the trajectory is unfolded (no walls), then folded
+    back in the court (reflections on the walls at r and win_h - r,
+    period 2 * (win_h - 2 * r)). Same cost whatever the bounces.
+    """
+    if vx == 0 or (target_x - x) * vx < 0:
+        return None
+    span = win_h - 2 * r # Travel of the ball center between walls
+    if span <= 0:
+        return win_h / 2
+    unfolded = y - r + vy * (target_x - x) / vx
+    folded = unfolded % (2 * span)
+    if folded > span:
+        folded = 2 * span - folded
+    return r + folded
+
+def step_y(x, y, vx, vy, target_x, r, win_h):
+    """
+    Reference for predict_y : ball moved frame by frame, bouncing on
+    the walls (cost proportional to the distance).
+    """
+    if vx == 0 or (target_x - x) * vx < 0:
+        return None
+    nb_frames = (target_x - x) / vx
+    for i in range(int(nb_frames)):
+        y += vy
+        if y > win_h - r:
+            y = 2 * (win_h - r) - y
+            vy = -vy
+        elif y < r:
+            y = 2 * r - y
+            vy = -vy
+    y += vy * (nb_frames - int(nb_frames))
+    if y > win_h - r:
+        y = 2 * (win_h - r) - y
+    elif y < r:
+        y = 2 * r - y
+    return y
+
+class Ai_paddle():
+    """
+    Moves a paddle towards the point where the ball will reach it.
+
+    - Aim : offset from the paddle center chosen once per incoming
+      ball (bounce angles vary), sometimes beyond the paddle (missed
+      ball, goals happen).
+    - Ball moving away : paddle back to the center.
+    - Speed limited (max_speed px per frame).
+    """
+    def __init__(self, pad, left, win_h, max_speed, miss_ratio, rng):
+        self.pad = pad
+        self.left = left # True : left paddle
+        self.win_h = win_h
+        self.max_speed = max_speed
+        self.miss_ratio = miss_ratio
+        self.rng = rng
+        self.aim = 0 # Offset of the target from the paddle center (px)
+        self.incoming = False
+
+    def update(self, ball):
+        """
+        Moves the paddle for one frame.
+        """
+        pad = self.pad
+        if self.left:
+            target_x = pad.rect.right + ball.r
+        else:
+            target_x = pad.rect.left - ball.r
+        y = predict_y(ball.rect.centerx, ball.rect.centery, ball.vx, \
+                      ball.vy, target_x, ball.r, self.win_h)
+        if y is None:
+            self.incoming = False
+            target_y = self.win_h / 2
+        else:
+            if not self.incoming:
+                self.incoming = True
+                reach = pad.h / 2 + ball.r # Offset max to hit the ball
+                if self.rng.random() < self.miss_ratio:
+                    self.aim = self.rng.choice((-1, 1)) * reach * 1.5
+                else:
+                    self.aim = self.rng.uniform(-0.8, 0.8) * pad.h / 2
+            target_y = y + self.aim
+        dy = min(max(target_y - pad.rect.centery, -self.max_speed), \
+                 self.max_speed)
+        pad.rect.move_ip(0, int(dy))
+        if pad.rect.top < 0:
+            pad.rect.top = 0
+        elif pad.rect.bottom > self.win_h:
+            pad.rect.bottom = self.win_h
+
+def main():
+    """
+    Function for test purposes only : closed form prediction compared
+    with the frame by frame reference (accuracy / duration per call).
+    """
+    parser = argparse.ArgumentParser(description = "Skatepong attract " \
+             "mode : ball trajectory predictor check.")
+    parser.add_argument("--trials", type = int, default = 10000)
+    parser.add_argument("--seed", type = int, default = 1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    win_w, win_h, r = 1920, 1080, 21
+    cases = []
+    for i in range(args.trials):
+        vx = rng.choice((-1, 1)) * rng.randint(20, 80)
+        cases.append((rng.uniform(r, win_w - r), rng.uniform(r, win_h - r),\
+                      vx, rng.uniform(-3, 3) * abs(vx), \
+                      rng.choice((60, win_w - 60)), r, win_h))
+    results = []
+    for function in (predict_y, step_y):
+        start = time.perf_counter()
+        results.append([function(*case) for case in cases])
+        results.append(1e6 * (time.perf_counter() - start) / len(cases))
+    errors = [abs(a - b) for a, b in zip(results[0], results[2]) \
+              if a is not None]
+    print("Predictions %s / max error vs frame stepping %.6f px" \
+          % (len(errors), max(errors)))
+    print("Per call : closed form %.2f us / frame stepping %.2f us" \
+          % (results[1], results[3]))
+
+if __name__ == '__main__':
+    main()
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
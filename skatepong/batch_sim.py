@@ -0,0 +1,485 @@
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import argparse
+import itertools
+import json
+import math
+import time
+import skatepong.game as skt_game
+import skatepong.game_objects as skt_obj
+import skatepong.sound as skt_snd
+import skatepong.stats as skt_sts
+try:
+    import numpy as np
+except ImportError: # Optional : only needed by this simulator
+    np = None
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+# Game parameters which can be swept (PAD_VY_FACTOR : paddle speed)
+PARAMS = ("BALL_ANGLE_MAX", "BALL_V_RATIO", "PAD_HEIGHT_RATIO", \
+          "PAD_FLAT_BOUNCE_RATIO", "PAD_VY_FACTOR")
+CONTROLLERS = ("track", "sine", "still")
+
+def default_params():
+    """
+    Game parameters as set in the game (Raspberry Pi 4 paddle speed).
+    """
+    params = {name : getattr(skt_game.Game, name) for name in PARAMS \
+              if hasattr(skt_game.Game, name)}
+    params["PAD_VY_FACTOR"] = skt_game.Game.PAD_VY_FACTOR_RPI4
+    return params
+
+class Batch_sim():
+    """
+    Plays N independent matches at once, game state held in NumPy
+    arrays (one item per match), with the rules of the game :
+    Game.handle_collision() / detect_goal(), frame by frame.
+
+    Paddles are driven by controllers instead of skateboards :
+    - track : follows the ball coming towards it, with an aim error
+      drawn at each bounce (aim_noise, ratio of window height), and
+      goes back to the center otherwise.
+    - sine : scripted sweep of the whole height (random phase).
+    - still : paddles kept centered.
+    Paddle speed is limited by the board rotation : max_rate_ratio
+    (angular velocity / gyro sensitivity) * win_h * PAD_VY_FACTOR per
+    frame, as Paddle.compute_pad_velocity() at the reference FPS.
+
+    params : game parameters (PARAMS), scalars or arrays (1 per match).
+    """
+    SINE_FREQ = 0.3 # Scripted paddles sweep frequency (Hz)
+    # Match state arrays, filtered when matches end
+    STATE = ("match", "cx", "cy", "vx", "vy", "l_top", "r_top", \
+             "goal_to_be", "l_score", "r_score", "hits", "l_aim", \
+             "r_aim", "phase", "vx_straight", "pad_h", "flat_ratio", \
+             "flat", "angle_max", "vy_min", "vy_max", "bounce_span", \
+             "half_h", "max_top", "alive")
+
+    def __init__(self, params, nb_matches, win_w = 1920, win_h = 1080, \
+                 controller = "track", aim_noise = 0.08, \
+                 max_rate_ratio = 0.1, \
+                 winning_score = skt_game.Game.WINNING_SCORE, \
+                 fps = skt_game.Game.FPS, seed = None):
+        if np is None:
+            raise ImportError("numpy is required by the batch simulator")
+        if controller not in CONTROLLERS:
+            raise ValueError("Unknown controller : " + str(controller))
+        game = skt_game.Game
+        self.win_w = win_w
+        self.win_h = win_h
+        self.controller = controller
+        self.aim_noise = aim_noise * win_h # px
+        self.winning_score = winning_score
+        self.fps = fps
+        self.rng = np.random.default_rng(seed)
+        n = nb_matches
+        p = default_params()
+        p.update(params)
+        p = {name : np.broadcast_to(np.asarray(value, dtype = float), \
+             (n,)) for name, value in p.items()}
+        # Sizes as Game.comp_elem_sizes() / create_game_elements()
+        pad_w = int(win_w * game.PAD_WIDTH_RATIO)
+        self.ball_r = min(int(win_w * game.BALL_RADIUS_RATIO), \
+                          int(win_h * game.BALL_RADIUS_RATIO))
+        self.l_right = int(win_w * game.PAD_X_OFFSET_RATIO) + pad_w
+        self.r_left = win_w - int(game.PAD_X_OFFSET_RATIO * win_w) - pad_w
+        self.center_x = int(0.50 * win_w)
+        self.center_y = int(0.50 * win_h)
+        self.match = np.arange(n)
+        # Positions / speeds : integers (px) held as floats (faster)
+        self.vx_straight = np.trunc(win_w * p["BALL_V_RATIO"])
+        self.pad_h = np.trunc(win_h * p["PAD_HEIGHT_RATIO"])
+        self.flat_ratio = p["PAD_FLAT_BOUNCE_RATIO"].copy()
+        self.flat = self.flat_ratio * win_h
+        self.angle_max = p["BALL_ANGLE_MAX"].copy()
+        self.vy_max = max_rate_ratio * win_h * p["PAD_VY_FACTOR"]
+        self.vy_min = -self.vy_max
+        self.bounce_span = (self.pad_h + self.ball_r - self.flat) / 2
+        # Match start : ball centered, random direction, pads centered
+        self.cx = np.full(n, float(self.center_x))
+        self.cy = np.full(n, float(self.center_y))
+        self.vx = np.where(self.rng.integers(1, 3, n) == 1, 1, -1) \
+                  * self.vx_straight
+        self.vy = np.zeros(n)
+        self.half_h = self.pad_h // 2 # Paddle center, from its top
+        self.max_top = win_h - self.pad_h
+        self.l_top = (win_h - self.pad_h) // 2
+        self.r_top = self.l_top.copy()
+        self.goal_to_be = np.zeros(n, dtype = bool)
+        self.l_score = np.zeros(n, dtype = np.int64)
+        self.r_score = np.zeros(n, dtype = np.int64)
+        self.hits = np.zeros(n, dtype = np.int64) # Since last goal
+        self.l_aim = self.rng.normal(0, self.aim_noise, n)
+        self.r_aim = self.rng.normal(0, self.aim_noise, n)
+        self.phase = self.rng.uniform(0, 2 * math.pi, n)
+        self.alive = np.ones(n, dtype = bool)
+        self.nb_ended = 0 # Not yet removed from the state arrays
+        self.nb_frames = 0
+        # Results (per match)
+        self.frames = np.zeros(n, dtype = np.int64)
+        self.goals = np.zeros(n, dtype = np.int64)
+        self.total_hits = np.zeros(n, dtype = np.int64)
+        self.finished = np.zeros(n, dtype = bool)
+        self.rallies = [] # (matches, pad hits) of each point scored
+
+    def control_pads(self):
+        """
+        Moves the paddles (controllers), stopped by the walls.
+        """
+        h = self.win_h
+        if self.controller == "still":
+            return
+        if self.controller == "sine":
+            t = self.nb_frames / self.fps
+            l_target = h / 2 + (h / 2) * np.sin(2 * math.pi * \
+                       self.SINE_FREQ * t + self.phase)
+            r_target = h - l_target
+        else:
+            # Selection by product : faster than np.where() here
+            to_left = (self.vx < 0).astype(float)
+            l_target = h / 2 + to_left * (self.cy + self.l_aim - h / 2)
+            r_target = h / 2 + (1 - to_left) \
+                       * (self.cy + self.r_aim - h / 2)
+        # Truncated as int() (Paddle.compute_pad_velocity)
+        vy = np.trunc(np.minimum(np.maximum(l_target - self.l_top \
+             - self.half_h, self.vy_min), self.vy_max))
+        self.l_top = np.minimum(np.maximum(self.l_top + vy, 0), \
+                                self.max_top)
+        vy = np.trunc(np.minimum(np.maximum(r_target - self.r_top \
+             - self.half_h, self.vy_min), self.vy_max))
+        self.r_top = np.minimum(np.maximum(self.r_top + vy, 0), \
+                                self.max_top)
+
+    def handle_collision(self):
+        """
+        Game.handle_collision(), for the matches with the ball against
+        a wall or a paddle side only.
+        Returns these matches (indexes).
+        """
+        r = self.ball_r
+        cx = self.cx
+        cy = self.cy
+        idx = np.flatnonzero((cy <= r) | (cy >= self.win_h - r) \
+                             | (cx <= self.l_right + r) \
+                             | (cx >= self.r_left - r))
+        if idx.size == 0:
+            return idx
+        cx = cx[idx]
+        cy = cy[idx]
+        vx = self.vx[idx]
+        vy = self.vy[idx]
+        bot = cy + r >= self.win_h
+        wall = bot | (cy - r <= 0)
+        free = ~self.goal_to_be[idx]
+        # Wall reached first : ball position on the wall
+        y_wall = np.where(bot, self.win_h - r, r)
+        x_wall = np.trunc(cx - vx * (cy - y_wall) \
+                          / np.where(vy == 0, 1, vy))
+        on_l = (vx < 0) & (cx - r <= self.l_right) & free \
+               & (~wall | (x_wall <= self.l_right))
+        on_r = (vx > 0) & (cx + r >= self.r_left) & free \
+               & (~wall | (x_wall >= self.r_left))
+        on_pad = on_l | on_r
+        # Paddles : ball position on the paddle side
+        x_pad = np.where(on_l, self.l_right + r, self.r_left - r)
+        y_pad = np.trunc(cy - (cx - x_pad) * vy \
+                         / np.where(vx == 0, 1, vx))
+        pad_top = np.where(on_l, self.l_top[idx], self.r_top[idx])
+        pad_h = self.pad_h[idx]
+        hit = on_pad & (y_pad + r >= pad_top) \
+              & (y_pad - r <= pad_top + pad_h)
+        mid = pad_top + pad_h // 2
+        flat = self.flat[idx]
+        flat_hit = (y_pad < mid + flat / 2) & (y_pad > mid - flat / 2)
+        angle = np.trunc((np.abs(y_pad - mid) - flat / 2) \
+                / self.bounce_span[idx] * self.angle_max[idx])
+        vy_bounce = np.trunc(self.vx_straight[idx] \
+                             * np.tan(np.radians(angle)))
+        vy_bounce = np.where(y_pad > mid, vy_bounce, -vy_bounce)
+        vx_bounce = np.where(flat_hit, np.where(on_l, 1, -1) \
+                    * self.vx_straight[idx], -vx)
+        vy_bounce = np.where(flat_hit, 0, vy_bounce)
+        # Walls : when reached first, or paddle missed (goal to be)
+        on_wall = wall & ~hit
+        self.cx[idx] = np.where(hit, x_pad, np.where(on_wall, x_wall, cx))
+        self.cy[idx] = np.where(hit, y_pad, np.where(on_wall, y_wall, cy))
+        self.vx[idx] = np.where(hit, vx_bounce, vx)
+        self.vy[idx] = np.where(hit, vy_bounce, np.where(on_wall, -vy, vy))
+        self.goal_to_be[idx] |= on_pad & ~hit
+        self.hits[idx] += hit
+        self.draw_aims(idx[hit])
+        return idx
+
+    def draw_aims(self, idx):
+        """
+        Draws the aim errors of the track controllers again (matches
+        indexes), at each bounce / goal.
+        """
+        if self.controller == "track" and idx.size:
+            self.l_aim[idx] = self.rng.normal(0, self.aim_noise, idx.size)
+            self.r_aim[idx] = self.rng.normal(0, self.aim_noise, idx.size)
+
+    def detect_goal(self, idx):
+        """
+        Game.detect_goal() : scores, ball back to the center.
+        idx : matches with the ball beyond a paddle side (others can
+        not score). Returns the matches which scored (indexes).
+        """
+        cx = self.cx[idx]
+        r_goal = cx - self.ball_r < 0
+        l_goal = ~r_goal & (cx + self.ball_r > self.win_w)
+        scored = idx[r_goal | l_goal]
+        if scored.size == 0:
+            return scored
+        self.r_score[idx[r_goal]] += 1
+        self.l_score[idx[l_goal]] += 1
+        self.rallies.append((self.match[scored], self.hits[scored]))
+        self.total_hits[self.match[scored]] += self.hits[scored]
+        self.hits[scored] = 0
+        self.cx[scored] = self.center_x
+        self.cy[scored] = self.center_y
+        self.vx[scored] = np.where(r_goal[r_goal | l_goal], 1, -1) \
+                          * self.vx_straight[scored]
+        self.vy[scored] = 0
+        self.goal_to_be[scored] = False
+        self.draw_aims(scored)
+        return scored
+
+    def step(self):
+        """
+        One frame of every match (Game_ongoing_scene.update()).
+        Returns the matches which scored (indexes).
+        """
+        self.control_pads()
+        self.cx += self.vx
+        self.cy += self.vy
+        scored = self.detect_goal(self.handle_collision())
+        self.nb_frames += 1
+        return scored
+
+    def end_matches(self, ended):
+        """
+        Records the matches ended (indexes). Their ball is stopped at
+        the center, they are removed from the state arrays once enough
+        matches ended.
+        """
+        match = self.match[ended]
+        self.frames[match] = self.nb_frames
+        self.goals[match] = self.l_score[ended] + self.r_score[ended]
+        self.finished[match] = np.maximum(self.l_score[ended], \
+                               self.r_score[ended]) >= self.winning_score
+        self.alive[ended] = False
+        self.cx[ended] = self.center_x
+        self.cy[ended] = self.center_y
+        self.vx[ended] = 0
+        self.vy[ended] = 0
+        self.nb_ended += ended.size
+        if 4 * self.nb_ended > self.match.size:
+            keep = self.alive
+            for name in self.STATE:
+                setattr(self, name, getattr(self, name)[keep])
+            self.nb_ended = 0
+
+    def run(self, max_duration = 600):
+        """
+        Plays all matches until won, or max_duration (s) of game.
+        """
+        max_frames = int(max_duration * self.fps)
+        while self.match.size and self.nb_frames < max_frames:
+            scored = self.step()
+            if scored.size:
+                ended = scored[np.maximum(self.l_score[scored], \
+                        self.r_score[scored]) >= self.winning_score]
+                if ended.size:
+                    self.end_matches(ended)
+        self.end_matches(np.flatnonzero(self.alive)) # Not won in time
+
+def summary(values):
+    """
+    Returns min / mean / percentiles / max of an array of values.
+    """
+    if len(values) == 0:
+        return None
+    values = np.asarray(values, dtype = float)
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {"min" : float(values.min()), "mean" : float(values.mean()), \
+            "p50" : float(p50), "p90" : float(p90), "p99" : float(p99), \
+            "max" : float(values.max())}
+
+def sweep(grid, nb_matches = 1000, **options):
+    """
+    Simulates nb_matches matches for each combination of the parameter
+    grid (name -> list of values), all combinations in one batch.
+    Returns the rally length (paddle hits per point), goal rate and
+    match duration distributions of each combination.
+    """
+    names = list(grid)
+    combos = list(itertools.product(*(grid[name] for name in names)))
+    combo = np.repeat(np.arange(len(combos)), nb_matches)
+    params = {name : np.asarray([values[i] for values in combos])[combo] \
+              for i, name in enumerate(names)}
+    sim = Batch_sim(params, combo.size, **options)
+    sim.run()
+    rally_matches = np.concatenate([m for m, h in sim.rallies] + [[]]) \
+                    .astype(np.int64)
+    rally_hits = np.concatenate([h for m, h in sim.rallies] + [[]])
+    duration = sim.frames / sim.fps # s
+    goal_rate = 60 * sim.goals / np.maximum(duration, 1 / sim.fps)
+    results = []
+    for i, values in enumerate(combos):
+        mask = combo == i
+        results.append({"params" : dict(zip(names, values)), \
+            "matches" : int(mask.sum()), \
+            "finished" : int(sim.finished[mask].sum()), \
+            "rally_hits" : summary(rally_hits[combo[rally_matches] == i]), \
+            "goals_per_min" : summary(goal_rate[mask]), \
+            "match_duration_s" : summary(duration[mask \
+                                                  & sim.finished])})
+    return results
+
+class Rules_reference(skt_game.Game_rules):
+    """
+    Game collision / goal rules without display : used to check that
+    the batch simulator plays exactly as the game.
+    """
+    def __init__(self, sim, i):
+        self.win_w = sim.win_w
+        self.win_h = sim.win_h
+        self.BALL_ANGLE_MAX = float(sim.angle_max[i])
+        self.PAD_FLAT_BOUNCE_RATIO = float(sim.flat_ratio[i])
+        h = int(sim.pad_h[i])
+        self.l_pad = skt_obj.Paddle(None, sim.win_h, 0, 0, 1, h, None, \
+                                    None, 0)
+        self.r_pad = skt_obj.Paddle(None, sim.win_h, sim.r_left, 0, 1, \
+                                    h, None, None, 0)
+        self.l_pad.rect.right = sim.l_right
+        self.ball = skt_obj.Ball(None, sim.center_x, sim.center_y, \
+                                 sim.ball_r, None, \
+                                 int(sim.vx_straight[i]), \
+                                 int(sim.vx[i]), 0)
+        self.ball.original_vx = 0
+        self.l_score = 0
+        self.r_score = 0
+        self.goal_to_be = False
+        self.sound = skt_snd.Sound_effects(enabled = False)
+        self.stats = skt_sts.Stats_recorder(None)
+
+    def now(self):
+        """
+        No match time (statistics not recorded).
+        """
+        return 0
+
+def check_rules(nb_matches = 20, nb_frames = 5000, **options):
+    """
+    Plays the same matches with the batch simulator and the game rules
+    (paddles positions copied), returns the number of frames where the
+    ball / scores differ.
+    """
+    sim = Batch_sim({}, nb_matches, **options)
+    refs = [Rules_reference(sim, i) for i in range(nb_matches)]
+    nb_diffs = 0
+    for frame in range(nb_frames):
+        sim.step()
+        for i, ref in enumerate(refs):
+            ref.l_pad.rect.top = int(sim.l_top[i])
+            ref.r_pad.rect.top = int(sim.r_top[i])
+            ref.ball.move()
+            ref.goal_to_be = ref.handle_collision(ref.goal_to_be)
+            ref.goal_to_be = ref.detect_goal(ref.goal_to_be)
+            if ref.ball.rect.center != (sim.cx[i], sim.cy[i]) \
+            or (ref.ball.vx, ref.ball.vy) != (sim.vx[i], sim.vy[i]) \
+            or (ref.l_score, ref.r_score) != (sim.l_score[i], \
+                                              sim.r_score[i]):
+                nb_diffs += 1
+                # Realigned, to count the next differences
+                ref.ball.rect.center = (int(sim.cx[i]), int(sim.cy[i]))
+                ref.ball.vx = int(sim.vx[i])
+                ref.ball.vy = int(sim.vy[i])
+                ref.l_score = int(sim.l_score[i])
+                ref.r_score = int(sim.r_score[i])
+                ref.goal_to_be = bool(sim.goal_to_be[i])
+    return nb_diffs
+
+def main():
+    """
+    Parameter sweeps over simulated matches (no display / gyroscopes).
+    """
+    parser = argparse.ArgumentParser(description = "Skatepong batch " \
+             "simulator : game parameters sweeps over simulated matches.")
+    parser.add_argument("--grid", action = "append", default = [], \
+                        metavar = "NAME=V1,V2,...", help = "values of a " \
+                        "parameter (" + ", ".join(PARAMS) + ")")
+    parser.add_argument("--matches", type = int, default = 1000, \
+                        help = "matches per parameters combination")
+    parser.add_argument("--controller", choices = CONTROLLERS, \
+                        default = "track")
+    parser.add_argument("--aim-noise", type = float, default = 0.08, \
+                        help = "track aim error (ratio of height)")
+    parser.add_argument("--max-rate", type = float, default = 0.1, \
+                        help = "max board rotation (ratio of gyro " \
+                        "sensitivity)")
+    parser.add_argument("--size", default = "1920x1080", \
+                        help = "window size (px)")
+    parser.add_argument("--seed", type = int, default = None)
+    parser.add_argument("--check", action = "store_true", \
+                        help = "checks the simulator against the game " \
+                        "rules")
+    parser.add_argument("--json", help = "saves the results (file)")
+    args = parser.parse_args()
+    if np is None:
+        parser.exit(1, "numpy is required : pip3 install numpy\n")
+    win_w, win_h = (int(v) for v in args.size.split("x"))
+    options = {"win_w" : win_w, "win_h" : win_h, \
+               "controller" : args.controller, \
+               "aim_noise" : args.aim_noise, \
+               "max_rate_ratio" : args.max_rate, "seed" : args.seed}
+    if args.check:
+        nb_diffs = check_rules(**options)
+        print("Frames differing from the game rules :", nb_diffs)
+        if nb_diffs:
+            parser.exit(1)
+        return
+    grid = {}
+    for item in args.grid:
+        name, values = item.split("=")
+        if name not in PARAMS:
+            parser.error("unknown parameter : " + name)
+        grid[name] = [float(v) for v in values.split(",")]
+    start = time.perf_counter()
+    results = sweep(grid, args.matches, **options)
+    elapsed = time.perf_counter() - start
+    for result in results:
+        rally = result["rally_hits"]
+        goals = result["goals_per_min"]
+        duration = result["match_duration_s"]
+        print(result["params"] or "defaults", ": rally", \
+              round(rally["mean"], 1) if rally else "-", "hits (p90", \
+              round(rally["p90"]) if rally else "-", ") / goals", \
+              round(goals["mean"], 2), "per min / match", \
+              round(duration["p50"]) if duration else "-", "s (p90", \
+              round(duration["p90"]) if duration else "-", ") / won", \
+              result["finished"], "of", result["matches"])
+    print(sum(r["matches"] for r in results), "matches simulated in", \
+          round(elapsed, 1), "s")
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent = 2)
+
+if __name__ == '__main__':
+    main()
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
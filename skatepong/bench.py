@@ -0,0 +1,267 @@
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import os
+# Headless : no window / sound card needed (set before pygame init)
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import array
+import json
+import math
+import sys
+import tempfile
+import time
+import tracemalloc
+import pygame
+import skatepong.game as skt_game
+import skatepong.constants as skt_cst
+import skatepong.gyro_daemon as skt_gdm
+import skatepong.gyro_sim as skt_sim
+import skatepong.log as skt_log
+import skatepong.pacer as skt_pac
+import skatepong.renderer as skt_rnd
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+# Game frame allocation budgets (measured : 196 B / 1.7 kB / 15 kB)
+ALLOC_BUDGET_B = 512 # Allocated per frame (median)
+ALLOC_PEAK_BUDGET_B = 4096 # Allocated per frame (max)
+ALLOC_GROWTH_BUDGET_B = 32768 # Kept after alloc_report() frames
+
+class Bench_game(skt_game.Game):
+    """
+    Game running headless with simulated gyroscopes, for benchmarks.
+
+    The boards are connected after gyros_time and both start rotating
+    after motion_time (time.monotonic()), steady before.
+    """
+    METRICS_TEXTFILE = None
+    STATS_DB = None
+    DELAY_ATTRACT = None
+    GYRO_CALIB_FILE = os.path.join(tempfile.gettempdir(), \
+                                   "skatepong_bench_calib.json")
+    ASSETS_CACHE_DIR = None
+    WIN_SIZE = (1280, 720)
+    MOTION = 200 # Board rotation when moving (deg/s)
+
+    def __init__(self):
+        self.gyros_time = 0
+        self.motion_time = math.inf
+        super().__init__(full_screen = False)
+
+    def create_window(self):
+        self.pad_vy_factor = self.PAD_VY_FACTOR_RPI4
+        win = self.set_mode(self.WIN_SIZE)
+        return win, self.WIN_SIZE[0], self.WIN_SIZE[1]
+
+    def board_motion(self, t):
+        return self.MOTION if t >= self.motion_time else 0
+
+    def create_gyro(self, address):
+        if time.monotonic() < self.gyros_time:
+            raise IOError("simulated board not connected")
+        gyro = skt_sim.Simulated_gyro(address, 'y', self.GYRO_SENSITIVITY,\
+                                      signal = self.board_motion, \
+                                      seed = skt_gdm.ADDRESSES.index(address))
+        if self.GYRO_BIAS_TRACKING:
+            gyro.enable_bias_tracking(self.GYRO_STEADY_RATIO)
+        return gyro
+
+def measure(scene):
+    """
+    Runs a scene, returns its wall / CPU (process, all threads) times.
+    """
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    scene()
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    return {"wall_s" : wall, "cpu_s" : cpu, "cpu_pct" : 100 * cpu / wall}
+
+def polling_loop(game, duration):
+    """
+    Reference : idle scene polled at FPS (previous welcome scene loop).
+    """
+    clock = pygame.time.Clock()
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        clock.tick(game.FPS)
+        game.check_user_inputs(pygame.key.get_pressed())
+
+def pacing_report(fps, duration = 5, load = 0.5):
+    """
+    Frame interval jitter of pygame Clock.tick vs Frame_pacer, with
+    frames busy during load (ratio of the frame period).
+    """
+    nb_frames = int(duration * fps)
+    busy = load / fps
+
+    def work():
+        end = time.perf_counter() + busy
+        while time.perf_counter() < end:
+            pass
+
+    clock = pygame.time.Clock()
+    pacer = skt_pac.Frame_pacer(fps)
+    clock_pacer = skt_pac.Frame_pacer(fps, vsync = True) # Measures only
+    for i in range(nb_frames):
+        work()
+        clock.tick(fps)
+        clock_pacer.wait()
+    pacer.reset()
+    for i in range(nb_frames):
+        work()
+        pacer.wait()
+    clock_report = clock_pacer.report()
+    del clock_report["missed"] # Not known with Clock.tick
+    return {"clock_tick" : clock_report, "frame_pacer" : pacer.report()}
+
+def idle_report(duration = 5):
+    """
+    CPU usage of the scenes where nothing happens on screen, each one
+    kept idle during duration (s).
+    """
+    game = Bench_game()
+    report = {}
+    report["polling_reference"] = measure(lambda: polling_loop(game, \
+                                                               duration))
+    game.DELAY_WELCOME = duration
+    report["welcome"] = measure(lambda: game.run_scene( \
+                                skt_cst.SCENE_WELCOME))
+    game.gyros_time = time.monotonic() + duration
+    report["wait_gyros"] = measure(lambda: game.run_scene( \
+                                  skt_cst.SCENE_WAITING_GYROS))
+    game.motion_time = time.monotonic() + duration
+    report["wait_players"] = measure(lambda: game.run_scene( \
+                                    skt_cst.SCENE_WAITING_PLAYERS))
+    game.motion_time = math.inf
+    game.l_score = game.WINNING_SCORE
+    game.DELAY_STEADY_BEF_CALIB = duration
+    report["game_end"] = measure(lambda: game.run_scene( \
+                                skt_cst.SCENE_GAME_END))
+    game.metrics_exporter.stop()
+    pygame.quit()
+    return report
+
+def quality_report(duration = 5):
+    """
+    CPU usage of the game itself for every rendering quality level
+    (both boards rotating, so that the ball is in play).
+    """
+    game = Bench_game()
+    game.governor.window = math.inf # Level imposed below
+    game.run_scene(skt_cst.SCENE_WAITING_GYROS)
+    game.motion_time = 0
+    report = {}
+    for level, name in enumerate(game.governor.LEVELS):
+        game.governor.level = level
+        game.l_score = 0
+        game.r_score = 0
+        game.game_status = skt_cst.SCENE_GAME_ONGOING
+        end = game.now() + duration
+
+        def play():
+            while game.now() < end:
+                game.step()
+                if game.game_status != skt_cst.SCENE_GAME_ONGOING:
+                    game.game_status = skt_cst.SCENE_GAME_ONGOING
+
+        report[name] = measure(play)
+    game.metrics_exporter.stop()
+    pygame.quit()
+    return report
+
+def alloc_report(nb_frames = 250):
+    """
+    Memory allocated by the game frames (tracemalloc) : peak above the
+    memory in use during each frame, and memory kept after all frames
+    (scores rendered, frame history values replaced).
+    """
+    game = Bench_game()
+    game.governor.window = math.inf # Level kept at full quality
+    game.run_scene(skt_cst.SCENE_WAITING_GYROS)
+    game.motion_time = 0
+    game.WINNING_SCORE = math.inf
+    game.game_status = skt_cst.SCENE_GAME_ONGOING
+    for i in range(game.pacer.HISTORY): # Caches / frame history filled
+        game.step()
+    peaks = array.array("q", [0] * nb_frames) # Not traced when filled
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    for i in range(nb_frames):
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        game.step()
+        peaks[i] = tracemalloc.get_traced_memory()[1] - current
+    growth = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    game.metrics_exporter.stop()
+    pygame.quit()
+    peaks = sorted(peaks)
+    return {"frames" : nb_frames, "peak_p50_b" : peaks[nb_frames // 2], \
+            "peak_max_b" : peaks[-1], "growth_b" : growth}
+
+def main():
+    """
+    Benchmarks the game without hardware (dummy display, simulated gyros).
+    """
+    parser = argparse.ArgumentParser(description = "Skatepong headless " \
+             "benchmarks (simulated gyroscopes, no display).")
+    parser.add_argument("--duration", type = float, default = 5, \
+                        help = "idle duration per scene (s)")
+    parser.add_argument("--json", help = "saves the full report (file)")
+    parser.add_argument("--alloc-budget", type = int, \
+                        default = ALLOC_BUDGET_B, help = "fails if a " \
+                        "game frame allocates more (median, bytes)")
+    parser.add_argument("--renderer", choices = skt_rnd.BACKENDS, \
+                        default = Bench_game.RENDERER, help = "texture : " \
+                        "SDL software render driver without GPU")
+    args = parser.parse_args()
+    skt_log.setup_logging()
+    Bench_game.RENDERER = args.renderer
+
+    report = {"pacing" : pacing_report(skt_game.Game.FPS, args.duration)}
+    for name, result in report["pacing"].items():
+        print(name, ": jitter", round(result["jitter_ms"], 3), "ms / p99",\
+              round(result["p99_ms"], 2), "ms / max", \
+              round(result["max_ms"], 2), "ms / missed", \
+              result.get("missed", "-"))
+    report["quality"] = quality_report(args.duration)
+    for level, result in report["quality"].items():
+        print("game_ongoing -", level, ": CPU", round(result["cpu_pct"], 1),\
+              "%")
+    report["alloc"] = alloc_report()
+    print("game_ongoing : allocated per frame", \
+          report["alloc"]["peak_p50_b"], "B (max", \
+          report["alloc"]["peak_max_b"], "B) / kept after", \
+          report["alloc"]["frames"], "frames", report["alloc"]["growth_b"], \
+          "B")
+    report["idle"] = idle_report(args.duration)
+    for scene, result in report["idle"].items():
+        print(scene, ": CPU", round(result["cpu_pct"], 1), "% (", \
+              round(result["cpu_s"], 3), "s over", \
+              round(result["wall_s"], 2), "s )")
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent = 2)
+    if report["alloc"]["peak_p50_b"] > args.alloc_budget:
+        sys.exit("Frame allocations over budget : %s B > %s B" \
+                 % (report["alloc"]["peak_p50_b"], args.alloc_budget))
+
+if __name__ == '__main__':
+    main()
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
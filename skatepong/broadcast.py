@@ -0,0 +1,330 @@
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import argparse
+import queue
+import socket
+import struct
+import threading
+import skatepong.constants as skt_cst
+import skatepong.log as skt_log
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+logger = skt_log.get_logger("broadcast")
+
+"""
+Packets (little endian, fixed sizes) :
+- header : magic, version, kind (KEYFRAME / DELTA), sequence number
+  (game frames published, first : 1).
+- keyframe : scene id, left / right scores, ball center x / y, ball
+  velocity x / y, left / right paddles top, window width / height (px).
+- delta : changes since the previous packet (sequence - 1) of the ball
+  center / velocity and paddles top, signed bytes.
+A keyframe is sent every KEYFRAME_PERIOD packets, on scene / score
+changes and when a change does not fit in a delta. Receivers ignore the
+deltas following a lost packet until the next keyframe.
+"""
+MAGIC = b"SK"
+VERSION = 1
+KEYFRAME = 0
+DELTA = 1
+HEADER = struct.Struct("<2sBBI")
+KEY_BODY = struct.Struct("<BBBhhhhhhHH")
+DELTA_BODY = struct.Struct("<bbbbbb")
+KEYFRAME_PERIOD = 10 # Packets between 2 keyframes (0.4 s at 25 FPS)
+DEFAULT_PORT = 9120
+RESTART_GAP = 1000 # Sequence going back more : sender restarted
+# State : scene, scores, ball x / y / vx / vy, paddles y, window w / h
+MOVING = slice(3, 9) # Fields sent in deltas
+
+def game_state(game):
+    """
+    Returns the state tuple of the game (objects at 0 if not created).
+    """
+    ball = getattr(game, "ball", None)
+    if ball is None:
+        return (game.game_status, game.l_score, game.r_score, \
+                0, 0, 0, 0, 0, 0, game.win_w, game.win_h)
+    return (game.game_status, game.l_score, game.r_score, \
+            ball.rect.centerx, ball.rect.centery, int(ball.vx), \
+            int(ball.vy), game.l_pad.rect.top, game.r_pad.rect.top, \
+            game.win_w, game.win_h)
+
+class Encoder():
+    """
+    Encodes successive states as keyframe / delta packets.
+    """
+    def __init__(self, keyframe_period = KEYFRAME_PERIOD):
+        self.keyframe_period = keyframe_period
+        self.seq = 0
+        self.prev = None # State of the previous packet
+        self.last_key = 0 # Sequence number of the last keyframe
+
+    def encode(self, state):
+        self.seq += 1
+        prev = self.prev
+        self.prev = state
+        if prev is not None and prev[:3] == state[:3] \
+        and prev[9:] == state[9:] \
+        and self.seq - self.last_key < self.keyframe_period:
+            deltas = [new - old for new, old \
+                      in zip(state[MOVING], prev[MOVING])]
+            if all(-128 <= delta <= 127 for delta in deltas):
+                return HEADER.pack(MAGIC, VERSION, DELTA, self.seq) \
+                       + DELTA_BODY.pack(*deltas)
+        self.last_key = self.seq
+        return HEADER.pack(MAGIC, VERSION, KEYFRAME, self.seq) \
+               + KEY_BODY.pack(*state)
+
+class Decoder():
+    """
+    Rebuilds the states from the packets received.
+    """
+    def __init__(self):
+        self.seq = None # Sequence number of the state
+        self.state = None
+        self.nb_keyframes = 0
+        self.nb_deltas = 0
+        self.nb_lost = 0 # Packets missing (sequence gaps)
+        self.nb_ignored = 0 # Deltas received without base state
+
+    def decode(self, packet):
+        """
+        Returns the state of a packet, None if it cannot be decoded.
+        """
+        if len(packet) < HEADER.size:
+            return None
+        magic, version, kind, seq = HEADER.unpack_from(packet)
+        if magic != MAGIC or version != VERSION:
+            return None
+        if self.seq is not None:
+            if self.seq - RESTART_GAP < seq <= self.seq:
+                return None # Late / duplicated packet
+            if seq > self.seq + 1:
+                self.nb_lost += seq - self.seq - 1
+        if kind == KEYFRAME and len(packet) == HEADER.size + KEY_BODY.size:
+            self.state = KEY_BODY.unpack_from(packet, HEADER.size)
+            self.nb_keyframes += 1
+        elif kind == DELTA \
+        and len(packet) == HEADER.size + DELTA_BODY.size:
+            if self.state is None or seq != self.seq + 1:
+                self.nb_ignored += 1
+                self.seq = seq
+                self.state = None
+                return None
+            deltas = DELTA_BODY.unpack_from(packet, HEADER.size)
+            state = list(self.state)
+            for i, delta in enumerate(deltas, MOVING.start):
+                state[i] += delta
+            self.state = tuple(state)
+            self.nb_deltas += 1
+        else:
+            return None
+        self.seq = seq
+        return self.state
+
+class Broadcaster():
+    """
+    Sends the game state after each frame over UDP, from a background
+    thread : the game only queues the state (dropped if the thread is
+    late, never blocks).
+    """
+    QUEUE_SIZE = 8 # States waiting to be sent
+
+    def __init__(self, address, keyframe_period = KEYFRAME_PERIOD):
+        self.address = address # (host, port)
+        self.encoder = Encoder(keyframe_period)
+        self.queue = queue.Queue(self.QUEUE_SIZE)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        self.nb_sent = 0
+        self.nb_bytes = 0
+        self.nb_dropped = 0 # States not queued (thread late)
+        self.nb_errors = 0
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target = self._run, \
+                      name = "broadcast", daemon = True)
+        self.thread.start()
+
+    def publish(self, game):
+        """
+        Queues the current state of the game (called after each frame).
+        """
+        try:
+            self.queue.put_nowait(game_state(game))
+        except queue.Full:
+            self.nb_dropped += 1
+
+    def stop(self):
+        """
+        Sends the states queued and stops the thread.
+        """
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        self.sock.close()
+
+    def _run(self):
+        while True:
+            state = self.queue.get()
+            if state is None:
+                return
+            packet = self.encoder.encode(state)
+            try:
+                self.sock.sendto(packet, self.address)
+            except OSError as err:
+                self.nb_errors += 1
+                logger.warning("State not sent", \
+                               extra = {"error" : repr(err)})
+            else:
+                self.nb_sent += 1
+                self.nb_bytes += len(packet)
+
+class Receiver():
+    """
+    Reference spectator : receives and decodes the game states.
+    """
+    def __init__(self, port = DEFAULT_PORT, host = ""):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.port = self.sock.getsockname()[1]
+        self.decoder = Decoder()
+
+    def receive(self, timeout = None):
+        """
+        Returns (sequence number, state) of the next packet decoded,
+        None on timeout.
+        """
+        self.sock.settimeout(timeout)
+        while True:
+            try:
+                packet = self.sock.recv(64)
+            except socket.timeout:
+                return None
+            state = self.decoder.decode(packet)
+            if state is not None:
+                return self.decoder.seq, state
+
+    def close(self):
+        self.sock.close()
+
+def parse_address(address):
+    """
+    "host:port" -> (host, port).
+    """
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+def loopback_test(nb_frames, seed, loss = 0.0):
+    """
+    Plays nb_frames of a deterministic game and broadcasts its states
+    to a receiver on the loopback interface. loss : ratio of packets
+    dropped by the receiver (simulated).
+    Returns the states sent and received (sequence -> state), the
+    broadcaster and the decoder.
+    """
+    import random
+    import skatepong.golden_trace as skt_gtr
+    receiver = Receiver(0, "127.0.0.1")
+    broadcaster = Broadcaster(("127.0.0.1", receiver.port))
+    sent = {}
+    received = {}
+    encode = broadcaster.encoder.encode
+
+    def recorded_encode(state):
+        sent[broadcaster.encoder.seq + 1] = state
+        return encode(state)
+    broadcaster.encoder.encode = recorded_encode
+    rng = random.Random(seed)
+
+    def receive():
+        receiver.sock.settimeout(1)
+        while True:
+            try:
+                packet = receiver.sock.recv(64)
+            except socket.timeout:
+                return
+            if rng.random() < loss:
+                continue
+            state = receiver.decoder.decode(packet)
+            if state is not None:
+                received[receiver.decoder.seq] = state
+    thread = threading.Thread(target = receive, daemon = True)
+    thread.start()
+    broadcaster.start()
+    for state in skt_gtr.record(seed, nb_frames, broadcaster.publish):
+        pass
+    broadcaster.stop()
+    thread.join()
+    receiver.close()
+    return sent, received, broadcaster, receiver.decoder
+
+def main():
+    """
+    Receives the game states (--listen) or tests the broadcast on the
+    loopback interface (--loopback).
+    """
+    parser = argparse.ArgumentParser(description = "Skatepong state " \
+             "broadcast (UDP) : reference receiver and loopback test.")
+    parser.add_argument("--listen", type = int, metavar = "PORT", \
+                        help = "prints the states received")
+    parser.add_argument("--loopback", type = int, metavar = "FRAMES", \
+                        help = "plays a deterministic game, checks the " \
+                        "states received")
+    parser.add_argument("--loss", type = float, default = 0, \
+                        help = "loopback : ratio of packets dropped")
+    parser.add_argument("--seed", type = int, default = 1)
+    args = parser.parse_args()
+    skt_log.setup_logging()
+
+    if args.listen is not None:
+        receiver = Receiver(args.listen)
+        try:
+            while True:
+                seq, state = receiver.receive()
+                print(seq, skt_cst.SCENE_NAMES[state[0]], "%s-%s" \
+                      % state[1:3], "ball", state[3:5], "pads", \
+                      state[7:9], flush = True)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            receiver.close()
+        return
+    if args.loopback is None:
+        parser.error("--listen or --loopback required")
+
+    sent, received, broadcaster, decoder = loopback_test(args.loopback, \
+                                           args.seed, args.loss)
+    wrong = sum(1 for seq, state in received.items() \
+                if sent.get(seq) != state)
+    print("States sent", broadcaster.nb_sent, "( dropped", \
+          broadcaster.nb_dropped, ") / decoded", len(received), \
+          "/ wrong", wrong)
+    print("Keyframes", decoder.nb_keyframes, "/ deltas", decoder.nb_deltas,\
+          "/ lost", decoder.nb_lost, "/ deltas ignored", decoder.nb_ignored)
+    print("Bytes per state : %.1f (keyframe %s, delta %s)" \
+          % (broadcaster.nb_bytes / max(broadcaster.nb_sent, 1), \
+             HEADER.size + KEY_BODY.size, HEADER.size + DELTA_BODY.size))
+    if wrong:
+        parser.exit(1)
+
+if __name__ == '__main__':
+    main()
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
@@ -0,0 +1,103 @@
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import json
+import os
+import tempfile
+import skatepong.log as skt_log
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+logger = skt_log.get_logger("calib_store")
+
+DEFAULT_PATH = os.path.expanduser("~/.skatepong/gyro_calib.json")
+
+class Calib_store():
+    """
+    Persists per-sensor calibration data in a small JSON file.
+
+    Entries are indexed by sensor identification (ex: 'i2c-1-0x68') and
+    kept in memory, the file is only read once and rewritten atomically
+    on each update.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.entries = self.load()
+
+    def load(self):
+        """
+        Reads the file content (empty store if missing or corrupted).
+        """
+        try:
+            with open(self.path, "r") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            entries = {}
+        except (OSError, ValueError) as err:
+            logger.warning("Calibration file ignored", \
+                           extra = {"error" : repr(err)})
+            entries = {}
+        if not isinstance(entries, dict):
+            entries = {}
+        return entries
+
+    def get(self, sensor_id):
+        """
+        Returns the entry (dict) of the given sensor, None if unknown.
+        """
+        return self.entries.get(sensor_id)
+
+    def update(self, sensor_id, **fields):
+        """
+        Updates the entry of the given sensor and saves the file.
+        """
+        entry = self.entries.setdefault(sensor_id, {})
+        entry.update(fields)
+        self.save()
+
+    def save(self):
+        """
+        Writes the file in a temp file then renames it (atomic).
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        tmp_path = None
+        try:
+            os.makedirs(directory, exist_ok = True)
+            fd, tmp_path = tempfile.mkstemp(dir = directory, \
+                                            prefix = ".calib")
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.entries, f, indent = 2, sort_keys = True)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError as err:
+            logger.warning("Calibration file not saved", \
+                           extra = {"error" : repr(err)})
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+def main():
+    """
+    Function for test purposes only.
+    """
+    skt_log.setup_logging()
+    path = os.path.join(tempfile.gettempdir(), "skatepong_calib.json")
+    store = Calib_store(path)
+    store.update("i2c-1-0x68", offset = -1.25, noise = 0.08, time = 0)
+    print(Calib_store(path).get("i2c-1-0x68"))
+
+if __name__ == '__main__':
+    main()
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
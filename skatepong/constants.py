@@ -16,6 +16,18 @@ SCENE_COUNTDOWN = 3
 SCENE_GAME_ONGOING = 4
 SCENE_GAME_END = 5
 SCENE_CALIBRATION_REQUESTED = 6
+SCENE_ATTRACT = 7
+SCENE_NET_PLAY = 8
+# Game scenes names (used for metrics / logs):
+SCENE_NAMES = {SCENE_WELCOME : "welcome", \
+               SCENE_WAITING_GYROS : "wait_gyros", \
+               SCENE_WAITING_PLAYERS : "wait_players", \
+               SCENE_COUNTDOWN : "countdown", \
+               SCENE_GAME_ONGOING : "game_ongoing", \
+               SCENE_GAME_END : "game_end", \
+               SCENE_CALIBRATION_REQUESTED : "calibrate_pads", \
+               SCENE_ATTRACT : "attract", \
+               SCENE_NET_PLAY : "net_play"}
 # Colors
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -0,0 +1,210 @@
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import argparse
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+import pygame
+import skatepong.gyro_daemon as skt_gdm
+import skatepong.log as skt_log
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+"""
+Shared memory layout (little endian) :
+- header : width, height, pitch (bytes per row), pixel format
+  (FORMAT, 4 bytes per pixel).
+- 1 slot per buffer : seqlock counter (odd while the game is writing),
+  frame number (1 for the first frame, 0 : empty), timestamp
+  (time.monotonic()).
+- NB_BUFFERS frames (raw pixels).
+The latest frame is the slot with the highest frame number : the game
+writes the other buffer, readers copy the latest one meanwhile.
+"""
+SHM_NAME = "skatepong_frames"
+NB_BUFFERS = 2
+FORMAT = "BGRA" # Byte order of the pixels (ffmpeg rawvideo : bgra)
+HEADER = struct.Struct("<III4s")
+SLOT = struct.Struct("<QQd")
+SLOT_OFFSET = HEADER.size
+FRAME_OFFSET = SLOT_OFFSET + NB_BUFFERS * SLOT.size
+
+class Frame_exporter():
+    """
+    Publishes the frames presented on the window surface in shared
+    memory, for an external streamer / recorder.
+
+    Double buffered : each buffer is brought up to date by copying only
+    the regions changed since it was last written (dirty rects), then
+    published with its frame number (seqlock). The buffers are wrapped
+    in surfaces : regions copied by blits, no intermediate copy.
+    """
+    def __init__(self, surface, name = SHM_NAME):
+        self.width, self.height = surface.get_size()
+        self.pitch = self.width * 4
+        self.frame_size = self.pitch * self.height
+        size = FRAME_OFFSET + NB_BUFFERS * self.frame_size
+        try:
+            self.shm = shared_memory.SharedMemory(name, create = True, \
+                                                  size = size)
+        except FileExistsError:
+            # Left over by a game which crashed
+            old_shm = shared_memory.SharedMemory(name)
+            old_shm.close()
+            old_shm.unlink()
+            self.shm = shared_memory.SharedMemory(name, create = True, \
+                                                  size = size)
+        self.buf = self.shm.buf
+        HEADER.pack_into(self.buf, 0, self.width, self.height, self.pitch,\
+                         FORMAT.encode("ascii"))
+        self.buffers = []
+        for index in range(NB_BUFFERS):
+            offset = FRAME_OFFSET + index * self.frame_size
+            self.buffers.append(pygame.image.frombuffer( \
+                 self.buf[offset:offset + self.frame_size], \
+                 (self.width, self.height), FORMAT))
+        self.frame_nb = 0
+        self.seqs = [0] * NB_BUFFERS
+        # Regions of each buffer out of date (whole frame at start)
+        rect = surface.get_rect()
+        self.pending = [[rect] for i in range(NB_BUFFERS)]
+
+    def publish(self, surface, rects):
+        """
+        Publishes the frame presented : rects are the regions changed
+        since the previous frame.
+        """
+        index = self.frame_nb % NB_BUFFERS
+        for pending in self.pending:
+            pending.extend(rects)
+        slot_offset = SLOT_OFFSET + index * SLOT.size
+        self.seqs[index] += 1 # Odd : write ongoing
+        SLOT.pack_into(self.buf, slot_offset, self.seqs[index], 0, 0.0)
+        target = self.buffers[index]
+        for rect in self.pending[index]:
+            target.blit(surface, rect, rect)
+        self.pending[index].clear()
+        self.frame_nb += 1
+        self.seqs[index] += 1 # Even : consistent
+        SLOT.pack_into(self.buf, slot_offset, self.seqs[index], \
+                       self.frame_nb, time.monotonic())
+
+    def close(self):
+        """
+        Releases and removes the shared memory (once).
+        """
+        if self.buf is None:
+            return
+        self.buffers = None # Surfaces referencing the memory
+        self.buf = None
+        self.shm.close()
+        self.shm.unlink()
+
+class Frame_reader():
+    """
+    Reads the latest frame published by the game (other process).
+    """
+    MAX_RETRIES = 100 # Seqlock read attempts before giving up
+
+    def __init__(self, name = SHM_NAME):
+        self.shm = skt_gdm.attach_shm(name)
+        self.buf = self.shm.buf
+        self.width, self.height, self.pitch, pix_format = \
+            HEADER.unpack_from(self.buf, 0)
+        self.format = pix_format.decode("ascii")
+        self.frame_size = self.pitch * self.height
+
+    def read(self, last_frame_nb = 0):
+        """
+        Returns (frame number, timestamp, raw pixels) of the latest
+        frame, None if no frame was published after last_frame_nb.
+        """
+        for i in range(self.MAX_RETRIES):
+            slots = [SLOT.unpack_from(self.buf, SLOT_OFFSET \
+                     + index * SLOT.size) for index in range(NB_BUFFERS)]
+            index = max(range(NB_BUFFERS), key = lambda i: slots[i][1])
+            seq, frame_nb, timestamp = slots[index]
+            if frame_nb <= last_frame_nb:
+                return None
+            if seq & 1:
+                continue
+            offset = FRAME_OFFSET + index * self.frame_size
+            pixels = bytes(self.buf[offset:offset + self.frame_size])
+            if SLOT.unpack_from(self.buf, SLOT_OFFSET \
+                                + index * SLOT.size)[0] == seq:
+                return frame_nb, timestamp, pixels
+        raise IOError("frame export : shared memory not readable")
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+def main():
+    """
+    Reference consumer : prints the frames received per second, or
+    writes the raw frames to stdout (for an encoder, ex: ffmpeg).
+    """
+    parser = argparse.ArgumentParser(description = "Reads the frames " \
+             "exported by the game (FRAME_EXPORT set in game.py).")
+    parser.add_argument("--name", default = SHM_NAME, \
+                        help = "shared memory name")
+    parser.add_argument("--raw", action = "store_true", help = "writes " \
+                        "the raw frames to stdout (see --info)")
+    parser.add_argument("--info", action = "store_true", help = "prints " \
+                        "the frame size / ffmpeg pixel format and exits")
+    parser.add_argument("--poll", type = float, default = 0.005, \
+                        help = "polling period (s)")
+    args = parser.parse_args()
+    skt_log.setup_logging()
+
+    reader = Frame_reader(args.name)
+    if args.info:
+        print("-f rawvideo -pix_fmt %s -s %sx%s" \
+              % (reader.format.lower(), reader.width, reader.height))
+        return
+    frame_nb = 0
+    nb_read = 0
+    nb_missed = 0
+    start = time.monotonic()
+    try:
+        while True:
+            frame = reader.read(frame_nb)
+            if frame is None:
+                time.sleep(args.poll)
+                continue
+            if frame_nb:
+                nb_missed += frame[0] - frame_nb - 1
+            frame_nb = frame[0]
+            nb_read += 1
+            if args.raw:
+                sys.stdout.buffer.write(frame[2])
+            elif time.monotonic() - start >= 1:
+                print("frames read %s / missed %s / latency %.1f ms" \
+                      % (nb_read, nb_missed, \
+                         1000 * (time.monotonic() - frame[1])), \
+                      flush = True)
+                nb_read = 0
+                nb_missed = 0
+                start = time.monotonic()
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+    finally:
+        reader.close()
+
+if __name__ == '__main__':
+    main()
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
@@ -9,6 +9,7 @@ Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
 #-----------------------------------------------------------------------
 
 import pygame
+import atexit
 import time
 import math
 import random
@@ -19,132 +20,37 @@ import skatepong.gyro as skt_gyro
 import skatepong.tools as skt_tls
 import skatepong.game_objects as skt_obj
 import skatepong.constants as skt_cst
+import skatepong.metrics as skt_met
+import skatepong.log as skt_log
+import skatepong.calib_store as skt_cal
+import skatepong.assets as skt_ast
+import skatepong.gyro_daemon as skt_gdm
+import skatepong.scenes as skt_scn
+import skatepong.pacer as skt_pac
+import skatepong.governor as skt_gov
+import skatepong.profiler as skt_prf
+import skatepong.renderer as skt_rnd
+import skatepong.frame_export as skt_fex
+import skatepong.broadcast as skt_bct
+import skatepong.sound as skt_snd
+import skatepong.stats as skt_sts
 
 #-----------------------------------------------------------------------
 # CODE
 #-----------------------------------------------------------------------
 
-class Game():
+logger = skt_log.get_logger("game")
 
+class Game_rules():
     """
-    2 players pong game, with real skateboards as actuators.
+    Ball collisions and goals rules, without display nor gyroscopes :
+    shared by the game and the headless matches (network play, batch
+    simulator check).
 
-    - Objective : Shoot the ball beyond the oponent's zone (+1 point).
-    - End : Game ends when a player reaches a given number of points.
-    - The two paddles are controlled independently based on the angular
-      rotation measured by the gyroscopes mounted under each skateboard.
-
-    - Games scenes :
-        WELCOME : Splash screen at application start.
-        WAITING_GYROS : Waiting that both gyroscopes are connected.
-        WAITING_PLAYERS : Waiting for motion on both skates.
-        COUNTDOWN : Countdown before the actual game starts.
-        GAME_ONGOING : Game running.
-        GAME_END : Winner is announced + pads calib before next game
-        CALIBRATION_REQUESTED : Paddles calibratation upon request.
+    Subclasses provide the rules parameters (see Game), the attributes
+    win_w / win_h, l_pad / r_pad, ball, l_score / r_score, sound, stats
+    and now().
     """
-
-    #-------------------------------------------------------------------
-    # GAME PARAMETERS
-    #-------------------------------------------------------------------
-
-    # Main game parameters
-    WINNING_SCORE = 10 # Number of goals to win the game
-    BALL_ANGLE_MAX = 50 # Max angle after paddle collision (deg) [35-65]
-    # Delays
-    DELAY_WELCOME = 4 # Splash screen duration (s)
-    DELAY_INACT_PLAYER = 5 # Delay before a player becomes inactive (s)
-    DELAY_COUNTDOWN = 5 # Countdown before game starts (s)
-    DELAY_MAX_GAME_END = 15 # Delay max after game ends before calib (s)
-    DELAY_STEADY_BEF_CALIB = 3 # Duration steady skates before calib (s)
-    # Technical parameters
-    FPS = 25 # Max frames/sec (30 seems good compromise for RPI3 / RPI4)
-    GYRO_SENSITIVITY = mpu6050.GYRO_RANGE_1000DEG
-    """
-    For GYRO_SENSITIVITY, use one of the following constants:
-    mpu6050.GYRO_RANGE_250DEG = 0x00 # +/- 125 deg/s
-    mpu6050.GYRO_RANGE_500DEG = 0x08 # +/- 250 deg/s
-    mpu6050.GYRO_RANGE_1000DEG = 0x10 # +/- 500 deg/s
-    mpu6050.GYRO_RANGE_2000DEG = 0x18 # +/- 1000 deg/s
-    """
-    # Sizes ([indicates recommended values])
-    WELCOME_RADIUS_RATIO = 0.25 # Rat. disp. h [0.1 - 0.5]
-    PAD_WIDTH_RATIO = 0.015 # Rat. disp. w [0.005 - 0.1]
-    PAD_HEIGHT_RATIO = 0.2 # Rat. disp. h [0.05 - 0.2]
-    PAD_X_OFFSET_RATIO = 0.02 # Rat. disp. w [0.01 - 0.02] frame offset
-    BALL_RADIUS_RATIO = 0.02 # Rat. min disp. w/h [0.01 - 0.04]
-    PAD_FLAT_BOUNCE_RATIO = 0.02 # Rat. disp. w [0.01 - 0.03]
-    BALL_V_RATIO = 0.035 # Rat. disp. w [0.01 - 0.04]
-    MID_LINE_WIDTH_RATIO = 0.006 # Rat. disp. w [0.005 - 0.01]
-    SCORE_Y_OFFSET_RATIO = 0.02 # Rat. disp. h - frame vertical offset
-    CENTER_CROSS_MULTIPLIER = 3 # Mid line thikness factor [2 - 5]
-    # Text fonts parameters (names and sizes)
-    FT_NM = "comicsans" # or 'quicksandmedium'. Font used for texts.
-    # Other parameters
-    GYRO_ACTIVE_RATIO = 0.07 # Rat. angular velocity / gyro sensitivity
-    GYRO_STEADY_RATIO = 0.02 # Rat. angular velocity / gyro sensitivity
-    PAD_VY_FACTOR_RPI3 = 0.70 #Factor to adjust paddle displacement
-    PAD_VY_FACTOR_RPI4 = 0.60 #Factor to adjust paddle displacement
-    
-
-    def __init__(self, game_status = 0, l_score = 0, r_score = 0, \
-    full_screen = True):
-        pygame.init()
-        self.clock = pygame.time.Clock()
-        self.game_status = game_status
-        self.l_score = l_score
-        self.r_score = r_score
-        self.full_screen = full_screen
-        self.win, self.win_w, self.win_h = self.create_window()
-        self.ft_dic = skt_tls.comp_font_sizes(self.win_h)
-        self.x_dic, self.y_dic = skt_tls.comp_common_coordinates( \
-                                 self.win_w, self.win_h)
-
-    #-------------------------------------------------------------------
-    # SIDE FUNCTIONS
-    #-------------------------------------------------------------------
-
-    def create_window(self):
-        """
-        Initializes game window, and adjusts size to display resolution.
-        """
-        disp_w = pygame.display.Info().current_w # Disp. width (px)
-        disp_h = pygame.display.Info().current_h # Disp. height (px)
-        print ("Display resolution :", disp_w, disp_h)
-        # Getting raspberry pi HW version (through cpu revision)
-        cpu_rev = skt_tls.get_cpu_revision()
-        rpi_4b = skt_tls.is_rpi_4b(cpu_rev)
-        # Adjusting game resolution and paddle displacement factor
-        # (a little different due to different game speed with RPI3/4)
-        if rpi_4b == True:
-            self.pad_vy_factor = self.PAD_VY_FACTOR_RPI4
-            pass
-        # If RPI HW < Mod 4B, game resolution reduc. to avoid lags
-        else:
-            self.pad_vy_factor = self.PAD_VY_FACTOR_RPI3
-            # Most commom resolution for TV: 1920 x 1080
-            if disp_w == 1920 and disp_h == 1080:
-                print ("Game resolution reduced vs display resolution",\
-                "for better performances on RPI 3 Model B+")
-                disp_w = 1280
-                disp_h = 720
-            # If other wide reso, adjust h to keep A/R with w = 1280
-            elif disp_w > 1280:
-                print ("Game resolution reduced vs display resolution",\
-                "for better performances on RPI 3 Model B+")
-                disp_h = 1280 * disp_h / disp_w
-                disp_w = 1280
-        if self.full_screen == False:
-            win = pygame.display.set_mode([disp_w, disp_h - 100])
-            pygame.display.set_caption("Skatepong")
-        else:
-            win = pygame.display.set_mode([disp_w, disp_h], \
-                                          pygame.FULLSCREEN)
-        time.sleep(1/2) # Introduced after some failure at game init.
-        win_w , win_h = pygame.display.get_surface().get_size()
-        print ("Game resolution :", win_w, win_h)
-        return win, win_w, win_h
-
     def comp_elem_sizes(self):
         """
         Computes game elements sizes/speeds based on display resolution.
@@ -156,157 +62,6 @@ class Game():
         ball_vx_straight = int(self.win_w * self.BALL_V_RATIO)
         return pad_w, pad_h, ball_r, ball_vx_straight
 
-    def create_game_elements(self):
-        """
-        Creates game objects at program start.
-        - Paddles centered vertically.
-        - Ball centered horizontally and vertically.
-        """
-        pad_w, pad_h, ball_r, ball_vx_straight = self.comp_elem_sizes()
-        l_pad_x =  int(self.win_w * self.PAD_X_OFFSET_RATIO)
-        r_pad_x = self.win_w - int(self.PAD_X_OFFSET_RATIO*self.win_w) \
-                  - pad_w
-        pad_y = (self.win_h - pad_h) // 2
-        self.l_pad = skt_obj.Paddle(self.win, self.win_h, l_pad_x, \
-                     pad_y, pad_w, pad_h, skt_cst.WHITE, self.l_gyro, \
-                     self.pad_vy_factor)
-        self.r_pad = skt_obj.Paddle(self.win, self.win_h, r_pad_x, \
-                     pad_y, pad_w, pad_h, skt_cst.WHITE, self.r_gyro, \
-                     self.pad_vy_factor)
-        self.ball = skt_obj.Ball(self.win, self.x_dic["0.50"], \
-                                self.y_dic["0.50"], ball_r, \
-                                skt_cst.WHITE, ball_vx_straight, 0, 0)
-
-    def reinitialize_gyro_if_needed(self):
-        """
-        Recreates gyroscopes objects following deconnections.
-        """
-        if self.l_gyro.error:
-            print("Issue : i2c communication with left gyroscope lost")
-            try:
-                self.l_gyro = skt_gyro.Gyro_one_axis( \
-                            skt_gyro.Gyro_one_axis.I2C_ADDRESS_1,\
-                            'y', self.GYRO_SENSITIVITY)
-            except IOError:
-                pass
-            else:
-                print("Left gyroscope reconnected")
-                self.l_pad.gyro = self.l_gyro
-        if self.r_gyro.error:
-            print("Issue : i2c communication with right gyroscope lost")
-            try:
-                self.r_gyro = skt_gyro.Gyro_one_axis( \
-                            skt_gyro.Gyro_one_axis.I2C_ADDRESS_2,\
-                            'y', self.GYRO_SENSITIVITY)
-            except IOError:
-                pass
-            else:
-                print("Right gyroscope reconnected")
-                self.r_pad.gyro = self.r_gyro
-
-    def draw_game_objects(self, draw_pads = False, draw_ball = False, \
-                          draw_scores = False, draw_line = False):
-        """
-        Draws the desired game elements (pads / ball / scores)
-        Note : Each game scene do not require every single game object
-        """
-        l_score_rect = None
-        r_score_rect = None
-        l_pad_rect = None
-        r_pad_rect = None
-        ball_rect = None
-        mid_line_h_rect = None
-        mid_line_v_rect = None
-        if draw_scores == True:
-            txt_l = str(self.l_score)
-            txt_r = str(self.r_score)
-            l_score_rect = skt_tls.draw_text(self.win, self.FT_NM, \
-                           self.ft_dic["0.10"], txt_l, \
-                           self.x_dic["0.25"], self.y_dic["0.10"], \
-                           skt_cst.WHITE)
-            r_score_rect = skt_tls.draw_text(self.win, self.FT_NM, \
-                           self.ft_dic["0.10"], txt_r, \
-                           self.x_dic["0.75"], self.y_dic["0.10"], \
-                           skt_cst.WHITE)
-        if draw_pads == True:
-            l_pad_rect = self.l_pad.draw(skt_cst.WHITE)
-            r_pad_rect = self.r_pad.draw(skt_cst.WHITE)
-        if draw_ball == True:
-            ball_rect = self.ball.draw(skt_cst.WHITE)
-        if draw_line == True:
-            thick = int(self.win_w * self.MID_LINE_WIDTH_RATIO)
-            horiz_w_factor = self.CENTER_CROSS_MULTIPLIER
-            mid_line_h_rect, mid_line_v_rect = skt_tls.draw_mid_line(\
-                                               self.win, self.win_w, \
-                                               self.win_h, thick, \
-                                               horiz_w_factor, \
-                                               skt_cst.WHITE)
-
-        return l_score_rect, r_score_rect, l_pad_rect, r_pad_rect, \
-               ball_rect, mid_line_h_rect, mid_line_v_rect
-
-    def erase_game_objects(self, color, pads = True, ball = True, \
-                           scores = True):
-        """
-        Erases display of previous positions for changing game elements
-        Note : This includes both pads / ball / scores.
-        """
-        l_sc_rect = None
-        r_sc_rect = None
-        l_pad_rect = None
-        r_pad_rect = None
-        ball_rect = None
-        if scores == True:
-            txt_l = str(self.l_score)
-            txt_r = str(self.r_score)
-            max_w_txt_sc = skt_tls.get_max_w_txt(self.FT_NM, \
-                      self.ft_dic["0.10"], "1000")
-            l_sc_rect =  pygame.Rect(0, 0, max_w_txt_sc, self.ft_dic["0.10"])
-            r_sc_rect =  pygame.Rect(0, 0, max_w_txt_sc, self.ft_dic["0.10"])
-            l_sc_rect.center = (self.x_dic["0.25"], self.y_dic["0.10"])
-            r_sc_rect.center = (self.x_dic["0.75"], self.y_dic["0.10"])
-            l_sc_rect = pygame.draw.rect(self.win, color, l_sc_rect)
-            r_sc_rect = pygame.draw.rect(self.win, color, r_sc_rect)
-        if pads == True:
-            l_pad_rect = self.l_pad.draw(color)
-            r_pad_rect = self.r_pad.draw(color)
-        if ball == True:
-            ball_rect = self.ball.draw(color)
-        return l_sc_rect, r_sc_rect, l_pad_rect, r_pad_rect, ball_rect
-
-    def check_user_inputs(self, keys):
-        """
-        Check user inputs (keyboards / mouse).
-        Logic implemented with Ness controller
-        ---------------------------------------------------------------
-        Ness controller - Keyboard       - Explanation
-        Button A        - Keyboard C     - Close / Calibrate
-        Button B        - Keyboard B     - Simple mapping
-        Button Start    - Keyboard R     - Restart game / Reboot
-        Button Select   - Keyboard Space - No particular meaning
-        ---------------------------------------------------------------
-        """
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                sys.exit()
-        if keys[pygame.K_SPACE] \
-        and keys[pygame.K_b] \
-        and keys[pygame.K_r]:
-            os.system("sudo reboot") # Raspberry reboot immediately
-        elif keys[pygame.K_SPACE] \
-        and keys[pygame.K_b] \
-        and keys[pygame.K_c]:
-            os.system("shutdown now") # Raspberry shuts down immediately
-        elif keys[pygame.K_ESCAPE]:
-            sys.exit()
-        elif keys[pygame.K_c]:
-            pygame.event.clear()
-            self.game_status = skt_cst.SCENE_CALIBRATION_REQUESTED
-            # Will only have effect if return statement in game code
-        elif keys[pygame.K_r]:
-            self.game_status = skt_cst.SCENE_WAITING_PLAYERS
-            # Will only have effect if return statement in game code
-
     def detect_goal(self, goal_to_be):
         """
         Handles when goals are scored, and updates scores.
@@ -315,15 +70,19 @@ class Game():
         if self.ball.rect.left < 0:
             self.r_score += 1
             vx_dir_aft_goal = 1
+            scorer = "right"
             goal = True
         elif self.ball.rect.right > self.win_w:
             self.l_score += 1
             vx_dir_aft_goal = -1
+            scorer = "left"
             goal = True
         if goal == True:
             self.ball.reset()
             self.ball.vx = self.ball.vx_straight * vx_dir_aft_goal
             goal_to_be = False
+            self.sound.play(skt_snd.GOAL)
+            self.stats.goal(scorer, self.now())
 
         return goal_to_be
 
@@ -341,6 +100,7 @@ class Game():
                 (self.ball.rect.centery - y_mod)) / self.ball.vy))
         self.ball.rect.center = (x_mod, y_mod)
         self.ball.vy *= -1
+        self.sound.play(skt_snd.WALL)
 
     def handle_l_coll(self, goal_to_be):
         """
@@ -372,6 +132,9 @@ class Game():
                     self.ball.vx *= -1
                     self.ball.vy = vy
                 self.ball.rect.center = (x_mod, y_mod)
+                self.sound.play(skt_snd.PADDLE)
+                self.stats.hit("left", (y_mod - y_pad_mid) \
+                               / (self.l_pad.rect.h / 2))
             else:
                 goal_to_be = True
         return goal_to_be
@@ -407,6 +170,9 @@ class Game():
                     self.ball.vx *= -1
                     self.ball.vy = vy
                 self.ball.rect.center = (x_mod, y_mod)
+                self.sound.play(skt_snd.PADDLE)
+                self.stats.hit("right", (y_mod - y_pad_mid) \
+                               / (self.r_pad.rect.h / 2))
             else:
                 goal_to_be = True
         return goal_to_be
@@ -501,578 +267,658 @@ class Game():
 
         return goal_to_be
 
-    #-------------------------------------------------------------------
-    # GAME STATES
-    #-------------------------------------------------------------------
-
-    def welcome(self):
-        """
-        Displays splash screen for a certain duration at program start.
-        """
-        start_time = time.time()
-        current_time = time.time()
-
-        # Managing display:
-        """
-        Try loop added to bypass display error that occurs sometines \
-        at startup when display resolution needs to be reduced.
-        """
-        try:
-            self.win.fill(skt_cst.BLACK)
-            r = int(self.WELCOME_RADIUS_RATIO * self.win_h)
-            pygame.draw.circle(self.win, skt_cst.WHITE, \
-                            (self.x_dic["0.50"], self.y_dic["0.50"]), r)
-            txt = "SKATEPONG"
-            skt_tls.draw_text(self.win, self.FT_NM, \
-                              self.ft_dic["0.10"], txt, \
-                              self.x_dic["0.50"], self.y_dic["0.50"], \
-                              skt_cst.BLACK)
-            pygame.display.update()
-        except:
-            print ("Reinitializing display...")
-            self.win, self.win_w, self.win_h = self.create_window()
-            self.welcome()
-
-        while current_time - start_time < self.DELAY_WELCOME:
-            self.clock.tick(self.FPS)
-            # Checking requests for closing game window / rebooting/shutting down RPI:
-            # Note: Restarting game / calibrating requests have no impact
-            keys = pygame.key.get_pressed()
-            self.check_user_inputs(keys)
-            # Updating current time
-            current_time = time.time()
-        self.game_status = skt_cst.SCENE_WAITING_GYROS
-
-    def wait_gyros(self):
-        """
-        Game does not start until both skateboards are connected.
-        """
-        status = 0
-        loop_nb = 1
-        l_gyro_connected = False
-        r_gyro_connected = False
-        txt_fr_1 = "VEUILLEZ CONNECTER LA PLANCHE GAUCHE"
-        txt_en_1 = "PLEASE CONNECT LEFT SKATEBOARD"
-        txt_fr_2 = "VEUILLEZ CONNECTER LA PLANCHE DROITE"
-        txt_en_2 = "PLEASE CONNECT RIGHT SKATEBOARD"
-        txt_fr_3 = "VEUILLEZ CONNECTER LES PLANCHES"
-        txt_en_3 = "PLEASE CONNECT SKATEBOARDS"
-        max_w_txt_fr = skt_tls.get_max_w_txt(self.FT_NM, \
-                      self.ft_dic["0.10"], txt_fr_1, txt_fr_2, txt_fr_3)
-        max_w_txt_en = skt_tls.get_max_w_txt(self.FT_NM, \
-                      self.ft_dic["0.10"], txt_en_1, txt_en_2, txt_en_3)
-        # Reinitializing display:
-        self.win.fill(skt_cst.BLACK)
-
-        while not (l_gyro_connected and r_gyro_connected):
-
-            self.clock.tick(self.FPS)
-
-            l_gyro_connected = False
-            r_gyro_connected = False
-            prev_status = status
+class Game(Game_rules):
 
-            # Checking user requests :
-            # -> closing game window / rebooting / shutting down RPI
-            # Note: Restarting game / calibrating not available here
-            keys = pygame.key.get_pressed()
-            self.check_user_inputs(keys)
-
-            # Left gyro test :
-            try:
-                self.l_gyro = skt_gyro.Gyro_one_axis( \
-                              skt_gyro.Gyro_one_axis.I2C_ADDRESS_1, \
-                              'y', self.GYRO_SENSITIVITY)
-            except IOError:
-                l_gyro_connected = False
-            else:
-                l_gyro_connected = True
-            # Right gyro test :
-            try:
-                self.r_gyro = skt_gyro.Gyro_one_axis( \
-                              skt_gyro.Gyro_one_axis.I2C_ADDRESS_2, \
-                              'y', self.GYRO_SENSITIVITY)
-            except IOError:
-                r_gyro_connected = False
-            else:
-                r_gyro_connected = True
-            # Status summary :
-            if not (l_gyro_connected and r_gyro_connected):
-                if r_gyro_connected == True:
-                    status = 1
-                elif l_gyro_connected == True:
-                    status = 2
-                else:
-                    status = 3
-            # Updating display if status has changed :
-            if status != prev_status:
-                if status == 1:
-                    txt_fr = txt_fr_1
-                    txt_en = txt_en_1
-                elif status == 2:
-                    txt_fr = txt_fr_2
-                    txt_en = txt_en_2
-                elif status == 3:
-                    txt_fr = txt_fr_3
-                    txt_en = txt_en_3
-                # Black rect above max text area + new text displayed.
-                txt_fr_max_rect = pygame.Rect(0, 0, max_w_txt_fr, self.ft_dic["0.10"])
-                txt_en_max_rect = pygame.Rect(0, 0, max_w_txt_en, self.ft_dic["0.10"])
-                txt_fr_max_rect.center = (self.x_dic["0.50"], self.y_dic["0.40"])
-                txt_en_max_rect.center = (self.x_dic["0.50"], self.y_dic["0.60"])
-                txt_fr_max_rect = pygame.draw.rect(self.win, skt_cst.BLACK, txt_fr_max_rect)
-                txt_en_max_rect = pygame.draw.rect(self.win, skt_cst.BLACK, txt_en_max_rect)
-                txt_fr_rect = skt_tls.draw_text(self.win, self.FT_NM, self.ft_dic["0.10"], txt_fr, \
-                                  self.x_dic["0.50"], self.y_dic["0.40"], skt_cst.WHITE)
-                txt_en_rect = skt_tls.draw_text(self.win, self.FT_NM, self.ft_dic["0.10"], txt_en, \
-                                  self.x_dic["0.50"], self.y_dic["0.60"], skt_cst.GREY)
-                if loop_nb == 1:
-                    pygame.display.update()
-                    loop_nb += 1
-                else:
-                    pygame.display.update([txt_fr_max_rect, \
-                                           txt_en_max_rect, \
-                                           txt_fr_rect, txt_en_rect])
-
-        self.game_status = skt_cst.SCENE_WAITING_PLAYERS
-
-    def wait_players(self):
-        """
-        Standby before detection of active players on each skateboard.
-        Note : paddles active.
-        """
-        moving_time = time.time()
-        current_time = time.time()
-        status = 0
-        left_player_ready = False
-        right_player_ready = False
-        self.ball.reset()
-        loop_nb = 1
-        pygame.event.get() # Solves pad calib done twice consecutively
-
-        txt_fr_0 = "PIVOTEZ LES PLANCHES POUR DEBUTER LA PARTIE"
-        txt_en_0 = "MOVE SKATES TO START GAME"
-        txt_fr_1 = "EN ATTENTE DU JOUEUR GAUCHE"
-        txt_en_1 = "WAITING FOR LEFT PLAYER"
-        txt_fr_2 = "EN ATTENTE DU JOUEUR DROIT"
-        txt_en_2 = "WAITING FOR RIGHT PLAYER"
-        txt_fr_3 = "EN ATTENTE DES JOUEURS"
-        txt_en_3 = "WAITING FOR PLAYERS"
-
-        max_w_txt_fr = skt_tls.get_max_w_txt(self.FT_NM, \
-                      self.ft_dic["0.10"], txt_fr_1, txt_fr_2, txt_fr_3)
-        max_w_txt_en = skt_tls.get_max_w_txt(self.FT_NM, \
-                      self.ft_dic["0.10"], txt_en_1, txt_en_2, txt_en_3)
-
-        # Reinitializing display:
-        self.win.fill(skt_cst.BLACK)
-        # The message below is always displayed until players are ready:
-        txt_fr_0_rect = skt_tls.draw_text(self.win, self.FT_NM, \
-                     self.ft_dic["0.05"], txt_fr_0, self.x_dic["0.50"],\
-                     self.y_dic["0.30"], skt_cst.WHITE)
-        txt_en_0_rect = skt_tls.draw_text(self.win, self.FT_NM, \
-                     self.ft_dic["0.05"], txt_en_0, self.x_dic["0.50"],\
-                     self.y_dic["0.80"], skt_cst.GREY)
-
-        while not (left_player_ready and right_player_ready):
-
-            self.clock.tick(self.FPS)
-            prev_status = status
-
-            # Checking user requests :
-            # -> closing game window / rebooting / shutting down RPI
-            # Note: Restarting game / calibrating not available here
-            keys = pygame.key.get_pressed()
-            self.check_user_inputs(keys)
+    """
+    2 players pong game, with real skateboards as actuators.
 
-            # Reinitializing gyro if necessary (after i2c deconnection)
-            self.reinitialize_gyro_if_needed()
+    - Objective : Shoot the ball beyond the oponent's zone (+1 point).
+    - End : Game ends when a player reaches a given number of points.
+    - The two paddles are controlled independently based on the angular
+      rotation measured by the gyroscopes mounted under each skateboard.
 
-            # Going to paddles calibration scene upon user request:
-            if self.game_status == skt_cst.SCENE_CALIBRATION_REQUESTED:
-                return
+    - Games scenes :
+        WELCOME : Splash screen at application start.
+        WAITING_GYROS : Waiting that both gyroscopes are connected.
+        WAITING_PLAYERS : Waiting for motion on both skates.
+        COUNTDOWN : Countdown before the actual game starts.
+        GAME_ONGOING : Game running.
+        GAME_END : Winner is announced + pads calib before next game
+        CALIBRATION_REQUESTED : Paddles calibratation upon request.
+        ATTRACT : Demo game while nobody plays.
+        NET_PLAY : Network match, one skateboard per site (NET_PEER).
+    """
 
-            if not (left_player_ready and right_player_ready):
-                if right_player_ready == True:
-                    status = 1
-                elif left_player_ready == True:
-                    status = 2
-                else:
-                    status = 3
-            # Updating display if status has changed :
-            if status != prev_status:
-                if status == 1:
-                    txt_fr = txt_fr_1
-                    txt_en = txt_en_1
-                elif status == 2:
-                    txt_fr = txt_fr_2
-                    txt_en = txt_en_2
-                elif status == 3:
-                    txt_fr = txt_fr_3
-                    txt_en = txt_en_3
-                # Black rect above max text area + new text displayed.
-                txt_fr_max_rect = pygame.Rect(0, 0, max_w_txt_fr, self.ft_dic["0.10"])
-                txt_en_max_rect = pygame.Rect(0, 0, max_w_txt_en, self.ft_dic["0.10"])
-                txt_fr_max_rect.center = (self.x_dic["0.50"], self.y_dic["0.20"])
-                txt_en_max_rect.center = (self.x_dic["0.50"], self.y_dic["0.70"])
-                txt_fr_max_rect = pygame.draw.rect(self.win, skt_cst.BLACK, txt_fr_max_rect)
-                txt_en_max_rect = pygame.draw.rect(self.win, skt_cst.BLACK, txt_en_max_rect)
-                txt_fr_rect = skt_tls.draw_text(self.win, self.FT_NM, self.ft_dic["0.10"], txt_fr, \
-                                  self.x_dic["0.50"], self.y_dic["0.20"], skt_cst.WHITE)
-                txt_en_rect = skt_tls.draw_text(self.win, self.FT_NM, self.ft_dic["0.10"], txt_en, \
-                                  self.x_dic["0.50"], self.y_dic["0.70"], skt_cst.GREY)
-                if loop_nb == 1:
-                    pass
-                else:
-                    pygame.display.update([txt_fr_max_rect, \
-                                           txt_en_max_rect, \
-                                           txt_fr_rect, txt_en_rect])
+    #-------------------------------------------------------------------
+    # GAME PARAMETERS
+    #-------------------------------------------------------------------
 
-            # Erasing from display objects previous positions:
-            l_score_rect_old, r_score_rect_old, l_pad_rect_old, \
-            r_pad_rect_old, ball_rect_old = self.erase_game_objects( \
-                                            color = skt_cst.BLACK, \
-                                            pads = True, ball = True, \
-                                            scores = True)
-            # Moving objects:
-            vy_l_pad, l_gyro_ratio = self.l_pad.move(self.win_h)
-            vy_r_pad, r_gyro_ratio = self.r_pad.move(self.win_h)
-            # Adding to display objects new positions:
-            l_score_rect, r_score_rect, l_pad_rect, r_pad_rect, ball_rect,\
-            mid_line_h_rect, mid_line_v_rect = self.draw_game_objects(\
-                                               draw_pads = True, \
-                                               draw_ball = True, \
-                                               draw_scores = False, \
-                                               draw_line = False)
-            # Updating the necessary parts of the display:
-            if loop_nb == 1:
-                pygame.display.update()
-                loop_nb += 1
-            else:
-                pygame.display.update([l_pad_rect_old, r_pad_rect_old, \
-                                       ball_rect_old, l_pad_rect, \
-                                       r_pad_rect, ball_rect])
-            
-            if abs(l_gyro_ratio) > self.GYRO_ACTIVE_RATIO:
-                left_player_ready = True
-                moving_time = time.time()
-            if abs(r_gyro_ratio) > self.GYRO_ACTIVE_RATIO:
-                right_player_ready = True
-                moving_time = time.time()
+    # Main game parameters
+    WINNING_SCORE = 10 # Number of goals to win the game
+    BALL_ANGLE_MAX = 50 # Max angle after paddle collision (deg) [35-65]
+    RANDOM_SEED = None # Serve direction : fixed seed for replays / tests
+    # Delays
+    DELAY_WELCOME = 4 # Splash screen duration (s)
+    DELAY_INACT_PLAYER = 5 # Delay before a player becomes inactive (s)
+    DELAY_COUNTDOWN = 5 # Countdown before game starts (s)
+    DELAY_MAX_GAME_END = 15 # Delay max after game ends before calib (s)
+    DELAY_STEADY_BEF_CALIB = 3 # Duration steady skates before calib (s)
+    DELAY_ATTRACT = 30 # No player before attract mode (s), None : off
+    # Technical parameters
+    FPS = 25 # Max frames/sec (30 seems good compromise for RPI3 / RPI4)
+    FRAME_VSYNC = False # Frames aligned on screen refresh (if supported)
+    RENDERER = "software" # "software" / "texture" (GPU composed, SDL2)
+    RENDERER_DRIVER = None # SDL render driver, None : first accelerated
+    # Rendering quality lowered when game frames overrun their budget
+    QUALITY_HIGH_LOAD = 0.9 # Ratio of frame period : quality lowered
+    QUALITY_LOW_LOAD = 0.5 # Ratio of frame period : quality restored
+    GYRO_POLL_PERIOD = 0.5 # Gyros connection test period (s) when missing
+    INPUT_POLL_PERIOD = 0.1 # User inputs check period in idle scenes (s)
+    GYRO_SENSITIVITY = mpu6050.GYRO_RANGE_1000DEG
+    """
+    For GYRO_SENSITIVITY, use one of the following constants:
+    mpu6050.GYRO_RANGE_250DEG = 0x00 # +/- 125 deg/s
+    mpu6050.GYRO_RANGE_500DEG = 0x08 # +/- 250 deg/s
+    mpu6050.GYRO_RANGE_1000DEG = 0x10 # +/- 500 deg/s
+    mpu6050.GYRO_RANGE_2000DEG = 0x18 # +/- 1000 deg/s
+    """
+    # Sizes ([indicates recommended values])
+    WELCOME_RADIUS_RATIO = 0.25 # Rat. disp. h [0.1 - 0.5]
+    PAD_WIDTH_RATIO = 0.015 # Rat. disp. w [0.005 - 0.1]
+    PAD_HEIGHT_RATIO = 0.2 # Rat. disp. h [0.05 - 0.2]
+    PAD_X_OFFSET_RATIO = 0.02 # Rat. disp. w [0.01 - 0.02] frame offset
+    BALL_RADIUS_RATIO = 0.02 # Rat. min disp. w/h [0.01 - 0.04]
+    PAD_FLAT_BOUNCE_RATIO = 0.02 # Rat. disp. w [0.01 - 0.03]
+    BALL_V_RATIO = 0.035 # Rat. disp. w [0.01 - 0.04]
+    MID_LINE_WIDTH_RATIO = 0.006 # Rat. disp. w [0.005 - 0.01]
+    SCORE_Y_OFFSET_RATIO = 0.02 # Rat. disp. h - frame vertical offset
+    CENTER_CROSS_MULTIPLIER = 3 # Mid line thikness factor [2 - 5]
+    # Text fonts parameters (names and sizes)
+    FT_NM = "comicsans" # or 'quicksandmedium'. Font used for texts.
+    # Other parameters
+    GYRO_ACTIVE_RATIO = 0.07 # Rat. angular velocity / gyro sensitivity
+    GYRO_STEADY_RATIO = 0.02 # Rat. angular velocity / gyro sensitivity
+    PAD_VY_FACTOR_RPI3 = 0.70 #Factor to adjust paddle displacement
+    PAD_VY_FACTOR_RPI4 = 0.60 #Factor to adjust paddle displacement
+    # Attract mode (demo game between players, paddles moved by the AI)
+    ATTRACT_PAD_SPEED_RATIO = 0.03 # Rat. disp. h per frame
+    ATTRACT_MISS_RATIO = 0.15 # Ratio of balls missed on purpose
+    # Metrics export (Prometheus format)
+    METRICS_TEXTFILE = "/tmp/skatepong.prom" # None to disable
+    METRICS_PERIOD = 10 # Textfile refresh period (s)
+    METRICS_HTTP_PORT = None # Local HTTP port (ex: 9110), None = off
+    # Frames published in shared memory for a streamer / recorder
+    FRAME_EXPORT = None # Shared memory name (ex: "skatepong_frames")
+    # Game state sent to spectator displays (UDP), "host:port" or None
+    BROADCAST_ADDRESS = None # ex: "255.255.255.255:9120"
+    # Network play (experimental) : one skateboard per site
+    NET_PEER = None # Other site "host:port", None : local game
+    NET_PORT = 9130 # Local UDP port
+    NET_SIDE = "left" # Paddle played here : "left" (host) / "right"
+    # Sound effects (synthesized at startup, played on reserved channels)
+    SOUND_ENABLED = True
+    SOUND_BUFFER = 256 # Mixer buffer (samples) : latency 5.8 ms at 44.1kHz
+    SOUND_VOLUME = 0.5 # [0 - 1]
+    # Match statistics (SQLite, written by a background thread)
+    STATS_DB = skt_sts.DEFAULT_PATH # None to disable
+    # Profiling toggled at runtime (SIGUSR1 / keyboard Space + P)
+    PROFILE_DIR = "/tmp/skatepong_profiles"
+    PROFILE_FRAMES = 250 # Frames profiled per request
+    PROFILE_MODE = "cprofile" # "cprofile" (pstats) / "sample" (stacks)
+    # Gyroscopes offsets persisted between launches (warm start)
+    GYRO_CALIB_FILE = skt_cal.DEFAULT_PATH
+    GYRO_CALIB_MAX_AGE = 7 * 24 * 3600 # Offsets measured again after (s)
+    GYRO_BIAS_TRACKING = True # Offsets drift corrected when skates steady
+    GYRO_SOURCE = "i2c" # "i2c" (direct) / "daemon" (gyro_daemon running)
+    # Images / texts scaled and rendered once, cached on disk
+    ASSETS_CACHE_DIR = os.path.expanduser("~/.cache/skatepong")
+    SPLASH_SCREEN = "skatepong_splash_screen" # None : drawn at runtime
 
-            current_time = time.time()
 
-            if current_time - moving_time > self.DELAY_INACT_PLAYER:
-                left_player_ready = False
-                right_player_ready = False
+    def __init__(self, game_status = 0, l_score = 0, r_score = 0, \
+    full_screen = True):
+        if self.SOUND_ENABLED:
+            skt_snd.pre_init(self.SOUND_BUFFER)
+        pygame.init()
+        self.game_status = game_status
+        self.l_score = l_score
+        self.r_score = r_score
+        self.full_screen = full_screen
+        self.win, self.win_w, self.win_h = self.create_window()
+        self.pacer = skt_pac.Frame_pacer(self.FPS, self.vsync)
+        self.assets = skt_ast.Asset_manager(self.win_w, self.win_h, \
+                                           self.ASSETS_CACHE_DIR)
+        self.ft_dic = skt_tls.comp_font_sizes(self.win_h)
+        self.x_dic, self.y_dic = skt_tls.comp_common_coordinates( \
+                                 self.win_w, self.win_h)
+        self.metrics = skt_met.Metrics()
+        self.metrics_exporter = skt_met.Metrics_exporter(self.metrics, \
+                                self.METRICS_TEXTFILE, \
+                                self.METRICS_PERIOD, \
+                                self.METRICS_HTTP_PORT)
+        self.metrics_exporter.start()
+        self.governor = skt_gov.Quality_governor(1 / self.FPS, \
+                        self.QUALITY_HIGH_LOAD, self.QUALITY_LOW_LOAD, \
+                        metrics = self.metrics)
+        self.calib_store = skt_cal.Calib_store(self.GYRO_CALIB_FILE)
+        self.profiler = skt_prf.Frame_profiler(self.PROFILE_DIR, \
+                        self.PROFILE_FRAMES, self.PROFILE_MODE)
+        self.dirty = [] # Display regions to update at end of frame
+        self.pending_warm_starts = [] # Gyros reconnected during a game
+        self.frame_exporter = self.create_frame_exporter()
+        self.broadcaster = None
+        if self.BROADCAST_ADDRESS is not None:
+            self.broadcaster = skt_bct.Broadcaster( \
+                               skt_bct.parse_address(self.BROADCAST_ADDRESS))
+            self.broadcaster.start()
+        self.sound = skt_snd.Sound_effects(self.SOUND_ENABLED, \
+                                           self.SOUND_VOLUME)
+        self.stats = skt_sts.Stats_recorder(self.STATS_DB)
+        self.stats.start()
+        self.rng = random.Random(self.RANDOM_SEED)
+        self.score_items = {} # (side, score) -> text surface and rect
+        self.keys = None # Keyboard state, as of last key event
+        self.keys_held = False
+        self.scenes = skt_scn.create_scenes(self)
+        self.scene = None
 
-        self.game_status = skt_cst.SCENE_COUNTDOWN
+    #-------------------------------------------------------------------
+    # SIDE FUNCTIONS
+    #-------------------------------------------------------------------
 
-    def countdown(self):
+    def create_window(self):
         """
-        Starts a countdown before the game actually begins.
-
-        Note : paddles active.
+        Initializes game window, and adjusts size to display resolution.
         """
-        start_time = time.time()
-        current_time = time.time()
-        time_before_start = 0
-        loop_nb = 1
-
-        # Reinitializing display:
-        self.win.fill(skt_cst.BLACK)
-        max_w_txt_countdown = skt_tls.get_max_w_txt(self.FT_NM, \
-                      self.ft_dic["0.20"], "100")
-        while current_time - start_time < self.DELAY_COUNTDOWN:
-            prev_time_before_start = time_before_start
-            self.clock.tick(self.FPS)
-
-            # Checking user requests :
-            # -> closing game window / rebooting / shutting down RPI.
-            # Note: Restarting game / calibrating not available here.
-            keys = pygame.key.get_pressed()
-            self.check_user_inputs(keys)
-            # Reinitializing gyro if necessary (after i2c deconnection)
-            self.reinitialize_gyro_if_needed()
-
-            time_before_start = self.DELAY_COUNTDOWN \
-                                - int(current_time - start_time)
-
-            # Updating countdown display if needed :
-            if time_before_start != prev_time_before_start:
-                countdown_rect_erase =  pygame.Rect(0, 0, max_w_txt_countdown, self.ft_dic["0.20"])
-                countdown_rect_erase.center = (self.x_dic["0.50"], self.y_dic["0.25"])
-                countdown_rect_erase = pygame.draw.rect(self.win, skt_cst.BLACK, countdown_rect_erase)
-                txt = str(time_before_start)
-                countdown_rect = skt_tls.draw_text(self.win, self.FT_NM, self.ft_dic["0.20"], txt, \
-                                  self.x_dic["0.50"], self.y_dic["0.25"], skt_cst.WHITE)
-                if loop_nb == 1:
-                    pass
-                else:
-                    pygame.display.update([countdown_rect_erase, \
-                                           countdown_rect])
-
-            # Erasing from display objects previous positions:
-            l_score_rect_old, r_score_rect_old, l_pad_rect_old, \
-            r_pad_rect_old, ball_rect_old = self.erase_game_objects( \
-                                            color = skt_cst.BLACK, \
-                                            pads = True, \
-                                            ball = True, \
-                                            scores = False)
-            # Moving objects:
-            vy_l_pad, l_gyro_ratio = self.l_pad.move(self.win_h)
-            vy_r_pad, r_gyro_ratio = self.r_pad.move(self.win_h)
-            # Adding to display objects new positions:
-            l_score_rect, r_score_rect, l_pad_rect, r_pad_rect, ball_rect, \
-            mid_line_h_rect, mid_line_v_rect = self.draw_game_objects( \
-                                               draw_pads = True, \
-                                               draw_ball = True, \
-                                               draw_scores = False, \
-                                               draw_line = False)
-            # Updating the necessary parts of the display:
-            if loop_nb == 1:
-                pygame.display.update()
-                loop_nb += 1
-            else:
-                pygame.display.update([l_pad_rect_old, r_pad_rect_old, \
-                                       ball_rect_old, l_pad_rect, \
-                                       r_pad_rect, ball_rect])
-
-            current_time = time.time()
+        disp_w = pygame.display.Info().current_w # Disp. width (px)
+        disp_h = pygame.display.Info().current_h # Disp. height (px)
+        logger.info("Display resolution : %s %s", disp_w, disp_h)
+        # Getting raspberry pi HW version (through cpu revision)
+        cpu_rev = skt_tls.get_cpu_revision()
+        rpi_4b = skt_tls.is_rpi_4b(cpu_rev)
+        # Adjusting game resolution and paddle displacement factor
+        # (a little different due to different game speed with RPI3/4)
+        if rpi_4b == True:
+            self.pad_vy_factor = self.PAD_VY_FACTOR_RPI4
+            pass
+        # If RPI HW < Mod 4B, game resolution reduc. to avoid lags
+        else:
+            self.pad_vy_factor = self.PAD_VY_FACTOR_RPI3
+            # Most commom resolution for TV: 1920 x 1080
+            if disp_w == 1920 and disp_h == 1080:
+                logger.info("Game resolution reduced vs display " \
+                "resolution for better performances on RPI 3 Model B+")
+                disp_w = 1280
+                disp_h = 720
+            # If other wide reso, adjust h to keep A/R with w = 1280
+            elif disp_w > 1280:
+                logger.info("Game resolution reduced vs display " \
+                "resolution for better performances on RPI 3 Model B+")
+                disp_h = 1280 * disp_h / disp_w
+                disp_w = 1280
+        if self.full_screen == False:
+            win = self.set_mode([disp_w, disp_h - 100])
+        else:
+            win = self.set_mode([disp_w, disp_h], full_screen = True)
+        time.sleep(1/2) # Introduced after some failure at game init.
+        win_w , win_h = win.get_size()
+        logger.info("Game resolution : %s %s", win_w, win_h)
+        return win, win_w, win_h
 
-        self.game_status = skt_cst.SCENE_GAME_ONGOING
+    def set_mode(self, size, full_screen = False):
+        """
+        Creates the renderer (RENDERER, software one as fallback) and
+        returns the surface drawn by the scenes, vsync enabled if
+        requested.
+        Note : vsync requires a scaled window, not available everywhere.
+        """
+        if getattr(self, "renderer", None) is not None:
+            self.renderer.close()
+        self.renderer = skt_rnd.create_renderer(self.RENDERER, size, \
+                        full_screen, self.FRAME_VSYNC, "Skatepong", \
+                        self.RENDERER_DRIVER)
+        self.vsync = self.renderer.vsync
+        return self.renderer.surface
+
+    def create_frame_exporter(self):
+        """
+        Returns the shared memory frame exporter (None if disabled),
+        removed from shared memory at exit.
+        Note : window surface frames only (software renderer).
+        """
+        if self.FRAME_EXPORT is None:
+            return None
+        if self.renderer.SPRITES:
+            logger.warning("Frame export requires the software renderer")
+            return None
+        frame_exporter = skt_fex.Frame_exporter(self.win, self.FRAME_EXPORT)
+        atexit.register(frame_exporter.close)
+        return frame_exporter
+
+    def now(self):
+        """
+        Time source of the scenes timers (s, monotonic).
+        """
+        return skt_pac.now()
+
+    def tick(self, precise = True):
+        """
+        Waits for the next frame and records frame / sensor metrics.
+        precise : frame started exactly on time (moving ball).
+        """
+        nb_missed = self.pacer.nb_missed
+        frame_ms = self.pacer.wait(precise)
+        scene = skt_cst.SCENE_NAMES[self.game_status]
+        skt_log.CONTEXT["scene"] = scene
+        self.metrics.frame_time.observe(scene, frame_ms / 1000)
+        self.metrics.fps.set(scene, self.pacer.fps())
+        if self.pacer.nb_missed > nb_missed:
+            self.metrics.missed_frames.inc(scene, \
+                                           self.pacer.nb_missed - nb_missed)
+        self.record_gyro_latency(getattr(self, "l_gyro", None), "left")
+        self.record_gyro_latency(getattr(self, "r_gyro", None), "right")
+        return frame_ms
+
+    def wait_input(self, timeout):
+        """
+        Idle scenes : sleeps until a user input or timeout (s) occurs.
+        Events are checked every INPUT_POLL_PERIOD, left in the queue
+        for check_user_inputs(). Note : not pygame.event.wait(), which
+        polls every ms with the SDL drivers without native wait.
+        """
+        skt_log.CONTEXT["scene"] = skt_cst.SCENE_NAMES[self.game_status]
+        end = time.monotonic() + timeout
+        while True:
+            pygame.event.pump()
+            if pygame.event.peek((pygame.KEYDOWN, pygame.QUIT)):
+                break
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, self.INPUT_POLL_PERIOD))
+        self.pacer.reset() # Frame timing restarts from the wake up
+
+    def record_gyro_latency(self, gyro, sensor):
+        """
+        Records the duration of the last gyroscope read (if any).
+        """
+        if gyro is not None and gyro.read_latency is not None:
+            self.metrics.read_latency.observe(sensor, gyro.read_latency)
+            gyro.read_latency = None
 
-    def game_ongoing(self):
+    def create_game_elements(self):
         """
-        Controls the game itself.
+        Creates game objects at program start.
+        - Paddles centered vertically.
+        - Ball centered horizontally and vertically.
         """
-        loop_nb = 1
-        self.l_score = 0
-        self.r_score = 0
-        goal_to_be = False
-        random_number = random.randint(1, 2)
-
-        # Reinitializing display:
-        self.win.fill(skt_cst.BLACK)
-
-        # Determining ball direction at start.
-        if random_number == 1:
-            self.ball.vx =  self.ball.vx_straight # To the right
+        pad_w, pad_h, ball_r, ball_vx_straight = self.comp_elem_sizes()
+        l_pad_x =  int(self.win_w * self.PAD_X_OFFSET_RATIO)
+        r_pad_x = self.win_w - int(self.PAD_X_OFFSET_RATIO*self.win_w) \
+                  - pad_w
+        pad_y = (self.win_h - pad_h) // 2
+        self.l_pad = skt_obj.Paddle(self.win, self.win_h, l_pad_x, \
+                     pad_y, pad_w, pad_h, skt_cst.WHITE, self.l_gyro, \
+                     self.pad_vy_factor, self.FPS)
+        self.r_pad = skt_obj.Paddle(self.win, self.win_h, r_pad_x, \
+                     pad_y, pad_w, pad_h, skt_cst.WHITE, self.r_gyro, \
+                     self.pad_vy_factor, self.FPS)
+        self.ball = skt_obj.Ball(self.win, self.x_dic["0.50"], \
+                                self.y_dic["0.50"], ball_r, \
+                                skt_cst.WHITE, ball_vx_straight, 0, 0)
+        self.mid_line_rects = skt_tls.comp_mid_line_rects(self.win_w, \
+                              self.win_h, \
+                              int(self.win_w * self.MID_LINE_WIDTH_RATIO), \
+                              self.CENTER_CROSS_MULTIPLIER)
+        self.sprites = None
+        if self.renderer.SPRITES:
+            self.sprites = self.create_sprites()
+
+    def create_sprites(self):
+        """
+        Ball / paddles drawn once, as sprites of the renderer (composed
+        at each frame instead of drawn on the display surface).
+        Returns the ball, left paddle and right paddle sprites.
+        """
+        ball = self.ball
+        surf = pygame.Surface(ball.rect.size)
+        pygame.draw.circle(surf, skt_cst.WHITE, (ball.r, ball.r), ball.r)
+        ball_sprite = self.renderer.sprite(surf)
+        surf = pygame.Surface(self.l_pad.rect.size)
+        surf.fill(skt_cst.WHITE)
+        pad_sprite = self.renderer.sprite(surf)
+        return (ball_sprite, pad_sprite, pad_sprite)
+
+    def create_gyro(self, address):
+        """
+        Creates a gyroscope object (IOError raised if not connected).
+        """
+        if self.GYRO_SOURCE == "daemon":
+            gyro = skt_gdm.Shm_gyro(address, 'y')
         else:
-            self.ball.vx =  -self.ball.vx_straight # To the left
-
-        while self.l_score < self.WINNING_SCORE \
-        and self.r_score < self.WINNING_SCORE:
-
-            self.clock.tick(self.FPS)
-            # Checking user requests :
-            # -> closing game window / rebooting / shutting down RPI.
-            # -> Restarting game / calibrating available here.
-            keys = pygame.key.get_pressed()
-            self.check_user_inputs(keys)
-
-            # Going to paddles calibration scene upon user request:
-            if self.game_status == skt_cst.SCENE_CALIBRATION_REQUESTED \
-            or self.game_status == skt_cst.SCENE_WAITING_PLAYERS:
-                return
-
-            # Reinitializing gyro if necessary (after i2c deconnection)
-            self.reinitialize_gyro_if_needed()
-
-            # Erasing from display objects previous positions:
-            l_score_rect_old, r_score_rect_old, l_pad_rect_old, \
-            r_pad_rect_old, ball_rect_old = self.erase_game_objects(\
-                                            color = skt_cst.BLACK, \
-                                            pads = True, \
-                                            ball = True, \
-                                            scores = True)
-            # Moving objects:
-            vy_l_pad, l_gyro_ratio = self.l_pad.move(self.win_h)
-            vy_r_pad, r_gyro_ratio = self.r_pad.move(self.win_h)
-            self.ball.move()
-            goal_to_be = self.handle_collision(goal_to_be)
-            goal_to_be = self.detect_goal(goal_to_be)
-            # Adding to display objects new positions:
-            l_score_rect, r_score_rect, l_pad_rect, r_pad_rect, ball_rect, \
-            mid_line_h_rect, mid_line_v_rect = self.draw_game_objects( \
-                                               draw_pads = True, \
-                                               draw_ball = True, \
-                                               draw_scores = True, \
-                                               draw_line = True)
-            if loop_nb == 1:
-                pygame.display.update()
-            else:
-                pygame.display.update([l_pad_rect_old, r_pad_rect_old,\
-                        ball_rect_old, l_score_rect_old, \
-                        r_score_rect_old, l_pad_rect, r_pad_rect, \
-                        ball_rect, l_score_rect, r_score_rect, \
-                        mid_line_h_rect, mid_line_v_rect])
-
-            if self.l_score >= self.WINNING_SCORE \
-            or self.r_score >= self.WINNING_SCORE:
-                self.game_status = skt_cst.SCENE_GAME_END
-                return
+            gyro = skt_gyro.Gyro_one_axis(address, 'y', \
+                                          self.GYRO_SENSITIVITY)
+            # Low-pass filter / sample rate chosen by 'gyro tune'
+            gyro.apply_filter_settings(self.calib_store)
+        if self.GYRO_BIAS_TRACKING:
+            gyro.enable_bias_tracking(self.GYRO_STEADY_RATIO)
+        return gyro
+
+    def connect_gyro(self, address):
+        """
+        Creates a gyroscope (create_gyro) whose i2c errors are counted
+        (IOError raised if not connected).
+        """
+        gyro = self.create_gyro(address)
+        if address == skt_gyro.Gyro_one_axis.I2C_ADDRESS_1:
+            gyro.on_error = lambda err: self.gyro_lost("left", err)
+        else:
+            gyro.on_error = lambda err: self.gyro_lost("right", err)
+        return gyro
 
-    def game_end(self):
+    def gyro_lost(self, sensor, err):
         """
-        Announces winner + calib. pads once steady skates bef. next game.
-        Invites players to get down from skateboards before calibration.
-        Note : paddles active.
+        Counts / logs an i2c error once per gyroscope lost (then
+        recreated by reinitialize_gyro_if_needed).
         """
-        start_time = time.time()
-        current_time = time.time()
-        moving_time = time.time()
-        self.ball.reset()
-        loop_nb = 1
-
-        # Reinitializing display:
-        self.win.fill(skt_cst.BLACK)
+        logger.warning("Issue : i2c communication with %s gyroscope lost", \
+                       sensor, extra = {"sensor" : sensor, \
+                                        "error" : repr(err)})
+        self.metrics.i2c_errors.inc(sensor)
 
-        if (self.l_score == self.WINNING_SCORE):
-            txt_fr = "VICTOIRE DU JOUEUR DE GAUCHE"
-            txt_en = "LEFT PLAYER WON"
-        else:
-            txt_fr = "VICTOIRE DU JOUEUR DE DROITE"
-            txt_en = "RIGHT PLAYER WON"
-        
-        txt_fr_2 = "CALIBRATION A VENIR - MERCI DE DESCENDRE DES PLANCHES"
-        txt_en_2 = "CALIBRATION PENDING - PLEASE GET DOWN FROM SKATEBOARDS"
-
-        # Displaying winner and to get down from skates for calibration:
-        txt_fr_rect = skt_tls.draw_text(self.win, self.FT_NM, self.ft_dic["0.10"], txt_fr, \
-                              self.x_dic["0.50"], self.y_dic["0.25"], skt_cst.WHITE)
-        txt_en_rect = skt_tls.draw_text(self.win, self.FT_NM, self.ft_dic["0.10"], txt_en, \
-                              self.x_dic["0.50"], self.y_dic["0.65"], skt_cst.GREY)
-
-        txt_fr_2_rect = skt_tls.draw_text(self.win, self.FT_NM, self.ft_dic["0.05"], \
-                          txt_fr_2, self.x_dic["0.50"], self.y_dic["0.35"], skt_cst.WHITE)
-        txt_en_2_rect = skt_tls.draw_text(self.win, self.FT_NM, self.ft_dic["0.05"], \
-                          txt_en_2, self.x_dic["0.50"], self.y_dic["0.75"], skt_cst.GREY)
+    def warm_start_gyro(self, gyro):
+        """
+        Restores persisted gyro offset (measured again if not valid).
+        """
+        try:
+            gyro.warm_start(self.calib_store, self.GYRO_CALIB_MAX_AGE)
+        except IOError as err:
+            gyro.set_error(err)
 
-        # This scene will only exit once both skates are steady for a
-        # few seconds or that a maximum time has gone.
-        # Once one of the 2 conditions is fulfilled, pads calib. is done
-        while ((current_time - start_time < self.DELAY_MAX_GAME_END)
-        and (current_time - moving_time < self.DELAY_STEADY_BEF_CALIB)):
+    def resume_gyro(self, gyro, lost_gyro):
+        """
+        Reconnected gyroscope : offset of the lost one kept, warm start
+        (sensor read for a while) deferred out of the game frames.
+        """
+        gyro.offset = lost_gyro.offset
+        gyro.noise = lost_gyro.noise
+        gyro.offset_time = lost_gyro.offset_time
+        self.pending_warm_starts.append(gyro)
 
-            self.clock.tick(self.FPS)
+    def run_pending_warm_starts(self):
+        """
+        Warm start of the gyroscopes reconnected during a game (called
+        by the scenes where no game is running).
+        """
+        for gyro in self.pending_warm_starts:
+            if (gyro is self.l_gyro or gyro is self.r_gyro) \
+            and not gyro.error:
+                self.warm_start_gyro(gyro)
+        self.pending_warm_starts.clear()
 
-            # Checking user requests :
-            # -> closing game window / rebooting / shutting down RPI.
-            # -> Restarting game / calibrating not available here.
-            keys = pygame.key.get_pressed()
-            self.check_user_inputs(keys)
+    def save_tracked_offsets(self):
+        """
+        Persists gyro offsets corrected by online tracking (if any).
+        """
+        for gyro in (self.l_gyro, self.r_gyro):
+            tracker = gyro.bias_tracker
+            if gyro.error or tracker is None or tracker.nb_updates == 0:
+                continue
+            tracker.nb_updates = 0
+            gyro.offset_time = time.time()
+            gyro.save_calib(self.calib_store)
 
-            # Reinitializing gyro if necessary (after i2c deconnection)
-            self.reinitialize_gyro_if_needed()
+    def reinitialize_gyro_if_needed(self, left = True, right = True):
+        """
+        Recreates gyroscopes objects following deconnections.
+        left / right : gyroscopes checked (network play : local one).
+        """
+        if left and self.l_gyro.error:
+            self.metrics.reconnect_attempts.inc("left")
+            lost_gyro = self.l_gyro
+            try:
+                self.l_gyro = self.connect_gyro( \
+                              skt_gyro.Gyro_one_axis.I2C_ADDRESS_1)
+            except IOError as err:
+                self.l_gyro.last_error = err
+            else:
+                logger.info("Left gyroscope reconnected", \
+                            extra = {"sensor" : "left"})
+                self.resume_gyro(self.l_gyro, lost_gyro)
+                self.metrics.reconnects.inc("left")
+                self.l_pad.gyro = self.l_gyro
+        if right and self.r_gyro.error:
+            self.metrics.reconnect_attempts.inc("right")
+            lost_gyro = self.r_gyro
+            try:
+                self.r_gyro = self.connect_gyro( \
+                              skt_gyro.Gyro_one_axis.I2C_ADDRESS_2)
+            except IOError as err:
+                self.r_gyro.last_error = err
+            else:
+                logger.info("Right gyroscope reconnected", \
+                            extra = {"sensor" : "right"})
+                self.resume_gyro(self.r_gyro, lost_gyro)
+                self.metrics.reconnects.inc("right")
+                self.r_pad.gyro = self.r_gyro
 
-            # Erasing from display objects previous positions:
-            l_score_rect_old, r_score_rect_old, l_pad_rect_old, \
-            r_pad_rect_old, ball_rect_old = self.erase_game_objects(\
-                                            color = skt_cst.BLACK, \
-                                            pads = True, \
-                                            ball = False, \
-                                            scores = False)
+    def score_item(self, side, score):
+        """
+        Returns the score text surface and rect (rendered once).
+        side : 0 (left) / 1 (right).
+        """
+        key = (side, score)
+        item = self.score_items.get(key)
+        if item is None:
+            x = self.x_dic["0.75"] if side else self.x_dic["0.25"]
+            surf = self.assets.text(self.FT_NM, self.ft_dic["0.10"], \
+                                    str(score), skt_cst.WHITE)
+            item = (surf, surf.get_rect(center = (x, self.y_dic["0.10"])))
+            self.score_items[key] = item
+        return item
 
-            vy_l_pad, l_gyro_ratio = self.l_pad.move(self.win_h)
-            vy_r_pad, r_gyro_ratio = self.r_pad.move(self.win_h)
+    def draw_game_objects(self, rects, draw_pads = False, \
+                          draw_ball = False, draw_scores = False, \
+                          draw_line = False):
+        """
+        Draws the desired game elements (pads / ball / scores)
+        Note : Each game scene do not require every single game object
 
-            # Adding to display objects new positions:
-            l_score_rect, r_score_rect, l_pad_rect, r_pad_rect, ball_rect, \
-            mid_line_h_rect, mid_line_v_rect = self.draw_game_objects( \
-                                               draw_pads = True, \
-                                               draw_ball = True, \
-                                               draw_scores = True, \
-                                               draw_line = False)
-            if loop_nb == 1:
-                pygame.display.update()
-                loop_nb += 1
+        The rects drawn are stored in rects (list reused every frame) :
+        left score / right score / left pad / right pad / ball / mid line
+        horizontal / mid line vertical. Other items are left unchanged.
+        Note : rects stored are never modified afterwards.
+        Note : with a texture renderer, pads / ball are sprites composed
+        by the renderer (not drawn on the window surface).
+        """
+        win = self.win
+        if draw_scores == True:
+            surf, rect = self.score_item(0, self.l_score)
+            win.blit(surf, rect)
+            rects[0] = rect
+            surf, rect = self.score_item(1, self.r_score)
+            win.blit(surf, rect)
+            rects[1] = rect
+        sprites = self.sprites
+        if draw_pads == True:
+            if sprites is None:
+                rects[2] = self.l_pad.draw(skt_cst.WHITE)
+                rects[3] = self.r_pad.draw(skt_cst.WHITE)
             else:
-                pygame.display.update([l_pad_rect_old, r_pad_rect_old, \
-                        l_pad_rect, r_pad_rect])
-
-            if (abs(l_gyro_ratio) > self.GYRO_STEADY_RATIO
-            or abs(r_gyro_ratio) > self.GYRO_STEADY_RATIO):
-                moving_time = time.time()
-            
-            current_time = time.time()
-            
-         # Paddles repositioned in the center of the screen:
-        self.l_pad.move_to_center(self.win_h)
-        self.r_pad.move_to_center(self.win_h)   
-        self.game_status = skt_cst.SCENE_WAITING_PLAYERS
+                rects[2] = self.renderer.draw_sprite(1, sprites[1], \
+                                                     self.l_pad.rect)
+                rects[3] = self.renderer.draw_sprite(2, sprites[2], \
+                                                     self.r_pad.rect)
+        if draw_ball == True:
+            if sprites is None:
+                rects[4] = self.ball.draw(skt_cst.WHITE)
+            else:
+                rects[4] = self.renderer.draw_sprite(0, sprites[0], \
+                                                     self.ball.rect)
+        if draw_line == True:
+            win.fill(skt_cst.WHITE, self.mid_line_rects[0])
+            win.fill(skt_cst.WHITE, self.mid_line_rects[1])
+            rects[5] = self.mid_line_rects[0]
+            rects[6] = self.mid_line_rects[1]
 
-    def calibrate_pads(self):
+    def check_user_inputs(self, keys):
         """
-        Handles the paddles calibration + offset measurement
-
-        Notes : 
-        - No warning indication before calibration is actually started.
-        - Displays that calibration is ongoing.
-        - Going back to the scene "waiting for players".
+        Check user inputs (keyboards / mouse).
+        Logic implemented with Ness controller
+        ---------------------------------------------------------------
+        Ness controller - Keyboard       - Explanation
+        Button A        - Keyboard C     - Close / Calibrate
+        Button B        - Keyboard B     - Simple mapping
+        Button Start    - Keyboard R     - Restart game / Reboot
+        Button Select   - Keyboard Space - No particular meaning
+        -               - Space + P      - Start / stop profiling
+        ---------------------------------------------------------------
+        Returns the scene requested (restart / calibrate), else None.
         """
-        self.ball.reset()
-        self.clock.tick(self.FPS)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                sys.exit()
+            # On key press only (not repeated while held)
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_p \
+            and keys[pygame.K_SPACE]:
+                self.profiler.toggle()
+        if keys[pygame.K_SPACE] \
+        and keys[pygame.K_b] \
+        and keys[pygame.K_r]:
+            os.system("sudo reboot") # Raspberry reboot immediately
+        elif keys[pygame.K_SPACE] \
+        and keys[pygame.K_b] \
+        and keys[pygame.K_c]:
+            os.system("shutdown now") # Raspberry shuts down immediately
+        elif keys[pygame.K_ESCAPE]:
+            sys.exit()
+        elif keys[pygame.K_c]:
+            pygame.event.clear()
+            return skt_cst.SCENE_CALIBRATION_REQUESTED
+        elif keys[pygame.K_r]:
+            return skt_cst.SCENE_WAITING_PLAYERS
+        return None
 
-        # Reinitializing display:
+    def draw_splash_screen(self):
+        """
+        Draws the splash screen image (drawn at runtime if not found).
+        """
+        if self.SPLASH_SCREEN is not None:
+            try:
+                self.win.blit(self.assets.image(self.SPLASH_SCREEN), (0, 0))
+                return
+            except (FileNotFoundError, pygame.error) as err:
+                logger.warning("Splash screen image not available", \
+                               extra = {"error" : repr(err)})
         self.win.fill(skt_cst.BLACK)
+        r = int(self.WELCOME_RADIUS_RATIO * self.win_h)
+        pygame.draw.circle(self.win, skt_cst.WHITE, \
+                        (self.x_dic["0.50"], self.y_dic["0.50"]), r)
+        txt = "SKATEPONG"
+        self.assets.draw_text(self.win, self.FT_NM, \
+                              self.ft_dic["0.10"], txt, \
+                              self.x_dic["0.50"], self.y_dic["0.50"], \
+                              skt_cst.BLACK)
 
-        # Displaying that calibration is ongoing:
-        txt_fr_1 = "CALIBRATION EN COURS"
-        txt_en_1 = "CALIBRATION ONGOING"
-        txt_fr_2 = "MAINTENIR LES PLANCHES IMMOBILES EN POSITION NEUTRE"
-        txt_en_2 = "GET SKATES STEADY IN THEIR NEUTRAL POSITIONS"
+    #-------------------------------------------------------------------
+    # GAME SCENES
+    #-------------------------------------------------------------------
 
-        txt_fr_2_rect = skt_tls.draw_text(self.win, self.FT_NM, self.ft_dic["0.05"], \
-                          txt_fr_2, self.x_dic["0.50"], self.y_dic["0.30"], skt_cst.WHITE)
-        txt_en_2_rect = skt_tls.draw_text(self.win, self.FT_NM, self.ft_dic["0.05"], \
-                          txt_en_2, self.x_dic["0.50"], self.y_dic["0.80"], skt_cst.GREY)
-        txt_fr_1_rect = skt_tls.draw_text(self.win, self.FT_NM, self.ft_dic["0.10"], \
-                          txt_fr_1, self.x_dic["0.50"], self.y_dic["0.20"], skt_cst.WHITE)
-        txt_en_1_rect = skt_tls.draw_text(self.win, self.FT_NM, self.ft_dic["0.10"], \
-                          txt_en_1, self.x_dic["0.50"], self.y_dic["0.70"], skt_cst.GREY)
+    def invalidate(self, *rects):
+        """
+        Adds display regions to copy to the screen at end of frame.
+        """
+        for rect in rects:
+            if rect is not None:
+                self.dirty.append(rect)
 
-        # Adding to display objects new positions:
-        l_score_rect, r_score_rect, l_pad_rect, r_pad_rect, ball_rect, \
-        mid_line_h_rect, mid_line_v_rect = self.draw_game_objects( \
-                                           draw_pads = True, \
-                                           draw_ball = True, \
-                                           draw_scores = False, \
-                                           draw_line = False)
-                                           
-        pygame.display.update()
+    def erase(self, *rects):
+        """
+        Erases display regions (background color).
+        """
+        for rect in rects:
+            if rect is not None:
+                self.win.fill(skt_cst.BLACK, rect)
+                self.dirty.append(rect)
 
-        # Gyroscope offset measurement:
-        try:
-            self.l_gyro.offset = self.l_gyro.measure_gyro_offset()
-        except IOError:
-            self.l_gyro.error = True
-        try:
-            self.r_gyro.offset = self.r_gyro.measure_gyro_offset()
-        except IOError:
-            self.r_gyro.error = True
+    def update_display(self):
+        """
+        Copies the invalidated regions to the screen (if any).
+        """
+        if self.dirty:
+            self.renderer.present(self.dirty)
+            if self.frame_exporter is not None:
+                self.frame_exporter.publish(self.win, self.dirty)
+            self.dirty.clear()
 
-        # Erasing from display objects previous positions:
-        l_score_rect_old, r_score_rect_old, l_pad_rect_old, \
-        r_pad_rect_old, ball_rect_old = self.erase_game_objects( \
-                                        color = skt_cst.BLACK, \
-                                        pads = True, \
-                                        ball = True, \
-                                        scores = False)
+    def switch_scene(self):
+        """
+        Leaves the current scene and enters the requested one.
+        Note : both are drawn in the same frame (single display update).
+        """
+        if self.scene is not None:
+            self.scene.exit()
+        self.scene = self.scenes[self.game_status]
+        skt_log.CONTEXT["scene"] = skt_cst.SCENE_NAMES[self.game_status]
+        self.scene.enter()
 
-        # Paddles calibration:
-        self.l_pad.move_to_center(self.win_h)
-        self.r_pad.move_to_center(self.win_h)
+    def step(self):
+        """
+        Runs one frame of the current scene.
+        """
+        if self.scene is None or self.scene.SCENE_ID != self.game_status:
+            self.switch_scene()
+        scene = self.scene
+        self.profiler.frame(skt_cst.SCENE_NAMES[scene.SCENE_ID])
+        scene.wait()
+        start = self.now()
+        # Checking user requests :
+        # -> closing game window / rebooting / shutting down RPI.
+        # -> Restarting game / calibrating, if available in the scene.
+        request = self.check_user_inputs(self.pressed_keys())
+        if request in scene.REQUESTS:
+            self.game_status = request
+            return
+        scene.update()
+        scene.render()
+        if self.broadcaster is not None:
+            self.broadcaster.publish(self)
+        if not scene.GOVERNED:
+            self.update_display()
+            return
+        # Regions kept for next update when this one is skipped
+        if not self.governor.skip_display_update(self.pacer.nb_frames):
+            self.update_display()
+        self.governor.observe(self.now() - start)
 
-        # Adding to display objects new positions:
-        l_score_rect, r_score_rect, l_pad_rect, r_pad_rect, ball_rect, mid_line_h_rect, mid_line_v_rect = \
-        self.draw_game_objects(draw_pads = True, draw_ball = True, \
-                               draw_scores = False, draw_line = False)
+    def pressed_keys(self):
+        """
+        Returns the keyboard state, read again only on key events or
+        while a key is held (get_pressed creates a 512 keys tuple).
+        Note : a key held is read every frame, its release is not
+        missed if the event is consumed elsewhere.
+        """
+        if self.keys is None or self.keys_held \
+        or pygame.event.peek((pygame.KEYDOWN, pygame.KEYUP)):
+            self.keys = pygame.key.get_pressed()
+            self.keys_held = any(self.keys)
+        return self.keys
 
-        pygame.display.update([l_pad_rect_old, r_pad_rect_old, \
-                                   l_pad_rect, r_pad_rect])
+    def run(self):
+        """
+        Runs the game scenes until the program is stopped.
+        """
+        while True:
+            self.step()
 
-        self.game_status = skt_cst.SCENE_WAITING_PLAYERS
+    def run_scene(self, scene_id):
+        """
+        Runs the given scene until it requests another one.
+        """
+        self.game_status = scene_id
+        self.step()
+        while self.game_status == scene_id:
+            self.step()
 
 if __name__ == '__main__':
     pass
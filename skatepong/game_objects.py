@@ -18,6 +18,11 @@ class Ball():
     """
     Defines the ball for skatepong game.
     """
+    # No instance dict : smaller objects, faster attributes access
+    __slots__ = ("win", "original_x", "original_y", "color", "r", \
+                 "vx_straight", "vx", "original_vx", "vy", "original_vy", \
+                 "rect")
+
     def __init__(self, win, x, y, r, color, vx_straight, vx = 0, vy=0):
         self.win = win
         self.original_x = x # Ball center on the x axis
@@ -57,7 +62,17 @@ class Paddle():
     Defines the paddles properties for skatepong game.
     """
 
-    def __init__(self, win, win_h, x, y, w, h, color, gyro, vy_factor):
+    # Skate considered steady under this ratio (angular rot. / sensitiv.)
+    GYRO_RATIO_FILTER = 0.005
+    # Max integration step (s) : avoids jumps after a stalled scene
+    MAX_DT = 0.1
+    # No instance dict : smaller objects, faster attributes access
+    __slots__ = ("win", "win_h", "x", "original_x", "y", "original_y", \
+                 "w", "h", "color", "gyro", "rect", "vy_factor", "ref_fps",\
+                 "prev_gyro", "prev_t", "prev_rate", "travel_rem")
+
+    def __init__(self, win, win_h, x, y, w, h, color, gyro, vy_factor, \
+                 ref_fps = 25):
         self.win = win # Surface to draw
         self.win_h = win_h # Surface height (px)
         self.x = self.original_x = x # Top left - horizontal axis
@@ -68,6 +83,14 @@ class Paddle():
         self.gyro = gyro # Gyroscope controlling paddle displacement
         self.rect = pygame.Rect(x, y, w, h) # Rect for positionning
         self.vy_factor = vy_factor
+        # Paddle displacement was tuned for 1 gyro sample per frame at
+        # ref_fps: travel = rate / sensitivity * win_h * vy_factor / frame
+        self.ref_fps = ref_fps
+        # Rate integration state
+        self.prev_gyro = None # Gyroscope of the previous sample
+        self.prev_t = None # Previous sample timestamp (s)
+        self.prev_rate = 0 # Previous sample calibrated rate (deg/s)
+        self.travel_rem = 0 # Sub-pixel travel carried to next frame
 
     def draw(self, color):
         """
@@ -79,28 +102,61 @@ class Paddle():
     def compute_pad_velocity(self):
         """
         Converts gyro angular rot. into pad displacement ignoring walls.
-        """
-        gyro_ratio_filter = 0.005 # Skate considered steady under this ratio.
 
+        The angular rate is integrated (trapezoidal rule) over the real
+        time elapsed between samples, so the paddle travel for a given
+        board rotation does not depend on frame pacing.
+        """
         # Handling gyroscope i2c deconnection
         try:
-            gyro_raw = self.gyro.get_data()
-        except IOError:
-            self.gyro.error = True
-            vy = 0
-            gyro_ratio = 0
-        # Computing pad velocity if gyroscope is connected
-        else:
+            samples = self.gyro.get_samples()
+        except IOError as err:
+            self.gyro.set_error(err)
+            self.prev_gyro = None
+            return 0, 0
+        sensitivity = self.gyro.numerical_sensitivity
+        angle = 0 # Board rotation since previous frame (deg)
+        gyro_ratio = 0
+        for t, gyro_raw in samples:
+            self.gyro.track_bias(t, gyro_raw)
             gyro_calib = gyro_raw - self.gyro.offset
-            gyro_ratio = gyro_calib / self.gyro.numerical_sensitivity
-            if abs(gyro_ratio) > gyro_ratio_filter:
-                # vy => Negative sign added to have correct pad \
-                # displacement based on physical installation on skateboards
-                vy = - int(gyro_ratio * self.win_h * self.vy_factor)
+            gyro_ratio = gyro_calib / sensitivity
+            if abs(gyro_ratio) <= self.GYRO_RATIO_FILTER:
+                gyro_calib = 0
+            # First sample (or new gyro) : nominal frame duration
+            if self.prev_gyro is not self.gyro:
+                self.prev_gyro = self.gyro
+                self.prev_rate = gyro_calib
+                dt = 1 / self.ref_fps
             else:
-                vy = 0    
+                dt = min(max(t - self.prev_t, 0), self.MAX_DT)
+            angle += (self.prev_rate + gyro_calib) / 2 * dt
+            self.prev_t = t
+            self.prev_rate = gyro_calib
+        # vy => Negative sign added to have correct pad \
+        # displacement based on physical installation on skateboards
+        travel = - angle / sensitivity * self.win_h * self.vy_factor \
+                 * self.ref_fps + self.travel_rem
+        vy = int(travel)
+        self.travel_rem = travel - vy
         return vy, gyro_ratio
 
+    def read_gyro_ratio(self):
+        """
+        Returns the last gyro ratio (angular rot. / sensitivity), without
+        moving the paddle : rate integration and offset tracking are not
+        updated (samples read are dropped).
+        """
+        try:
+            samples = self.gyro.get_samples()
+        except IOError as err:
+            self.gyro.set_error(err)
+            return 0
+        if not samples:
+            return 0
+        return (samples[-1][1] - self.gyro.offset) \
+               / self.gyro.numerical_sensitivity
+
     def move(self, win_h):
         """
         Moves the paddle taking into account wall collisions.
@@ -108,8 +164,10 @@ class Paddle():
         vy_pad, gyro_ratio = self.compute_pad_velocity()
         if self.rect.top + vy_pad < 0:
             self.rect.top = 0
+            self.travel_rem = 0
         elif self.rect.bottom + vy_pad > win_h:
             self.rect.bottom = win_h
+            self.travel_rem = 0
         else:
             self.rect.move_ip(0,vy_pad)
         return vy_pad, gyro_ratio
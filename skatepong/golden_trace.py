@@ -0,0 +1,185 @@
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import argparse
+import json
+import os
+import tempfile
+import pygame
+import skatepong.constants as skt_cst
+import skatepong.soak as skt_sok
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+TRACE_VERSION = 1
+FIELDS = ("scene", "ball", "ball_v", "pads", "scores")
+
+class Trace_game(skt_sok.Soak_game):
+    """
+    Deterministic game : accelerated time, serve direction, gyroscopes
+    noise and players motion drawn from the seed, no sensor faults,
+    offsets measured again (no calibration file shared between runs).
+    """
+    def __init__(self, seed, calib_file):
+        self.RANDOM_SEED = seed
+        self.GYRO_CALIB_FILE = calib_file
+        super().__init__(seed, error_bursts = 0, disconnects = 0, \
+                         noise_bursts = 0)
+
+def frame_state(game):
+    """
+    Ball / paddles / scores state of the game (JSON types).
+    """
+    state = {"scene" : skt_cst.SCENE_NAMES[game.game_status], \
+             "ball" : None, "ball_v" : None, "pads" : None, \
+             "scores" : [game.l_score, game.r_score]}
+    if getattr(game, "ball", None) is not None:
+        state["ball"] = list(game.ball.rect.center)
+        state["ball_v"] = [game.ball.vx, game.ball.vy]
+        state["pads"] = [game.l_pad.rect.top, game.r_pad.rect.top]
+    return state
+
+def frame_events(prev, state):
+    """
+    Events between two frames states : scene change, goal, paddle or
+    wall bounce.
+    """
+    events = []
+    if state["scene"] != prev["scene"]:
+        events.append("scene " + state["scene"])
+    if state["scores"][0] > prev["scores"][0]:
+        events.append("goal left")
+    if state["scores"][1] > prev["scores"][1]:
+        events.append("goal right")
+    if prev["ball_v"] is not None and not events:
+        vx, vy = prev["ball_v"]
+        new_vx, new_vy = state["ball_v"]
+        if vx * new_vx < 0:
+            events.append("bounce left" if new_vx > 0 else "bounce right")
+        elif vy * new_vy < 0:
+            events.append("bounce wall")
+    return events
+
+def record(seed, nb_frames, on_frame = None):
+    """
+    Plays nb_frames frames of a deterministic game from the start.
+    Yields the state and events of every frame.
+    on_frame : called with the game after each frame (if any).
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        game = Trace_game(seed, os.path.join(directory, "calib.json"))
+        try:
+            prev = frame_state(game)
+            for frame in range(nb_frames):
+                game.step()
+                if on_frame is not None:
+                    on_frame(game)
+                state = frame_state(game)
+                state["events"] = frame_events(prev, state)
+                state["frame"] = frame
+                yield state
+                prev = state
+        finally:
+            game.metrics_exporter.stop()
+            pygame.quit()
+
+def save(path, seed, frames):
+    """
+    Saves a trace : header line, then one JSON line per frame.
+    """
+    with open(path, "w") as f:
+        f.write(json.dumps({"version" : TRACE_VERSION, "seed" : seed}) \
+                + "\n")
+        for state in frames:
+            f.write(json.dumps(state) + "\n")
+
+def load(path):
+    """
+    Returns the header and the frames of a trace file.
+    """
+    with open(path) as f:
+        header = json.loads(f.readline())
+        if header.get("version") != TRACE_VERSION:
+            raise ValueError("Unsupported trace version : " + path)
+        return header, [json.loads(line) for line in f]
+
+def compare(golden, frames, max_diffs = 10):
+    """
+    Compares two traces frame by frame.
+    Returns the number of frames differing and the first differences
+    [(frame, field, golden value, value)].
+    """
+    nb_frames = 0
+    diffs = []
+    for expected, state in zip(golden, frames):
+        differ = False
+        for field in FIELDS + ("events",):
+            if expected[field] != state[field]:
+                differ = True
+                if len(diffs) < max_diffs:
+                    diffs.append((expected["frame"], field, \
+                                  expected[field], state[field]))
+        nb_frames += differ
+    if len(golden) != len(frames):
+        diffs.append((min(len(golden), len(frames)), "length", \
+                      len(golden), len(frames)))
+        nb_frames += abs(len(golden) - len(frames))
+    return nb_frames, diffs
+
+def print_comparison(nb_frames, diffs):
+    if nb_frames == 0:
+        print("Traces identical")
+        return
+    print("Frames differing :", nb_frames)
+    for frame, field, expected, value in diffs:
+        print("frame", frame, ":", field, expected, "->", value)
+
+def main():
+    """
+    Golden traces : records deterministic games, compares them.
+    """
+    parser = argparse.ArgumentParser(description = "Skatepong golden " \
+             "traces : per frame ball / paddles state and events of a " \
+             "deterministic game (seeded, accelerated time, no display).")
+    sub = parser.add_subparsers(dest = "command", required = True)
+    rec = sub.add_parser("record", help = "records a trace")
+    rec.add_argument("output")
+    rec.add_argument("--seed", type = int, default = 1)
+    rec.add_argument("--frames", type = int, default = 15000)
+    cmp = sub.add_parser("compare", help = "compares two trace files")
+    cmp.add_argument("golden")
+    cmp.add_argument("trace")
+    chk = sub.add_parser("check", help = "plays the game of a golden " \
+                         "trace again and compares")
+    chk.add_argument("golden")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        save(args.output, args.seed, record(args.seed, args.frames))
+        print("Trace saved :", args.output)
+        return
+    header, golden = load(args.golden)
+    if args.command == "compare":
+        frames = load(args.trace)[1]
+    else:
+        frames = list(record(header["seed"], len(golden)))
+    nb_frames, diffs = compare(golden, frames)
+    print_comparison(nb_frames, diffs)
+    if nb_frames:
+        parser.exit(1)
+
+if __name__ == '__main__':
+    main()
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
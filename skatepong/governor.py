@@ -0,0 +1,100 @@
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import skatepong.log as skt_log
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+logger = skt_log.get_logger("governor")
+
+class Quality_governor():
+    """
+    Lowers the rendering quality when frames overrun their budget, and
+    restores it when there is headroom again.
+
+    Quality levels (each one includes the previous ones) :
+    0 : everything redrawn every frame.
+    1 : scores redrawn only when changed (or overlapped by the ball).
+    2 : mid line repainted only where the ball erased it.
+    3 : display updated every other frame (game logic still at FPS).
+    """
+    LEVELS = ("full", "scores_on_change", "mid_line_on_damage", \
+              "half_rate_display")
+    MAX_LEVEL = len(LEVELS) - 1
+
+    def __init__(self, budget, high_load = 0.9, low_load = 0.5, \
+                 window = 25, restore_windows = 4, metrics = None):
+        self.budget = budget # Frame period (s)
+        self.high_load = high_load # Ratio of budget : degrades above
+        self.low_load = low_load # Ratio of budget : restores below
+        self.window = window # Frames averaged for each decision
+        self.restore_windows = restore_windows # Low windows to restore
+        self.metrics = metrics
+        self.work_time = 0
+        self.nb_frames = 0
+        self.nb_low = 0
+        self.level = 0
+
+    def observe(self, work_time):
+        """
+        Records the work duration (s) of one frame. Every window, the
+        level is lowered at once if overloaded, raised back after
+        several windows with headroom (no oscillation).
+        """
+        self.work_time += work_time
+        self.nb_frames += 1
+        if self.nb_frames < self.window:
+            return
+        load = self.work_time / (self.nb_frames * self.budget)
+        self.work_time = 0
+        self.nb_frames = 0
+        if load > self.high_load:
+            self.nb_low = 0
+            if self.level < self.MAX_LEVEL:
+                self.set_level(self.level + 1, load)
+        elif load < self.low_load and self.level > 0:
+            self.nb_low += 1
+            if self.nb_low >= self.restore_windows:
+                self.nb_low = 0
+                self.set_level(self.level - 1, load)
+        else:
+            self.nb_low = 0
+
+    def set_level(self, level, load):
+        logger.info("Quality level %s -> %s (%s), frame load %s %%", \
+                    self.level, level, self.LEVELS[level], round(100 * load))
+        self.level = level
+        if self.metrics is not None:
+            self.metrics.quality_level.set(None, level)
+
+    def skip_display_update(self, frame_nb):
+        """
+        True if the display update of this frame must be skipped.
+        """
+        return self.level >= 3 and frame_nb % 2 == 1
+
+def main():
+    """
+    Function for test purposes only.
+    """
+    skt_log.setup_logging()
+    governor = Quality_governor(0.04)
+    for load in [0.5] * 50 + [1.2] * 100 + [0.3] * 500:
+        governor.observe(load * 0.04)
+    print("Final level :", governor.level)
+
+if __name__ == '__main__':
+    main()
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
@@ -9,23 +9,255 @@ Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
 #-----------------------------------------------------------------------
 
 from mpu6050 import mpu6050
+import argparse
+import json
 import time
+import skatepong.log as skt_log
 
 #-----------------------------------------------------------------------
 # CODE
 #-----------------------------------------------------------------------
 
-class Gyro_one_axis(mpu6050):
+logger = skt_log.get_logger("gyro")
+
+# MPU6050 digital low-pass filter (gyro) :
+# DLPF_CFG -> (bandwidth (Hz), group delay (ms), internal rate (Hz))
+DLPF_SETTINGS = {0 : (256, 0.98, 8000), \
+                 1 : (188, 1.9, 1000), \
+                 2 : (98, 2.8, 1000), \
+                 3 : (42, 4.8, 1000), \
+                 4 : (20, 8.3, 1000), \
+                 5 : (10, 13.4, 1000), \
+                 6 : (5, 18.6, 1000)}
+
+class Bias_tracker():
+    """
+    Tracks gyro offset drift (temperature) from the raw data stream.
+
+    - Steady skate : |raw - offset| (low-pass filtered, filter_s time
+      constant) under the steady threshold during at least
+      min_steady_s. Threshold : noise_factor x sensor noise
+      (measured with the offset), bounded to [min_threshold,
+      max_threshold] deg/s. No tracking while the noise is not known.
+    - While steady, offset follows the raw data (first order filter,
+      time_constant s), at most max_rate deg/s per second.
+    Time based (sample timestamps) : same correction whatever the
+    sample rate. O(1) work per sample, no history kept.
+    """
+    MAX_DT = 0.1 # Longer gaps between samples not integrated (s)
+
+    def __init__(self, max_threshold, min_steady_s = 1, \
+                 time_constant = 2, max_rate = 0.25, noise_factor = 4, \
+                 min_threshold = 0.5, filter_s = 0.1):
+        self.max_threshold = max_threshold # deg/s
+        self.min_threshold = min_threshold # deg/s
+        self.noise_factor = noise_factor
+        self.min_steady_s = min_steady_s
+        self.time_constant = time_constant
+        self.max_rate = max_rate
+        self.filter_s = filter_s
+        self.delta = 0 # Filtered raw - offset (deg/s)
+        self.steady_s = 0 # Duration steady, as of last sample (s)
+        self.prev_t = None # Timestamp of last sample
+        self.nb_updates = 0 # Offset updates since creation
+
+    def update(self, t, gyro_raw, offset, noise):
+        """
+        Returns the offset updated with the raw data point sampled at t
+        (s). noise : std deviation of the sensor when steady (deg/s).
+        """
+        if self.prev_t is None:
+            dt = 0
+        else:
+            dt = min(max(t - self.prev_t, 0), self.MAX_DT)
+        self.prev_t = t
+        if noise is None:
+            return offset
+        threshold = min(max(self.noise_factor * noise, \
+                            self.min_threshold), self.max_threshold)
+        delta = gyro_raw - offset
+        self.delta += (delta - self.delta) * min(dt / self.filter_s, 1)
+        if abs(self.delta) >= threshold:
+            self.steady_s = 0
+            return offset
+        self.steady_s += dt
+        if self.steady_s < self.min_steady_s:
+            return offset
+        step = delta * dt / self.time_constant
+        max_step = self.max_rate * dt
+        if step > max_step:
+            step = max_step
+        elif step < -max_step:
+            step = -max_step
+        self.nb_updates += 1
+        return offset + step
+
+class Gyro_common():
+    """
+    Offset handling shared by every gyroscope source (i2c / daemon).
+
+    Subclasses provide get_data() and the attributes 'axis' / 'name'
+    (i2c address) / 'bus_nb' / 'numerical_sensitivity', then call
+    init_common().
+    """
+    def init_common(self):
+        self.offset = 0
+        self.error = False
+        self.ready_for_reinit = False
+        self.read_latency = None # Duration of last read (s), for metrics
+        self.last_error = None # Last i2c exception (for logs)
+        self.on_error = None # Called with the exception when gyro lost
+        self.noise = None # Std deviation of raw data when steady (deg/s)
+        self.offset_time = None # Offset measurement timestamp (epoch s)
+        self.bias_tracker = None # Online offset tracking (disabled)
+
+    def set_error(self, err):
+        """
+        Marks the gyroscope as lost after an i2c exception (recreated by
+        the game). on_error is only called for the first exception.
+        """
+        self.last_error = err
+        if not self.error:
+            self.error = True
+            if self.on_error is not None:
+                self.on_error(err)
+
+    def get_samples(self):
+        """
+        Returns timestamped samples [(t (s), deg/s)] since last call.
+        Note : direct read, so one sample timestamped mid-read
+        (time.monotonic() clock).
+        """
+        read_start = time.monotonic()
+        gyro_data = self.get_data()
+        return [(read_start + (self.read_latency or 0) / 2, gyro_data)]
+
+    def enable_bias_tracking(self, steady_ratio, **kwargs):
+        """
+        Enables online offset tracking while the skate is steady.
+        steady_ratio : ratio angular velocity / gyro sensitivity, upper
+        bound of the steady threshold (based on the measured noise).
+        """
+        self.bias_tracker = Bias_tracker(steady_ratio * \
+                            self.numerical_sensitivity, **kwargs)
+
+    def track_bias(self, t, gyro_raw):
+        """
+        Updates the offset with a new raw data point (if tracking).
+        """
+        if self.bias_tracker is not None:
+            self.offset = self.bias_tracker.update(t, gyro_raw, \
+                                                   self.offset, self.noise)
+
+    def measure_gyro_offset(self, nb_calib_pts = 350):
+        """
+        Calculates the average gyro offset along the chosen axis.
+        """
+        logger.info("Gyroscope average offset (%s axis) calculation " \
+                    "ongoing...", self.axis, extra = {"sensor" : self.name})
+        gyro_offset, gyro_noise = self.measure_stats(nb_calib_pts)
+        logger.info("Gyroscope average offset measured (%s axis) : %s", \
+                    self.axis, round(gyro_offset, 2), \
+                    extra = {"sensor" : self.name})
+        self.offset = gyro_offset
+        self.noise = gyro_noise
+        self.offset_time = time.time()
+        return gyro_offset
+
+    def measure_stats(self, nb_pts):
+        """
+        Returns average and standard deviation of nb_pts raw data.
+        """
+        i = 1
+        gyro_sum = 0
+        gyro_sum_sq = 0
+        while i <= nb_pts:
+            gyro_raw = self.get_data()
+            gyro_sum += gyro_raw
+            gyro_sum_sq += gyro_raw * gyro_raw
+            i += 1
+        gyro_avg = gyro_sum / nb_pts
+        gyro_var = max(gyro_sum_sq / nb_pts - gyro_avg * gyro_avg, 0)
+        return gyro_avg, gyro_var ** 0.5
+
+    def apply_filter_settings(self, store):
+        """
+        Applies the low-pass filter / sample rate stored for the sensor.
+        """
+        entry = store.get(self.sensor_id())
+        if entry is not None and entry.get("dlpf") is not None:
+            self.set_dlpf(entry["dlpf"])
+            self.set_sample_rate_div(entry.get("smplrt_div", 0))
+
+    def sensor_id(self):
+        """
+        Returns the identification used to persist calibration data.
+        Note : MPU6050 has no serial number, the i2c address is used.
+        """
+        return "i2c-" + str(self.bus_nb) + "-" + self.name
+
+    def save_calib(self, store):
+        """
+        Persists the measured offset and noise in the given store.
+        """
+        store.update(self.sensor_id(), offset = self.offset, \
+                     noise = self.noise, time = self.offset_time)
+
+    def warm_start(self, store, max_age, nb_check_pts = 25, \
+                   min_noise = 0.5):
+        """
+        Restores the persisted offset instead of recalibrating.
+
+        - Stale or missing offset : full offset measurement.
+        - Quick check (nb_check_pts) with skate steady : offset kept if
+          the average stays within the stored noise, remeasured if not.
+        - Quick check with skate moving : offset kept (not verifiable).
+        min_noise (deg/s) avoids rejecting offsets of very quiet sensors.
+        Returns True if the persisted offset was kept.
+        """
+        entry = store.get(self.sensor_id())
+        if entry is None or entry.get("time") is None \
+        or time.time() - entry["time"] > max_age:
+            logger.info("No valid persisted offset", \
+                        extra = {"sensor" : self.name})
+            self.measure_gyro_offset()
+            self.save_calib(store)
+            return False
+        noise = max(entry.get("noise") or 0, min_noise)
+        check_avg, check_noise = self.measure_stats(nb_check_pts)
+        steady = check_noise <= 3 * noise
+        # Average of n points : noise reduced by sqrt(n)
+        offset_ok = abs(check_avg - entry["offset"]) \
+                    <= 4 * noise / nb_check_pts ** 0.5
+        if steady and not offset_ok:
+            logger.info("Persisted offset rejected by steady check", \
+                        extra = {"sensor" : self.name})
+            self.measure_gyro_offset()
+            self.save_calib(store)
+            return False
+        self.offset = entry["offset"]
+        self.noise = entry.get("noise")
+        self.offset_time = entry["time"]
+        logger.info("Persisted offset restored : %s (%s)", \
+                    round(self.offset, 2), \
+                    "checked" if steady else "skate moving, not checked", \
+                    extra = {"sensor" : self.name})
+        return True
+
+class Gyro_one_axis(Gyro_common, mpu6050):
     """
     Handles gyroscope measurements along one axis.
     """
     # i2c addresses for MPU6050 sensors
     I2C_ADDRESS_1 = 0x68 # Default (or A0 connected to GND)
     I2C_ADDRESS_2 = 0x69 # A0 connected to VCC
+    # Registers (not handled by mpu6050 module)
+    SMPLRT_DIV = 0x19 # Sample rate = internal rate / (1 + SMPLRT_DIV)
+    CONFIG = 0x1A # Bits 0-2 : DLPF_CFG
 
     def __init__(self, address, axis, sensitivity, bus = 1):
         # Calling '__init__' of mother class:
-        mpu6050.__init__(self, address, bus = 1)
+        mpu6050.__init__(self, address, bus = bus)
         mpu6050.set_gyro_range(self, sensitivity)
         self.numerical_sensitivity = mpu6050.read_gyro_range(self)
         # Personal class init:
@@ -38,44 +270,74 @@ class Gyro_one_axis(mpu6050):
         mpu6050.GYRO_RANGE_1000DEG = 0x10 # +/- 500 deg/s
         mpu6050.GYRO_RANGE_2000DEG = 0x18 # +/- 1000 deg/s
         """
-        self.offset = 0
-        self.error = False
-        self.ready_for_reinit = False
+        self.name = hex(address) # Sensor identification in logs
+        self.bus_nb = bus # i2c bus number
+        self.dlpf = 0 # Power-on default : filter disabled (256 Hz)
+        self.smplrt_div = 0
+        self.init_common()
+
+    def set_dlpf(self, dlpf_cfg):
+        """
+        Sets the digital low-pass filter (see DLPF_SETTINGS).
+        """
+        config = self.bus.read_byte_data(self.address, self.CONFIG)
+        self.bus.write_byte_data(self.address, self.CONFIG, \
+                                 (config & 0xF8) | dlpf_cfg)
+        self.dlpf = dlpf_cfg
+
+    def set_sample_rate_div(self, smplrt_div):
+        """
+        Sets the sample rate divider (0 - 255).
+        """
+        self.bus.write_byte_data(self.address, self.SMPLRT_DIV, smplrt_div)
+        self.smplrt_div = smplrt_div
 
     def get_data(self):
         """
         Returns angular rotation (in deg/s) along the chosen axis.
         """
+        start = time.perf_counter()
         gyro_data = self.get_gyro_data()[self.axis]
+        self.read_latency = time.perf_counter() - start
         return gyro_data
 
-    def measure_gyro_offset(self, nb_calib_pts = 350):
-        """
-        Calculates the average gyro offset along the chosen axis.
-        """
-        i = 1
-        gyro_sum = 0
-        while i <= nb_calib_pts:
-            if i == 1:
-                print("Gyroscope average offset (" + self.axis + \
-                      " axis) calculation ongoing...")
-            gyro_sum += self.get_data()
-            i += 1
-        gyro_offset = gyro_sum / nb_calib_pts
-        print("Gyroscope average offset measured ("+ self.axis + \
-              " axis) :", str(round(gyro_offset, 2)))
-        self.offset = gyro_offset
-        return gyro_offset
-
-def main():
+def auto_tune_filter(gyro, noise_target, min_rate = 200, nb_pts = 200):
     """
-    Function for test purposes only
+    Picks the low-pass filter with the lowest delay meeting noise_target.
+
+    - Filters tried by increasing group delay, noise (std deviation,
+      deg/s) measured with the skate steady.
+    - Sample rate : lowest one >= 2 x bandwidth and >= min_rate (Hz).
+    - If no filter meets the target, the least noisy one is kept.
+    Works with any gyro having set_dlpf() / set_sample_rate_div().
+    Returns (dlpf_cfg, smplrt_div, noise (deg/s)).
     """
-    gyro_1 = Gyro_one_axis(Gyro_one_axis.I2C_ADDRESS_1, 'y', \
-             mpu6050.GYRO_RANGE_1000DEG)
-    gyro_2 = Gyro_one_axis(Gyro_one_axis.I2C_ADDRESS_2, 'y', \
-             mpu6050.GYRO_RANGE_1000DEG)
+    results = []
+    for dlpf_cfg, (bandwidth, delay, base_rate) in \
+    sorted(DLPF_SETTINGS.items(), key = lambda item: item[1][1]):
+        smplrt_div = int(base_rate / max(2 * bandwidth, min_rate)) - 1
+        smplrt_div = min(max(smplrt_div, 0), 255)
+        gyro.set_dlpf(dlpf_cfg)
+        gyro.set_sample_rate_div(smplrt_div)
+        time.sleep(10 * delay / 1000) # Filter settling
+        gyro_avg, gyro_noise = gyro.measure_stats(nb_pts)
+        logger.info("DLPF %s (%s Hz, %s ms) : noise %s deg/s", dlpf_cfg, \
+                    bandwidth, delay, round(gyro_noise, 3), \
+                    extra = {"sensor" : gyro.name})
+        results.append((dlpf_cfg, smplrt_div, gyro_noise))
+        if gyro_noise <= noise_target:
+            return results[-1]
+    best = min(results, key = lambda result: result[2])
+    logger.warning("Noise target not reached, least noisy filter kept", \
+                   extra = {"sensor" : gyro.name})
+    gyro.set_dlpf(best[0])
+    gyro.set_sample_rate_div(best[1])
+    return best
 
+def live(gyro_1, gyro_2, rate):
+    """
+    Prints raw / calibrated data of both gyroscopes at the given rate.
+    """
     print("Gyroscope 1 :")
     print("Sensitivity:", str(gyro_1.numerical_sensitivity), "deg/s")
     gyro_1_offset = gyro_1.measure_gyro_offset()
@@ -95,7 +357,82 @@ def main():
               str(round(gyro_2_raw,2)), "/ Calibrated data :", \
               str(round(gyro_2_calibrated,2)))
         print("-------------------------------")
-        time.sleep(1/20)
+        time.sleep(1 / rate)
+
+def main():
+    """
+    Gyroscopes diagnostic tool.
+
+    - live (default) : prints raw / calibrated data.
+    - bench : sample rate, read latency, jitter, noise spectrum, bias
+      stability and sensitivity ranges comparison (skates steady).
+    - tune : picks and stores per board the low-pass filter / sample
+      rate meeting a noise target with the lowest delay (skates steady).
+    --simulate runs any mode on simulated gyroscopes (no hardware).
+    """
+    parser = argparse.ArgumentParser(description = "Skatepong " \
+                                     "gyroscopes diagnostic tool.")
+    parser.add_argument("mode", nargs = "?", default = "live", \
+                        choices = ["live", "bench", "tune"])
+    parser.add_argument("--axis", default = 'y', choices = "xyz")
+    parser.add_argument("--rate", type = float, default = None, \
+                        help = "live : print rate (default 20 Hz) / " \
+                        "bench : noise sampling rate (default 200 Hz)")
+    parser.add_argument("--duration", type = float, default = 5, \
+                        help = "bench : duration of each test (s)")
+    parser.add_argument("--no-ranges", action = "store_true", \
+                        help = "bench : skip sensitivity ranges test")
+    parser.add_argument("--json", default = None, \
+                        help = "bench : results file")
+    parser.add_argument("--noise-target", type = float, default = 0.2, \
+                        help = "tune : max noise std deviation (deg/s)")
+    parser.add_argument("--store", default = None, \
+                        help = "tune : calibration file (default: game's)")
+    parser.add_argument("--simulate", action = "store_true", \
+                        help = "simulated gyroscopes (no hardware)")
+    args = parser.parse_args()
+    skt_log.setup_logging()
+
+    if args.simulate:
+        import skatepong.gyro_sim as skt_sim
+        gyro_1 = skt_sim.Simulated_gyro(Gyro_one_axis.I2C_ADDRESS_1, \
+                 args.axis)
+        gyro_2 = skt_sim.Simulated_gyro(Gyro_one_axis.I2C_ADDRESS_2, \
+                 args.axis)
+    else:
+        gyro_1 = Gyro_one_axis(Gyro_one_axis.I2C_ADDRESS_1, args.axis, \
+                 mpu6050.GYRO_RANGE_1000DEG)
+        gyro_2 = Gyro_one_axis(Gyro_one_axis.I2C_ADDRESS_2, args.axis, \
+                 mpu6050.GYRO_RANGE_1000DEG)
+
+    if args.mode == "live":
+        live(gyro_1, gyro_2, args.rate or 20)
+        return
+    if args.mode == "tune":
+        import skatepong.calib_store as skt_cal
+        store = skt_cal.Calib_store(args.store or skt_cal.DEFAULT_PATH)
+        for gyro in (gyro_1, gyro_2):
+            dlpf_cfg, smplrt_div, gyro_noise = auto_tune_filter(gyro, \
+                                               args.noise_target)
+            bandwidth, delay, base_rate = DLPF_SETTINGS[dlpf_cfg]
+            print("Gyro", gyro.name, ": DLPF", dlpf_cfg, "(" + \
+                  str(bandwidth), "Hz,", delay, "ms) / sample rate", \
+                  round(base_rate / (1 + smplrt_div)), "Hz / noise", \
+                  round(gyro_noise, 3), "deg/s")
+            store.update(gyro.sensor_id(), dlpf = dlpf_cfg, \
+                         smplrt_div = smplrt_div, \
+                         filter_noise = gyro_noise)
+        print("Settings saved :", store.path)
+        return
+    import skatepong.gyro_bench as skt_bch
+    print("Bench ongoing, keep skates steady...")
+    report = skt_bch.run_bench([gyro_1, gyro_2], args.duration, \
+                               args.rate or 200, not args.no_ranges)
+    skt_bch.print_summary(report)
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent = 2)
+        print("Results saved :", args.json)
 
 if __name__ == '__main__':
     main()
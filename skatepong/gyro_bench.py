@@ -0,0 +1,237 @@
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import math
+import time
+from mpu6050 import mpu6050
+try:
+    import numpy as np
+except ImportError: # Optional : spectrum / Allan variance skipped
+    np = None
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+GYRO_RANGES = {"250DEG" : mpu6050.GYRO_RANGE_250DEG, \
+               "500DEG" : mpu6050.GYRO_RANGE_500DEG, \
+               "1000DEG" : mpu6050.GYRO_RANGE_1000DEG, \
+               "2000DEG" : mpu6050.GYRO_RANGE_2000DEG}
+
+def distribution(values):
+    """
+    Returns min / mean / percentiles / max / std of a list of values.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    n = len(ordered)
+    mean = sum(ordered) / n
+    var = sum((v - mean) ** 2 for v in ordered) / n
+
+    def percentile(p):
+        return ordered[min(n - 1, int(round(p / 100 * (n - 1))))]
+
+    return {"n" : n, "min" : ordered[0], "mean" : mean, \
+            "p50" : percentile(50), "p90" : percentile(90), \
+            "p99" : percentile(99), "max" : ordered[-1], \
+            "std" : math.sqrt(var)}
+
+def read_as_fast_as_possible(gyros, duration):
+    """
+    Reads the gyros in turn during duration (s), without any pause.
+    Returns per gyro : timestamps (s) / latencies (s) / values (deg/s).
+    """
+    records = [([], [], []) for gyro in gyros]
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        for gyro, (stamps, latencies, values) in zip(gyros, records):
+            start = time.perf_counter()
+            value = gyro.get_data()
+            stop = time.perf_counter()
+            stamps.append((start + stop) / 2)
+            latencies.append(stop - start)
+            values.append(value)
+    return records
+
+def timing_report(gyros, duration):
+    """
+    Max sample rate, read latency and sampling jitter of gyros read
+    together as fast as possible.
+    """
+    report = {}
+    records = read_as_fast_as_possible(gyros, duration)
+    for gyro, (stamps, latencies, values) in zip(gyros, records):
+        intervals = [b - a for a, b in zip(stamps, stamps[1:])]
+        report[gyro.name] = { \
+            "sample_rate_hz" : len(stamps) / duration, \
+            "latency_s" : distribution(latencies), \
+            "interval_s" : distribution(intervals)}
+    return report
+
+def read_at_rate(gyro, rate, duration):
+    """
+    Reads one gyro at a fixed rate (Hz), returns values / timestamps.
+    """
+    period = 1 / rate
+    stamps = []
+    values = []
+    next_time = time.perf_counter()
+    end = next_time + duration
+    while next_time < end:
+        while time.perf_counter() < next_time:
+            pass # Busy wait : sleep granularity too coarse at high rate
+        stamps.append(time.perf_counter())
+        values.append(gyro.get_data())
+        next_time += period
+    return stamps, values
+
+def noise_spectrum(values, rate, segment = 256):
+    """
+    Averaged periodogram (Welch, Hann window, 50 % overlap).
+    Returns frequencies (Hz) and noise density ((deg/s)/sqrt(Hz)).
+    """
+    data = np.asarray(values, dtype = float)
+    data = data - data.mean()
+    segment = min(segment, len(data))
+    window = np.hanning(segment)
+    scale = rate * (window ** 2).sum()
+    step = segment // 2
+    psd = np.zeros(segment // 2 + 1)
+    nb_segments = 0
+    for start in range(0, len(data) - segment + 1, step):
+        spectrum = np.fft.rfft(data[start:start + segment] * window)
+        psd += np.abs(spectrum) ** 2 / scale
+        nb_segments += 1
+    psd /= max(nb_segments, 1)
+    psd[1:-1] *= 2 # One sided spectrum
+    freqs = np.fft.rfftfreq(segment, 1 / rate)
+    return freqs, np.sqrt(psd)
+
+def allan_deviation(values, rate):
+    """
+    Non overlapping Allan deviation for cluster sizes 1, 2, 4, ...
+    Returns [(tau (s), deviation (deg/s))], the minimum of the curve
+    being the bias stability.
+    """
+    data = np.asarray(values, dtype = float)
+    result = []
+    m = 1
+    while len(data) // m >= 3:
+        nb_clusters = len(data) // m
+        averages = data[:nb_clusters * m].reshape(nb_clusters, m) \
+                   .mean(axis = 1)
+        avar = 0.5 * np.mean(np.diff(averages) ** 2)
+        result.append((m / rate, float(np.sqrt(avar))))
+        m *= 2
+    return result
+
+def noise_report(gyro, rate, duration):
+    """
+    Noise spectrum and bias stability of one (steady) gyro.
+    """
+    stamps, values = read_at_rate(gyro, rate, duration)
+    real_rate = (len(stamps) - 1) / (stamps[-1] - stamps[0])
+    report = {"rate_hz" : real_rate, "raw_deg_s" : distribution(values)}
+    if np is None:
+        report["spectrum"] = "skipped (numpy not installed)"
+        return report
+    freqs, density = noise_spectrum(values, real_rate)
+    peaks = np.argsort(density[1:])[::-1][:5] + 1
+    report["spectrum"] = { \
+        "freq_hz" : freqs.tolist(), \
+        "density_deg_s_rthz" : density.tolist(), \
+        "mean_density_deg_s_rthz" : float(density[1:].mean()), \
+        "peaks_hz" : [float(freqs[i]) for i in peaks]}
+    allan = allan_deviation(values, real_rate)
+    tau_min, dev_min = min(allan, key = lambda point: point[1])
+    report["allan"] = {"tau_s" : [point[0] for point in allan], \
+                       "deviation_deg_s" : [point[1] for point in allan], \
+                       "bias_stability_deg_s" : dev_min, \
+                       "bias_stability_tau_s" : tau_min}
+    return report
+
+def ranges_report(gyro, nb_pts = 500):
+    """
+    Noise of one (steady) gyro for every sensitivity range.
+    Note : the initial range is restored at the end.
+    """
+    report = {}
+    initial_range = gyro.sensitivity
+    for name, gyro_range in GYRO_RANGES.items():
+        gyro.set_gyro_range(gyro_range)
+        time.sleep(0.05) # Settling after range change
+        full_scale = gyro.read_gyro_range()
+        avg, std = gyro.measure_stats(nb_pts)
+        resolution = full_scale / 32768 # deg/s per LSB
+        report[name] = {"full_scale_deg_s" : full_scale, \
+                        "offset_deg_s" : avg, "noise_deg_s" : std, \
+                        "resolution_deg_s" : resolution, \
+                        "noise_lsb" : std / resolution}
+    gyro.set_gyro_range(initial_range)
+    return report
+
+def run_bench(gyros, duration = 5, rate = 200, ranges = True):
+    """
+    Full bench of the given gyros (skates must be kept steady).
+    """
+    report = {"date" : time.strftime("%Y-%m-%dT%H:%M:%S"), \
+              "duration_s" : duration, "sensors" : {}}
+    report["timing_together"] = timing_report(gyros, duration)
+    for gyro in gyros:
+        sensor = {"timing_alone" : timing_report([gyro], \
+                  duration)[gyro.name]}
+        sensor.update(noise_report(gyro, rate, duration))
+        if ranges:
+            sensor["ranges"] = ranges_report(gyro)
+        report["sensors"][gyro.name] = sensor
+    return report
+
+def print_summary(report):
+    """
+    Prints the main figures of a bench report.
+    """
+    for name, timing in report["timing_together"].items():
+        print("Both gyros read together -", name, ":", \
+              round(timing["sample_rate_hz"]), "Hz")
+    for name, sensor in report["sensors"].items():
+        timing = sensor["timing_alone"]
+        latency = timing["latency_s"]
+        interval = timing["interval_s"]
+        print("Gyro", name)
+        print("  Max sample rate :", round(timing["sample_rate_hz"]), \
+              "Hz")
+        print("  Read latency (ms) : p50", round(latency["p50"] * 1000, 3),\
+              "/ p99", round(latency["p99"] * 1000, 3), "/ max", \
+              round(latency["max"] * 1000, 3))
+        print("  Interval jitter (ms) : std", \
+              round(interval["std"] * 1000, 3), "/ p99-p50", \
+              round((interval["p99"] - interval["p50"]) * 1000, 3))
+        print("  Raw noise (deg/s) : std", \
+              round(sensor["raw_deg_s"]["std"], 3))
+        if isinstance(sensor["spectrum"], dict):
+            print("  Mean noise density (deg/s/rtHz) :", \
+                  round(sensor["spectrum"]["mean_density_deg_s_rthz"], 4))
+            print("  Spectrum peaks (Hz) :", ", ".join(str(round(f, 1)) \
+                  for f in sensor["spectrum"]["peaks_hz"]))
+            print("  Bias stability (deg/s) :", \
+                  round(sensor["allan"]["bias_stability_deg_s"], 4), \
+                  "at tau", round(sensor["allan"]["bias_stability_tau_s"],\
+                  2), "s")
+        else:
+            print("  Spectrum :", sensor["spectrum"])
+        for range_name, range_report in sensor.get("ranges", {}).items():
+            print("  Range", range_name, ": noise", \
+                  round(range_report["noise_deg_s"], 3), "deg/s /", \
+                  round(range_report["noise_lsb"], 1), "LSB")
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
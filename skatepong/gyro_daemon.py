@@ -0,0 +1,292 @@
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import argparse
+import signal
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+from mpu6050 import mpu6050
+import skatepong.gyro as skt_gyro
+import skatepong.calib_store as skt_cal
+import skatepong.log as skt_log
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+logger = skt_log.get_logger("gyro_daemon")
+
+"""
+Shared memory layout (little endian) :
+- seq : seqlock counter, odd while the daemon is writing.
+- 1 header per board : samples written (total), board connected,
+  gyro sensitivity (deg/s), daemon heartbeat (time.monotonic()).
+- 1 ring of RING_SIZE samples per board : timestamp (time.monotonic()),
+  angular rotation (deg/s, raw).
+"""
+SHM_NAME = "skatepong_gyros"
+ADDRESSES = (skt_gyro.Gyro_one_axis.I2C_ADDRESS_1, \
+             skt_gyro.Gyro_one_axis.I2C_ADDRESS_2) # Board index -> addr.
+I2C_BUS = 1
+RING_SIZE = 1024 # Samples kept per board (2 s at 500 Hz)
+SEQ = struct.Struct("<Q")
+BOARD = struct.Struct("<QIxxxxdd")
+SAMPLE = struct.Struct("<dd")
+BOARD_OFFSET = SEQ.size
+RING_OFFSET = BOARD_OFFSET + len(ADDRESSES) * BOARD.size
+SHM_SIZE = RING_OFFSET + len(ADDRESSES) * RING_SIZE * SAMPLE.size
+STALE_DELAY = 0.5 # Daemon considered stopped without heartbeat (s)
+
+def attach_shm(name):
+    """
+    Attaches to an existing shared memory without owning it.
+
+    Note : before Python 3.13, the resource tracker of a process which
+    only attaches would unlink the memory at exit -> unregistered.
+    """
+    try:
+        return shared_memory.SharedMemory(name, track = False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+class Gyro_daemon():
+    """
+    Owns the i2c bus and publishes both boards samples in shared memory.
+
+    Single writer : every publication is wrapped in a seqlock, readers
+    retry when they overlapped a write.
+    """
+    RECONNECT_PERIOD = 0.5 # Delay between 2 reconnection attempts (s)
+
+    def __init__(self, name = SHM_NAME, axis = 'y', \
+                 sensitivity = mpu6050.GYRO_RANGE_1000DEG, rate = 500, \
+                 calib_path = skt_cal.DEFAULT_PATH):
+        self.calib_store = skt_cal.Calib_store(calib_path)
+        self.axis = axis
+        self.sensitivity = sensitivity
+        self.rate = rate # Target sampling rate, both boards (Hz)
+        try:
+            self.shm = shared_memory.SharedMemory(name, create = True, \
+                                                  size = SHM_SIZE)
+        except FileExistsError:
+            # Left over by a daemon which crashed
+            old_shm = shared_memory.SharedMemory(name)
+            old_shm.close()
+            old_shm.unlink()
+            self.shm = shared_memory.SharedMemory(name, create = True, \
+                                                  size = SHM_SIZE)
+        self.buf = self.shm.buf
+        self.seq = 0
+        self.gyros = [None] * len(ADDRESSES)
+        self.counts = [0] * len(ADDRESSES)
+        self.sensitivities = [0.0] * len(ADDRESSES)
+        self.next_reconnect = [0.0] * len(ADDRESSES)
+
+    def connect(self, index, now):
+        """
+        Tries to (re)create the gyroscope object of one board.
+        """
+        if now < self.next_reconnect[index]:
+            return
+        try:
+            gyro = skt_gyro.Gyro_one_axis(ADDRESSES[index], self.axis, \
+                                          self.sensitivity, I2C_BUS)
+            gyro.apply_filter_settings(self.calib_store)
+        except IOError as err:
+            self.next_reconnect[index] = now + self.RECONNECT_PERIOD
+            logger.warning("Board not connected", extra = \
+                           {"sensor" : hex(ADDRESSES[index]), \
+                            "error" : repr(err)})
+        else:
+            self.gyros[index] = gyro
+            self.sensitivities[index] = gyro.numerical_sensitivity
+            logger.info("Board connected", \
+                        extra = {"sensor" : hex(ADDRESSES[index])})
+
+    def step(self):
+        """
+        Reads one sample per connected board and publishes them.
+        """
+        now = time.monotonic()
+        samples = [None] * len(ADDRESSES)
+        for index, gyro in enumerate(self.gyros):
+            if gyro is None:
+                self.connect(index, now)
+                continue
+            try:
+                samples[index] = gyro.get_samples()[0]
+            except IOError as err:
+                self.gyros[index] = None
+                logger.warning("i2c communication lost", extra = \
+                               {"sensor" : gyro.name, "error" : repr(err)})
+        heartbeat = time.monotonic()
+        self.seq += 1 # Odd : write ongoing
+        SEQ.pack_into(self.buf, 0, self.seq)
+        for index, sample in enumerate(samples):
+            if sample is not None:
+                SAMPLE.pack_into(self.buf, RING_OFFSET + (index \
+                                 * RING_SIZE + self.counts[index] \
+                                 % RING_SIZE) * SAMPLE.size, *sample)
+                self.counts[index] += 1
+            BOARD.pack_into(self.buf, BOARD_OFFSET + index * BOARD.size, \
+                            self.counts[index], \
+                            self.gyros[index] is not None, \
+                            self.sensitivities[index], heartbeat)
+        self.seq += 1 # Even : consistent
+        SEQ.pack_into(self.buf, 0, self.seq)
+
+    def run(self):
+        """
+        Samples both boards at the target rate until stopped.
+        """
+        period = 1 / self.rate
+        next_time = time.monotonic()
+        while True:
+            self.step()
+            next_time += period
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_time = time.monotonic() # Late : no catch up burst
+
+    def close(self):
+        """
+        Releases and removes the shared memory.
+        """
+        self.buf = None
+        self.shm.close()
+        self.shm.unlink()
+
+class Shm_gyro(skt_gyro.Gyro_common):
+    """
+    Gyroscope reading the samples published by the gyro daemon.
+
+    Same interface as Gyro_one_axis (IOError when the board or the
+    daemon is not available), without any i2c access.
+    """
+    MAX_RETRIES = 1000 # Seqlock read attempts before giving up
+
+    def __init__(self, address, axis = 'y', name = SHM_NAME, \
+                 timeout = 0.1):
+        self.index = ADDRESSES.index(address)
+        self.axis = axis # Informative only : chosen by the daemon
+        self.name = hex(address)
+        self.bus_nb = I2C_BUS
+        self.timeout = timeout # Max wait for a new sample (s)
+        self.shm = attach_shm(name)
+        self.buf = self.shm.buf
+        self.board_offset = BOARD_OFFSET + self.index * BOARD.size
+        self.ring_offset = RING_OFFSET + self.index * RING_SIZE \
+                           * SAMPLE.size
+        count, connected, sensitivity, heartbeat = self.read_locked( \
+                                                   self.read_board)
+        self.check_status(connected, heartbeat)
+        self.numerical_sensitivity = sensitivity
+        self.read_count = count # Only samples published from now on
+        self.init_common()
+
+    def read_locked(self, read_func):
+        """
+        Calls read_func until it did not overlap a daemon write.
+        """
+        for i in range(self.MAX_RETRIES):
+            seq = SEQ.unpack_from(self.buf, 0)[0]
+            if seq & 1:
+                continue
+            result = read_func()
+            if SEQ.unpack_from(self.buf, 0)[0] == seq:
+                return result
+        raise IOError("gyro daemon : shared memory not readable")
+
+    def read_board(self):
+        return BOARD.unpack_from(self.buf, self.board_offset)
+
+    def read_new_samples(self):
+        count, connected, sensitivity, heartbeat = self.read_board()
+        first = max(self.read_count, count - RING_SIZE)
+        samples = [SAMPLE.unpack_from(self.buf, self.ring_offset \
+                   + (i % RING_SIZE) * SAMPLE.size) \
+                   for i in range(first, count)]
+        return count, connected, heartbeat, samples
+
+    def check_status(self, connected, heartbeat):
+        """
+        Raises IOError if the board or the daemon is not available.
+        """
+        if time.monotonic() - heartbeat > STALE_DELAY:
+            raise IOError("gyro daemon not running")
+        if not connected:
+            raise IOError("board " + self.name + " not connected")
+
+    def get_samples(self):
+        """
+        Returns the samples [(t (s), deg/s)] published since last call.
+        """
+        count, connected, heartbeat, samples = self.read_locked( \
+                                               self.read_new_samples)
+        self.check_status(connected, heartbeat)
+        self.read_count = count
+        return samples
+
+    def get_data(self):
+        """
+        Returns the next angular rotation (deg/s) published (waits).
+        """
+        start = time.perf_counter()
+        samples = self.get_samples()
+        while not samples:
+            if time.perf_counter() - start > self.timeout:
+                raise IOError("gyro daemon : no new sample")
+            time.sleep(0.0005)
+            samples = self.get_samples()
+        self.read_latency = time.perf_counter() - start
+        return samples[-1][1]
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+def main():
+    """
+    Runs the gyro daemon (stopped with Ctrl+C / SIGTERM).
+    """
+    parser = argparse.ArgumentParser(description = "Publishes both " \
+             "skateboards gyroscope samples in shared memory.")
+    parser.add_argument("--name", default = SHM_NAME, \
+                        help = "shared memory name")
+    parser.add_argument("--rate", type = float, default = 500, \
+                        help = "sampling rate, both boards (Hz)")
+    parser.add_argument("--axis", default = 'y', choices = "xyz")
+    args = parser.parse_args()
+    skt_log.setup_logging()
+
+    def stop(signum, frame):
+        raise SystemExit(0)
+    signal.signal(signal.SIGTERM, stop)
+
+    daemon = Gyro_daemon(args.name, args.axis, rate = args.rate)
+    logger.info("Gyro daemon started : %s (%s Hz)", args.name, args.rate)
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
+
+if __name__ == '__main__':
+    main()
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
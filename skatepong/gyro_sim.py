@@ -0,0 +1,109 @@
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import math
+import random
+import time
+import skatepong.gyro as skt_gyro
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+class Simulated_gyro(skt_gyro.Gyro_common):
+    """
+    Software model of one MPU6050 gyroscope axis (no hardware needed).
+
+    Output = bias + signal(t) + white noise + vibration, the noise and
+    the vibration being attenuated by the selected low-pass filter.
+    """
+    # Gyro range register value -> full scale (deg/s)
+    FULL_SCALES = {0x00 : 250, 0x08 : 500, 0x10 : 1000, 0x18 : 2000}
+
+    def __init__(self, address, axis = 'y', sensitivity = 0x10, \
+                 bias = 1.5, noise_density = 0.01, \
+                 vibration = (0.4, 60), signal = None, seed = None, \
+                 clock = time.monotonic):
+        self.name = hex(address)
+        self.bus_nb = "sim"
+        self.axis = axis
+        self.bias = bias # deg/s
+        self.noise_density = noise_density # deg/s/sqrt(Hz)
+        self.vibration = vibration # (amplitude (deg/s), frequency (Hz))
+        self.signal = signal # Board motion : function t -> deg/s
+        self.rng = random.Random(seed)
+        self.clock = clock # Time source (s), accelerated in simulations
+        self.dlpf = 0
+        self.smplrt_div = 0
+        self.nb_samples = 0
+        self.set_gyro_range(sensitivity)
+        self.init_common()
+
+    def set_gyro_range(self, sensitivity):
+        self.sensitivity = sensitivity
+        self.numerical_sensitivity = self.FULL_SCALES[sensitivity]
+
+    def read_gyro_range(self, raw = False):
+        return self.sensitivity if raw else self.numerical_sensitivity
+
+    def set_dlpf(self, dlpf_cfg):
+        self.dlpf = dlpf_cfg
+
+    def set_sample_rate_div(self, smplrt_div):
+        self.smplrt_div = smplrt_div
+
+    def get_samples(self):
+        """
+        Returns [(t (s), deg/s)], timestamped with the simulation clock.
+        """
+        return [(self.clock(), self.get_data())]
+
+    def get_data(self):
+        """
+        Returns angular rotation (in deg/s) along the chosen axis.
+        """
+        bandwidth, delay, base_rate = skt_gyro.DLPF_SETTINGS[self.dlpf]
+        # Each read returns a new sample : vibration phase follows the
+        # sensor sample rate, whatever the reading speed.
+        self.nb_samples += 1
+        t_sample = self.nb_samples * (1 + self.smplrt_div) / base_rate
+        amplitude, frequency = self.vibration
+        # First order attenuation of the vibration by the filter
+        gain = 1 / math.sqrt(1 + (frequency / bandwidth) ** 2)
+        value = self.bias \
+                + self.rng.gauss(0, self.noise_density \
+                                 * math.sqrt(bandwidth)) \
+                + gain * amplitude * math.sin(2 * math.pi * frequency \
+                                              * t_sample)
+        if self.signal is not None:
+            value += self.signal(self.clock())
+        # Quantization (16 bits signed over the full scale)
+        lsb = self.numerical_sensitivity / 32768
+        value = round(value / lsb) * lsb
+        self.read_latency = 0.0
+        return value
+
+def main():
+    """
+    Function for test purposes only.
+    """
+    gyro = Simulated_gyro(skt_gyro.Gyro_one_axis.I2C_ADDRESS_1, seed = 1)
+    for dlpf_cfg in sorted(skt_gyro.DLPF_SETTINGS):
+        gyro.set_dlpf(dlpf_cfg)
+        gyro_avg, gyro_noise = gyro.measure_stats(2000)
+        print("DLPF", dlpf_cfg, ": average", round(gyro_avg, 3), \
+              "/ noise", round(gyro_noise, 3), "deg/s")
+
+if __name__ == '__main__':
+    main()
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
@@ -0,0 +1,205 @@
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+ROOT_LOGGER = "skatepong"
+FIELDS = ("scene", "sensor", "error") # Structured fields
+# Current game scene, added to every record which has no 'scene' field.
+# Updated by the game loop (plain dict write, no lock).
+CONTEXT = {"scene" : None}
+
+_listener = None
+_rate_limit = None
+
+class Rate_limit_filter(logging.Filter):
+    """
+    Drops repeated messages (same template and arguments / level /
+    scene / sensor).
+
+    A message is let through at most once per period. The next one
+    let through carries the number of suppressed repetitions.
+
+    Entries older than the period are evicted (at most once per period)
+    so the history stays small whatever the arguments (floats...). The
+    last suppressed record of an evicted entry is passed to 'emit' with
+    the remaining repetitions count, so the end of a burst is not lost.
+    """
+    def __init__(self, period = 5, emit = None):
+        logging.Filter.__init__(self)
+        self.period = period # Minimum delay between 2 same messages (s)
+        self.emit = emit # Called with the records flushed on eviction
+        # Key -> [last emission time, nb suppressed, last suppressed]
+        self.history = {}
+        self.evicted = time.monotonic() # Last eviction time
+
+    def filter(self, record):
+        if getattr(record, "scene", None) is None:
+            record.scene = CONTEXT["scene"]
+        key = (record.msg, record.args, record.levelno, record.scene, \
+               getattr(record, "sensor", None))
+        now = time.monotonic()
+        if now - self.evicted >= self.period:
+            self.evict(now)
+        try:
+            entry = self.history.get(key)
+        except TypeError: # Unhashable arguments : formatted message
+            key = (record.getMessage(),) + key[2:]
+            entry = self.history.get(key)
+        if entry is None:
+            self.history[key] = [now, 0, None]
+            return True
+        if now - entry[0] < self.period:
+            entry[1] += 1
+            entry[2] = record
+            return False
+        record.repeated = entry[1]
+        entry[0] = now
+        entry[1] = 0
+        entry[2] = None
+        return True
+
+    def evict(self, now = None):
+        """
+        Removes the entries older than the period (all entries if now is
+        None) and flushes their suppressed repetitions.
+        """
+        self.evicted = time.monotonic() if now is None else now
+        # Copy : records may be filtered at the same time by other threads
+        for key, entry in list(self.history.items()):
+            if now is not None and now - entry[0] < self.period:
+                continue
+            self.history.pop(key, None)
+            if entry[1] and self.emit is not None:
+                # The last suppressed record stands for itself and the
+                # previous suppressed repetitions.
+                entry[2].repeated = entry[1] - 1
+                self.emit(entry[2])
+
+class Non_blocking_queue_handler(logging.handlers.QueueHandler):
+    """
+    Queue handler which never blocks nor formats in the caller thread.
+
+    Records are dropped (and counted) when the queue is full.
+    """
+    def __init__(self, log_queue):
+        logging.handlers.QueueHandler.__init__(self, log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Formatting is left to the listener thread. Arguments passed by
+        # the game are immutable values (str / int / float).
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class Structured_formatter(logging.Formatter):
+    """
+    Appends structured fields as 'key=value' after the message.
+    """
+    def __init__(self):
+        logging.Formatter.__init__(self, \
+                    "%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = logging.Formatter.format(self, record)
+        fields = []
+        for field in FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                fields.append(field + "=" + str(value))
+        repeated = getattr(record, "repeated", 0)
+        if repeated:
+            fields.append("repeated=" + str(repeated))
+        if fields:
+            line += " [" + " ".join(fields) + "]"
+        return line
+
+def get_logger(name):
+    """
+    Returns a logger of the skatepong hierarchy.
+    """
+    return logging.getLogger(ROOT_LOGGER + "." + name)
+
+def setup_logging(level = logging.INFO, period = 5, max_queue = 1000, \
+                  stream = None):
+    """
+    Routes skatepong logs through a queue to a background thread.
+
+    - Callers only apply the rate limit and push to the queue.
+    - Writing to the console / journald happens in the listener thread.
+    """
+    global _listener, _rate_limit
+    if _listener is not None:
+        return _listener
+    log_queue = queue.Queue(max_queue)
+    queue_handler = Non_blocking_queue_handler(log_queue)
+    _rate_limit = Rate_limit_filter(period, queue_handler.emit)
+    queue_handler.addFilter(_rate_limit)
+    stream_handler = logging.StreamHandler(stream or sys.stdout)
+    stream_handler.setFormatter(Structured_formatter())
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.setLevel(level)
+    logger.addHandler(queue_handler)
+    logger.propagate = False
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+def stop_logging():
+    """
+    Flushes pending records and stops the background thread.
+    """
+    global _listener
+    if _rate_limit is not None:
+        _rate_limit.evict()
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+_rate_limit = None
+
+def main():
+    """
+    Function for test purposes only.
+    """
+    setup_logging(period = 1)
+    logger = get_logger("test")
+    CONTEXT["scene"] = "wait_players"
+    start = time.perf_counter()
+    for i in range(100):
+        logger.warning("I2C communication lost", \
+                       extra = {"sensor" : "left", "error" : "IOError"})
+    print("100 log calls :", round((time.perf_counter() - start) * 1000, \
+          3), "ms")
+    time.sleep(1.1)
+    logger.warning("I2C communication lost", \
+                   extra = {"sensor" : "left", "error" : "IOError"})
+    stop_logging()
+
+if __name__ == '__main__':
+    main()
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
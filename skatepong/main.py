@@ -1,60 +1,70 @@
-#!usr/bin/python3
-
-"""
-Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
-"""
-
-#-----------------------------------------------------------------------
-# IMPORTS
-#-----------------------------------------------------------------------
-
-import skatepong.game
-import skatepong.constants as skt_cst
-
-#-----------------------------------------------------------------------
-# CODE
-#-----------------------------------------------------------------------
-
-def main():
-    """
-    2 players pong game, with real skateboards as actuators.
-    
-    - Objective : Shoot the ball beyond the oponent's zone (+1 point).
-    - End : Game ends when a player reaches a given number of points.
-    - The two paddles are controlled independently based on the angular
-      rotation measured by the gyroscopes mounted under each skateboard.
-      
-    - Games scenes :
-        WELCOME : Splash screen at application start.
-        WAITING_GYROS : Waiting that both gyroscopes are connected.
-        WAITING_PLAYERS : Waiting for motion on both skates.
-        COUNTDOWN : Countdown before the actual game starts.
-        GAME_ONGOING : Game running.
-        GAME_END : Winner is announced + pads calib before next game
-        CALIBRATION_REQUESTED : Paddles calibratation upon request.
-    """
-
-    game = skatepong.game.Game(full_screen = True)
-    while True:
-        if game.game_status == skt_cst.SCENE_WELCOME:
-            game.welcome()
-        elif game.game_status == skt_cst.SCENE_WAITING_GYROS:
-            game.wait_gyros()
-            game.create_game_elements()
-        elif game.game_status == skt_cst.SCENE_WAITING_PLAYERS:
-            game.wait_players()
-        elif game.game_status == skt_cst.SCENE_COUNTDOWN:
-            game.countdown()
-        elif game.game_status == skt_cst.SCENE_GAME_ONGOING:
-            game.game_ongoing()
-        elif game.game_status == skt_cst.SCENE_GAME_END:
-            game.game_end()
-        elif game.game_status == skt_cst.SCENE_CALIBRATION_REQUESTED:
-            game.calibrate_pads()
-
-if __name__ == '__main__':
-    main()
-
-"""
-Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
-"""
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import argparse
+import signal
+import skatepong.game
+import skatepong.log as skt_log
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+def main():
+    """
+    2 players pong game, with real skateboards as actuators.
+    
+    - Objective : Shoot the ball beyond the oponent's zone (+1 point).
+    - End : Game ends when a player reaches a given number of points.
+    - The two paddles are controlled independently based on the angular
+      rotation measured by the gyroscopes mounted under each skateboard.
+      
+    - Games scenes :
+        WELCOME : Splash screen at application start.
+        WAITING_GYROS : Waiting that both gyroscopes are connected.
+        WAITING_PLAYERS : Waiting for motion on both skates.
+        COUNTDOWN : Countdown before the actual game starts.
+        GAME_ONGOING : Game running.
+        GAME_END : Winner is announced + pads calib before next game
+        CALIBRATION_REQUESTED : Paddles calibratation upon request.
+        ATTRACT : Demo game while nobody plays.
+        NET_PLAY : Network match, one skateboard per site.
+    """
+    parser = argparse.ArgumentParser(description = "Skatepong : 2 " \
+             "players pong game, with real skateboards as actuators.")
+    parser.add_argument("--net-peer", help = "network play " \
+                        "(experimental) : other site host:port")
+    parser.add_argument("--net-port", type = int, \
+                        default = skatepong.game.Game.NET_PORT, \
+                        help = "network play : local UDP port")
+    parser.add_argument("--net-side", choices = ("left", "right"), \
+                        default = skatepong.game.Game.NET_SIDE, \
+                        help = "network play : paddle played here " \
+                        "(left : host)")
+    args = parser.parse_args()
+
+    skt_log.setup_logging()
+    if args.net_peer is not None:
+        skatepong.game.Game.NET_PEER = args.net_peer
+        skatepong.game.Game.NET_PORT = args.net_port
+        skatepong.game.Game.NET_SIDE = args.net_side
+    game = skatepong.game.Game(full_screen = True)
+    # Profiling toggled on site : kill -USR1 <pid>
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, \
+                      lambda signum, frame: game.profiler.toggle())
+    game.run()
+
+if __name__ == '__main__':
+    main()
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
@@ -0,0 +1,311 @@
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import bisect
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+class Counter():
+    """
+    Monotonic counter, optionally split by the value of one label.
+
+    Note : Increments are plain dict updates (no lock), the exporter
+    thread only reads them. A snapshot may lag by one increment.
+    """
+    def __init__(self, name, help_txt, label = None):
+        self.name = name
+        self.help_txt = help_txt
+        self.label = label # Label name (ex: 'sensor'), None if unused
+        self.values = {} # Label value -> count
+
+    def inc(self, label_value = None, amount = 1):
+        """
+        Increments the counter for the given label value.
+        """
+        self.values[label_value] = self.values.get(label_value, 0) \
+                                   + amount
+
+    def expose(self):
+        """
+        Returns the counter lines in Prometheus text format.
+        """
+        lines = ["# HELP " + self.name + " " + self.help_txt, \
+                 "# TYPE " + self.name + " counter"]
+        for label_value, count in list(self.values.items()):
+            lines.append(self.name + _labels(self.label, label_value) \
+                         + " " + _fmt(count))
+        return lines
+
+class Gauge(Counter):
+    """
+    Value that can go up and down (ex: achieved FPS).
+    """
+    def set(self, label_value, value):
+        """
+        Sets the gauge for the given label value.
+        """
+        self.values[label_value] = value
+
+    def expose(self):
+        """
+        Returns the gauge lines in Prometheus text format.
+        """
+        lines = Counter.expose(self)
+        lines[1] = "# TYPE " + self.name + " gauge"
+        return lines
+
+class Histogram():
+    """
+    Cumulative histogram with fixed buckets, split by one label.
+    """
+    def __init__(self, name, help_txt, label, buckets):
+        self.name = name
+        self.help_txt = help_txt
+        self.label = label
+        self.buckets = tuple(buckets) # Upper bounds (s), sorted
+        self.values = {} # Label value -> [bucket counts, sum, count]
+
+    def observe(self, label_value, value):
+        """
+        Records one observation for the given label value.
+        """
+        data = self.values.get(label_value)
+        if data is None:
+            data = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            self.values[label_value] = data
+        data[0][bisect.bisect_left(self.buckets, value)] += 1
+        data[1] += value
+        data[2] += 1
+
+    def expose(self):
+        """
+        Returns the histogram lines in Prometheus text format.
+        """
+        lines = ["# HELP " + self.name + " " + self.help_txt, \
+                 "# TYPE " + self.name + " histogram"]
+        for label_value, data in list(self.values.items()):
+            counts = list(data[0])
+            cumul = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumul += count
+                le = bound if bound == "+Inf" else _fmt(bound)
+                lines.append(self.name + "_bucket" \
+                             + _labels(self.label, label_value, le) \
+                             + " " + str(cumul))
+            lines.append(self.name + "_sum" \
+                         + _labels(self.label, label_value) \
+                         + " " + _fmt(data[1]))
+            lines.append(self.name + "_count" \
+                         + _labels(self.label, label_value) \
+                         + " " + str(data[2]))
+        return lines
+
+class Metrics():
+    """
+    Registry of the skatepong metrics (sensor health / frame stats).
+    """
+    # Histogram buckets (s)
+    READ_LATENCY_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, \
+                            0.05)
+    FRAME_TIME_BUCKETS = (0.01, 0.02, 0.03, 0.04, 0.05, 0.06, 0.08, \
+                          0.1, 0.2, 0.5)
+    CALIB_DURATION_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 30)
+
+    def __init__(self):
+        self.i2c_errors = Counter("skatepong_i2c_errors_total", \
+                          "I2C communication errors.", "sensor")
+        self.reconnects = Counter("skatepong_gyro_reconnects_total", \
+                          "Gyroscope reconnections after an error.", \
+                          "sensor")
+        self.reconnect_attempts = Counter( \
+                                  "skatepong_gyro_reconnect_attempts_total", \
+                                  "Gyroscope reconnection attempts.", \
+                                  "sensor")
+        self.read_latency = Histogram( \
+                            "skatepong_gyro_read_latency_seconds", \
+                            "Gyroscope read latency.", "sensor", \
+                            self.READ_LATENCY_BUCKETS)
+        self.frame_time = Histogram("skatepong_frame_time_seconds", \
+                          "Time between two frames.", "scene", \
+                          self.FRAME_TIME_BUCKETS)
+        self.fps = Gauge("skatepong_fps", "Achieved frames per second.", \
+                   "scene")
+        self.missed_frames = Counter("skatepong_missed_frames_total", \
+                             "Frames skipped after a late frame.", \
+                             "scene")
+        self.quality_level = Gauge("skatepong_quality_level", \
+                             "Rendering quality level (0 = full).")
+        self.games_played = Counter("skatepong_games_played_total", \
+                            "Games played until the end.")
+        self.calib_duration = Histogram( \
+                              "skatepong_calibration_duration_seconds", \
+                              "Paddles calibration duration.", None, \
+                              self.CALIB_DURATION_BUCKETS)
+        self.all_metrics = [self.i2c_errors, self.reconnects, \
+                            self.reconnect_attempts, \
+                            self.read_latency, self.frame_time, \
+                            self.fps, self.missed_frames, \
+                            self.quality_level, \
+                            self.games_played, \
+                            self.calib_duration]
+
+    def expose(self):
+        """
+        Returns every metric in Prometheus text format.
+        """
+        lines = []
+        for metric in self.all_metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+class Metrics_exporter():
+    """
+    Exports metrics from a background thread.
+
+    - Textfile : periodically rewritten atomically (node_exporter
+      textfile collector).
+    - HTTP : optional local endpoint serving the same content.
+    """
+    def __init__(self, metrics, textfile = None, period = 10, \
+                 http_port = None, http_host = "127.0.0.1"):
+        self.metrics = metrics
+        self.textfile = textfile
+        self.period = period # Textfile refresh period (s)
+        self.http_port = http_port
+        self.http_host = http_host
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.http_server = None
+
+    def start(self):
+        """
+        Starts the export threads (textfile + HTTP if configured).
+        """
+        if self.textfile is not None:
+            self.thread = threading.Thread(target = self._run, \
+                          name = "metrics-textfile", daemon = True)
+            self.thread.start()
+        if self.http_port is not None:
+            self.http_server = ThreadingHTTPServer( \
+                               (self.http_host, self.http_port), \
+                               self._make_handler())
+            self.http_server.daemon_threads = True
+            threading.Thread(target = self.http_server.serve_forever, \
+                             name = "metrics-http", daemon = True).start()
+
+    def stop(self):
+        """
+        Stops the export threads and writes the textfile one last time.
+        """
+        self.stop_event.set()
+        if self.http_server is not None:
+            self.http_server.shutdown()
+            self.http_server.server_close()
+        if self.thread is not None:
+            self.thread.join()
+            self.write_textfile()
+
+    def write_textfile(self):
+        """
+        Writes the metrics in a temp file then renames it (atomic).
+        """
+        directory = os.path.dirname(os.path.abspath(self.textfile))
+        os.makedirs(directory, exist_ok = True)
+        fd, tmp_path = tempfile.mkstemp(dir = directory, \
+                                        prefix = ".skatepong_metrics")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(self.metrics.expose())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.textfile)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _run(self):
+        while not self.stop_event.wait(self.period):
+            self.write_textfile()
+
+    def _make_handler(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.expose().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", \
+                                 "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass # No access log on the console
+
+        return Handler
+
+def _labels(label, label_value, le = None):
+    """
+    Formats the label set of one sample ('' when there is no label).
+    """
+    pairs = []
+    if label is not None:
+        pairs.append(label + '="' + str(label_value) + '"')
+    if le is not None:
+        pairs.append('le="' + le + '"')
+    if not pairs:
+        return ""
+    return "{" + ",".join(pairs) + "}"
+
+def _fmt(value):
+    """
+    Formats a sample value (integers kept without decimals).
+    """
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+def main():
+    """
+    Function for test purposes only.
+    """
+    metrics = Metrics()
+    metrics.i2c_errors.inc("left")
+    metrics.reconnect_attempts.inc("left")
+    metrics.reconnects.inc("left")
+    metrics.read_latency.observe("left", 0.0012)
+    metrics.frame_time.observe("game_ongoing", 0.04)
+    metrics.fps.set("game_ongoing", 24.8)
+    metrics.games_played.inc()
+    metrics.calib_duration.observe(None, 1.3)
+    print(metrics.expose())
+    exporter = Metrics_exporter(metrics, textfile = os.path.join( \
+               tempfile.gettempdir(), "skatepong_test.prom"), period = 1)
+    exporter.start()
+    time.sleep(1.5)
+    exporter.stop()
+    print("Textfile written :", exporter.textfile)
+
+if __name__ == '__main__':
+    main()
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
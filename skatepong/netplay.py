@@ -0,0 +1,544 @@
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import argparse
+import heapq
+import json
+import random
+import socket
+import statistics
+import struct
+import time
+import skatepong.broadcast as skt_bct
+import skatepong.game as skt_game
+import skatepong.game_objects as skt_obj
+import skatepong.log as skt_log
+import skatepong.sound as skt_snd
+import skatepong.stats as skt_sts
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+logger = skt_log.get_logger("netplay")
+
+"""
+Two sites play the same match, each one owning a paddle (left site :
+host, authoritative for the ball ; right site : guest).
+
+Inputs are the paddle velocities (px per frame of the match court,
+integrated from the gyroscope by the sending site) : both sites move
+the paddles from the same inputs.
+
+Packets (UDP, little endian, fixed sizes) :
+- header : magic, version, kind (HELLO / INPUTS / STATE), frame number.
+- hello : sent until the other site answers (match not started).
+- inputs : number of inputs, then the paddle velocity of the sender
+  for the last REDUNDANCY frames up to the frame number (resent in the
+  next packets : a lost packet does not lose inputs).
+- state (host only) : match state before the frame number, once the
+  host knows both inputs of all previous frames : ball center /
+  velocity, paddles tops, scores, goal pending.
+"""
+MAGIC = b"SN"
+VERSION = 2
+INPUTS = 0
+STATE = 1
+HELLO = 2
+REDUNDANCY = 8
+HEADER = struct.Struct("<2sBBI")
+INPUTS_BODY = struct.Struct("<B" + "h" * REDUNDANCY)
+STATE_BODY = struct.Struct("<hhhhhhBBB")
+LEFT = 0
+RIGHT = 1
+
+class Net_match(skt_game.Game_rules):
+    """
+    Game physics without display nor gyroscopes (Game collision / goal
+    rules) on a court of fixed size (same on both sites) : the paddles
+    velocities are given for each frame, the state can be saved and
+    restored (rollbacks).
+    sound : effects of the collisions / goals (None : silent). No match
+    statistics recorded.
+    """
+    # Rules parameters of the game (same on both sites)
+    FPS = skt_game.Game.FPS
+    WINNING_SCORE = skt_game.Game.WINNING_SCORE
+    BALL_ANGLE_MAX = skt_game.Game.BALL_ANGLE_MAX
+    PAD_WIDTH_RATIO = skt_game.Game.PAD_WIDTH_RATIO
+    PAD_HEIGHT_RATIO = skt_game.Game.PAD_HEIGHT_RATIO
+    PAD_X_OFFSET_RATIO = skt_game.Game.PAD_X_OFFSET_RATIO
+    BALL_RADIUS_RATIO = skt_game.Game.BALL_RADIUS_RATIO
+    PAD_FLAT_BOUNCE_RATIO = skt_game.Game.PAD_FLAT_BOUNCE_RATIO
+    BALL_V_RATIO = skt_game.Game.BALL_V_RATIO
+
+    def __init__(self, win_w = 1280, win_h = 720, serve = 1, sound = None):
+        self.win_w = win_w
+        self.win_h = win_h
+        if sound is None:
+            sound = skt_snd.Sound_effects(enabled = False)
+        self.sound = sound
+        self.stats = skt_sts.Stats_recorder(None)
+        pad_w, pad_h, ball_r, ball_vx_straight = self.comp_elem_sizes()
+        l_pad_x = int(win_w * self.PAD_X_OFFSET_RATIO)
+        r_pad_x = win_w - int(self.PAD_X_OFFSET_RATIO * win_w) - pad_w
+        pad_y = (win_h - pad_h) // 2
+        self.l_pad = skt_obj.Paddle(None, win_h, l_pad_x, pad_y, pad_w, \
+                                    pad_h, None, None, 0)
+        self.r_pad = skt_obj.Paddle(None, win_h, r_pad_x, pad_y, pad_w, \
+                                    pad_h, None, None, 0)
+        self.ball = skt_obj.Ball(None, int(0.50 * win_w), \
+                                 int(0.50 * win_h), ball_r, None, \
+                                 ball_vx_straight, \
+                                 serve * ball_vx_straight, 0)
+        self.frame = 0 # Frames simulated
+        self.l_score = 0
+        self.r_score = 0
+        self.goal_to_be = False
+
+    def now(self):
+        """
+        Match time (s), from the frames played.
+        """
+        return self.frame / self.FPS
+
+    def clamp(self, top):
+        """
+        Paddle top kept on screen.
+        """
+        return min(max(int(top), 0), self.win_h - self.l_pad.h)
+
+    def simulate(self, l_vy, r_vy):
+        """
+        Plays one frame with the given paddles velocities (px).
+        A new match starts once a player reached WINNING_SCORE.
+        """
+        self.l_pad.rect.top = self.clamp(self.l_pad.rect.top + l_vy)
+        self.r_pad.rect.top = self.clamp(self.r_pad.rect.top + r_vy)
+        self.ball.move()
+        self.goal_to_be = self.handle_collision(self.goal_to_be)
+        self.goal_to_be = self.detect_goal(self.goal_to_be)
+        if self.l_score >= self.WINNING_SCORE \
+        or self.r_score >= self.WINNING_SCORE:
+            self.l_score = 0
+            self.r_score = 0
+        self.frame += 1
+
+    def snapshot(self):
+        """
+        State before the next frame (as sent by the host).
+        """
+        ball = self.ball
+        return (self.frame, ball.rect.centerx, ball.rect.centery, \
+                int(ball.vx), int(ball.vy), self.l_pad.rect.top, \
+                self.r_pad.rect.top, self.l_score, self.r_score, \
+                int(self.goal_to_be))
+
+    def restore(self, snapshot):
+        self.frame, x, y, self.ball.vx, self.ball.vy, \
+        self.l_pad.rect.top, self.r_pad.rect.top, self.l_score, \
+        self.r_score, goal_to_be = snapshot
+        self.ball.rect.center = (x, y)
+        self.goal_to_be = bool(goal_to_be)
+
+class Udp_link():
+    """
+    UDP socket to the other site, with optional artificial delay /
+    jitter (s) and loss (ratio) for tests : packets held until due.
+    """
+    def __init__(self, sock, peer, delay = 0, jitter = 0, loss = 0, \
+                 seed = None, clock = time.monotonic):
+        self.sock = sock
+        self.sock.setblocking(False)
+        self.peer = peer # (host, port)
+        self.delay = delay
+        self.jitter = jitter
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.clock = clock
+        self.held = [] # Heap of (due time, order, packet)
+        self.nb_held = 0
+        self.nb_sent = 0
+        self.nb_bytes = 0
+        self.nb_lost = 0
+
+    def send(self, packet):
+        self.nb_sent += 1
+        self.nb_bytes += len(packet)
+        if self.loss and self.rng.random() < self.loss:
+            self.nb_lost += 1
+            return
+        if not self.delay and not self.jitter:
+            self.sock.sendto(packet, self.peer)
+            return
+        due = self.clock() + self.delay + self.rng.uniform(0, self.jitter)
+        self.nb_held += 1
+        heapq.heappush(self.held, (due, self.nb_held, packet))
+
+    def flush(self):
+        """
+        Sends the packets held whose delay elapsed.
+        """
+        now = self.clock()
+        while self.held and self.held[0][0] <= now:
+            self.sock.sendto(heapq.heappop(self.held)[2], self.peer)
+
+    def receive(self):
+        """
+        Returns the packets received (without waiting).
+        """
+        packets = []
+        while True:
+            try:
+                packets.append(self.sock.recv(64))
+            except BlockingIOError:
+                return packets
+
+def open_link(port, peer):
+    """
+    UDP link to the other site (peer : "host:port"), from the local port.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("", port))
+    return Udp_link(sock, skt_bct.parse_address(peer))
+
+class Net_site():
+    """
+    One site of a network match : sends its paddle inputs, predicts the
+    remote paddle until its inputs arrive, then rolls back and plays
+    the frames again (silently) when a prediction was wrong.
+
+    - Match started once the other site answered (HELLO packets).
+    - The remote paddle keeps its last known velocity for
+      PREDICT_FRAMES frames, then is held.
+    - Lockstep bound : a site does not run more than MAX_PREDICTION
+      frames ahead of the remote inputs (frames stalled).
+    - The guest checks its state against the host state and takes it
+      over if they differ (correction, should never happen as both
+      sites play the same rules with the same inputs).
+    input_func(match) : local paddle velocity (px) for the next frame.
+    """
+    MAX_ROLLBACK = 50 # Frames kept to be played again (2 s at 25 FPS)
+    MAX_PREDICTION = 40 # Frames played ahead of the remote inputs
+    PREDICT_FRAMES = 3 # Remote paddle motion extrapolated (frames)
+    STATE_PERIOD = 5 # Host state sent every STATE_PERIOD frames
+
+    def __init__(self, side, link, input_func, match):
+        self.side = side
+        self.link = link
+        self.input_func = input_func
+        self.match = match # Net_match, not started
+        self.peer_seen = False # Packet received from the other site
+        self.local = {} # Frame -> local paddle velocity
+        self.remote = {} # Frame -> remote paddle velocity (received)
+        self.predicted = {} # Frame -> remote velocity predicted
+        self.snapshots = {} # Frame -> state before the frame
+        self.confirmed = -1 # Remote inputs known up to this frame
+        # Statistics
+        self.nb_stalls = 0
+        self.rollbacks = [] # Frames played again per rollback
+        self.prediction_errors = [] # |predicted - received| (px / frame)
+        self.input_ages = [] # Local frame - remote input frame, arrival
+        self.nb_corrections = 0
+        self.nb_too_late = 0 # Mispredictions older than MAX_ROLLBACK
+
+    def pads(self, frame):
+        """
+        Left / right paddles velocities for a frame (remote one predicted
+        if not received yet).
+        """
+        remote = self.remote.get(frame)
+        if remote is None:
+            remote = self.predict(frame)
+            self.predicted[frame] = remote
+        if self.side == LEFT:
+            return self.local[frame], remote
+        return remote, self.local[frame]
+
+    def predict(self, frame):
+        last = self.confirmed
+        if last < 0 or frame - last > self.PREDICT_FRAMES:
+            return 0
+        return self.remote[last]
+
+    def step(self):
+        """
+        Plays the next frame (unless stalled). Returns True if played.
+        """
+        self.link.flush()
+        self.receive()
+        if not self.peer_seen:
+            self.link.send(HEADER.pack(MAGIC, VERSION, HELLO, 0))
+            return False
+        frame = self.match.frame
+        if frame - self.confirmed > self.MAX_PREDICTION:
+            self.nb_stalls += 1
+            self.send_inputs()
+            return False
+        h = self.match.win_h
+        self.local[frame] = max(-h, min(h, \
+                                int(self.input_func(self.match))))
+        self.snapshots[frame] = self.match.snapshot()
+        self.match.simulate(*self.pads(frame))
+        self.send_inputs()
+        if self.side == LEFT and frame % self.STATE_PERIOD == 0:
+            self.send_state()
+        self.prune()
+        self.link.flush()
+        return True
+
+    def send_inputs(self):
+        last = self.match.frame - 1
+        if last < 0:
+            return
+        first = max(last - REDUNDANCY + 1, 0)
+        vys = [self.local[frame] for frame in range(first, last + 1)]
+        vys += [0] * (REDUNDANCY - len(vys))
+        self.link.send(HEADER.pack(MAGIC, VERSION, INPUTS, last) \
+                       + INPUTS_BODY.pack(last - first + 1, *vys))
+
+    def send_state(self):
+        """
+        Host : sends the state of the last frame with all inputs known.
+        """
+        snapshot = self.snapshots.get(self.confirmed + 1)
+        if snapshot is not None:
+            self.link.send(HEADER.pack(MAGIC, VERSION, STATE, \
+                           snapshot[0]) + STATE_BODY.pack(*snapshot[1:]))
+
+    def receive(self):
+        rollback_from = None
+        host_snapshots = []
+        for packet in self.link.receive():
+            if len(packet) < HEADER.size:
+                continue
+            magic, version, kind, frame = HEADER.unpack_from(packet)
+            if magic != MAGIC or version != VERSION:
+                continue
+            self.peer_seen = True
+            if kind == INPUTS \
+            and len(packet) == HEADER.size + INPUTS_BODY.size:
+                count, *vys = INPUTS_BODY.unpack_from(packet, HEADER.size)
+                for i in range(count):
+                    input_frame = frame - count + 1 + i
+                    if input_frame in self.remote \
+                    or input_frame <= self.confirmed - self.MAX_ROLLBACK:
+                        continue
+                    self.remote[input_frame] = vys[i]
+                    self.input_ages.append(self.match.frame - input_frame)
+                    predicted = self.predicted.pop(input_frame, None)
+                    if predicted is None:
+                        continue
+                    self.prediction_errors.append(abs(predicted - vys[i]))
+                    if predicted != vys[i] and (rollback_from is None \
+                    or input_frame < rollback_from):
+                        rollback_from = input_frame
+            elif kind == STATE and self.side == RIGHT \
+            and len(packet) == HEADER.size + STATE_BODY.size:
+                host_snapshots.append((frame,) \
+                    + STATE_BODY.unpack_from(packet, HEADER.size))
+        while self.confirmed + 1 in self.remote:
+            self.confirmed += 1
+        if rollback_from is not None:
+            self.rollback(rollback_from)
+        for snapshot in host_snapshots:
+            self.check_state(snapshot)
+
+    def rollback(self, frame):
+        """
+        Plays again the frames from the given one (inputs updated).
+        """
+        snapshot = self.snapshots.get(frame)
+        if snapshot is None:
+            self.nb_too_late += 1
+            return
+        self.rollbacks.append(self.match.frame - frame)
+        self.replay(snapshot)
+
+    def check_state(self, host_snapshot):
+        """
+        Guest : compares the host state with the local one (same frame,
+        once all previous inputs are known), takes it over if different.
+        """
+        frame = host_snapshot[0]
+        if frame > self.confirmed + 1 or frame not in self.snapshots:
+            return
+        if self.snapshots[frame] == host_snapshot:
+            return
+        self.nb_corrections += 1
+        logger.warning("State differs from host : corrected", \
+                       extra = {"frame" : frame})
+        self.replay(host_snapshot)
+
+    def replay(self, snapshot):
+        """
+        Restores a state and plays the frames again up to the current
+        one (sounds already played, not played again).
+        """
+        current = self.match.frame
+        self.match.restore(snapshot)
+        self.match.sound.suspend()
+        for frame in range(snapshot[0], current):
+            self.snapshots[frame] = self.match.snapshot()
+            self.match.simulate(*self.pads(frame))
+        self.match.sound.suspend(False)
+
+    def prune(self):
+        """
+        Forgets the frames which cannot be played again anymore.
+        """
+        oldest = min(self.match.frame, self.confirmed + 1) \
+                 - self.MAX_ROLLBACK
+        for history in (self.snapshots, self.local, self.remote, \
+                        self.predicted):
+            for frame in [f for f in history if f < oldest]:
+                del history[frame]
+
+    def report(self, duration):
+        """
+        Latency hiding / bandwidth statistics (duration : s played).
+        """
+        rollbacks = self.rollbacks or [0]
+        errors = self.prediction_errors or [0]
+        ages = self.input_ages or [0]
+        return {"frames" : self.match.frame, \
+                "stalls" : self.nb_stalls, \
+                "input_age_frames" : statistics.mean(ages), \
+                "rollbacks" : len(self.rollbacks), \
+                "rollback_frames_mean" : statistics.mean(rollbacks), \
+                "rollback_frames_max" : max(rollbacks), \
+                "predictions" : len(self.prediction_errors), \
+                "prediction_exact_pct" : 100 * errors.count(0) \
+                                         / len(errors), \
+                "prediction_error_vy" : statistics.mean(errors), \
+                "corrections" : self.nb_corrections, \
+                "too_late" : self.nb_too_late, \
+                "packets_per_s" : self.link.nb_sent / duration, \
+                "bytes_per_s" : self.link.nb_bytes / duration, \
+                "lost" : self.link.nb_lost}
+
+class Tracking_input():
+    """
+    Simulated player : paddle following the ball of the site (aim
+    error drawn at each hit, limited paddle speed), returns its velocity.
+    """
+    def __init__(self, side, seed, max_speed = 0.03, aim_noise = 0.1):
+        self.side = side
+        self.rng = random.Random(seed)
+        self.max_speed = max_speed # Ratio of height per frame
+        self.aim_noise = aim_noise # Ratio of paddle height
+        self.aim = 0
+        self.prev_vx = None
+
+    def __call__(self, match):
+        pad = match.l_pad if self.side == LEFT else match.r_pad
+        if self.prev_vx is None or (match.ball.vx > 0) != self.prev_vx:
+            self.aim = self.rng.gauss(0, self.aim_noise) * pad.h
+        self.prev_vx = match.ball.vx > 0
+        target = match.ball.rect.centery - pad.h // 2 + self.aim
+        max_move = self.max_speed * match.win_h
+        return int(max(-max_move, min(max_move, target - pad.rect.top)))
+
+def loopback_test(nb_frames = 3000, delay = 0.05, jitter = 0.02, \
+                  loss = 0.05, seed = 1, fps = 25):
+    """
+    Plays a match between 2 sites over the loopback interface, with
+    artificial delay / jitter (s, each way) and loss, in accelerated
+    time. Checks both sites against the same match played offline
+    with the inputs of both sites.
+    Returns (consistent, left report, right report).
+    """
+    clock = [0.0]
+    socks = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) \
+             for side in (LEFT, RIGHT)]
+    for sock in socks:
+        sock.bind(("127.0.0.1", 0))
+    inputs = ({}, {}) # Every local input (offline reference)
+    sites = []
+    for side in (LEFT, RIGHT):
+        link = Udp_link(socks[side], socks[1 - side].getsockname(), \
+                        delay, jitter, loss, seed * 2 + side, \
+                        clock = lambda: clock[0])
+        player = Tracking_input(side, seed * 2 + side)
+
+        def input_func(match, player = player, side = side):
+            vy = player(match)
+            inputs[side][match.frame] = vy
+            return vy
+        sites.append(Net_site(side, link, input_func, \
+                              Net_match(serve = 1 if seed % 2 else -1)))
+    nb_ticks = 0
+    while min(site.match.frame for site in sites) < nb_frames \
+    and nb_ticks < 2 * nb_frames:
+        for site in sites:
+            site.step()
+        nb_ticks += 1
+        clock[0] = nb_ticks / fps
+        time.sleep(0) # Loopback packets delivered
+    # Remote inputs still in flight : delivered, both sites settled
+    for i in range(int((delay + jitter) * fps) + 2):
+        clock[0] += 1 / fps
+        time.sleep(0.001)
+        for site in sites:
+            site.link.flush()
+            site.receive()
+    for sock in socks:
+        sock.close()
+    # Offline reference up to the last frame confirmed by both sites
+    last = min(min(site.confirmed for site in sites), \
+               len(inputs[LEFT]) - 1, len(inputs[RIGHT]) - 1)
+    reference = Net_match(serve = 1 if seed % 2 else -1)
+    for frame in range(last + 1):
+        reference.simulate(inputs[LEFT][frame], inputs[RIGHT][frame])
+    consistent = all(site.snapshots.get(last + 1, \
+                     site.match.snapshot()) == reference.snapshot() \
+                     for site in sites)
+    duration = nb_ticks / fps
+    return consistent, sites[LEFT].report(duration), \
+           sites[RIGHT].report(duration)
+
+def main():
+    """
+    Network play check over the loopback interface.
+    """
+    parser = argparse.ArgumentParser(description = "Skatepong network " \
+             "play : two sites playing over the loopback interface, " \
+             "with artificial delay and packet loss.")
+    parser.add_argument("--frames", type = int, default = 3000)
+    parser.add_argument("--delay", type = float, default = 0.05, \
+                        help = "one way delay (s)")
+    parser.add_argument("--jitter", type = float, default = 0.02, \
+                        help = "max extra delay (s)")
+    parser.add_argument("--loss", type = float, default = 0.05, \
+                        help = "ratio of packets lost")
+    parser.add_argument("--seed", type = int, default = 1)
+    parser.add_argument("--json", help = "saves the reports (file)")
+    args = parser.parse_args()
+    skt_log.setup_logging()
+
+    consistent, left, right = loopback_test(args.frames, args.delay, \
+                              args.jitter, args.loss, args.seed)
+    for name, report in (("left (host)", left), ("right (guest)", right)):
+        print(name, ":", ", ".join("%s %s" % (key, round(value, 2)) \
+              for key, value in report.items()))
+    print("Sites consistent with the offline match :", consistent)
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump({"consistent" : consistent, "left" : left, \
+                       "right" : right}, f, indent = 2)
+    if not consistent:
+        parser.exit(1)
+
+if __name__ == '__main__':
+    main()
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
@@ -0,0 +1,123 @@
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import collections
+import math
+import time
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+def now():
+    """
+    Game time source (s) : monotonic, not affected by NTP adjustments.
+    """
+    return time.monotonic_ns() / 1e9
+
+class Frame_pacer():
+    """
+    Frame scheduler based on monotonic deadlines (replaces Clock.tick).
+
+    - Sleeps until shortly before the deadline, then spins : the frame
+      starts on time whatever the sleep granularity (precise frames,
+      else sleeps until the deadline : no CPU used, start less exact).
+    - Late frames are not caught up : every late frame counts as
+      missed (with the deadlines it overran), the next deadline is the
+      first one of the original grid after the current time.
+    - vsync mode : the display update already waits for the screen
+      refresh, the pacer only measures.
+    """
+    SPIN_NS = 1000000 # Busy wait before the deadline (ns)
+    HISTORY = 250 # Frame intervals kept for the jitter report
+
+    def __init__(self, fps, vsync = False):
+        self.period_ns = int(1e9 / fps)
+        self.vsync = vsync
+        self.intervals = collections.deque(maxlen = self.HISTORY) # ns
+        self.nb_frames = 0
+        self.nb_missed = 0
+        self.reset()
+
+    def reset(self):
+        """
+        Restarts the deadlines from now (after an idle wait).
+        """
+        self.last_ns = time.monotonic_ns()
+        self.deadline_ns = self.last_ns + self.period_ns
+
+    def wait(self, precise = True):
+        """
+        Waits for the next frame deadline (spinning before it if
+        precise). Returns the time elapsed since the previous frame (ms).
+        """
+        now_ns = time.monotonic_ns()
+        if not self.vsync:
+            if now_ns > self.deadline_ns:
+                # Late : deadlines overrun counted, next one on the grid
+                missed = 1 + (now_ns - self.deadline_ns) // self.period_ns
+                self.nb_missed += missed
+                self.deadline_ns += missed * self.period_ns
+            else:
+                sleep_ns = self.deadline_ns - now_ns
+                if precise:
+                    sleep_ns -= self.SPIN_NS
+                if sleep_ns > 0:
+                    time.sleep(sleep_ns / 1e9)
+                while time.monotonic_ns() < self.deadline_ns:
+                    pass
+                self.deadline_ns += self.period_ns
+            now_ns = time.monotonic_ns()
+        interval_ns = now_ns - self.last_ns
+        self.last_ns = now_ns
+        self.intervals.append(interval_ns)
+        self.nb_frames += 1
+        return interval_ns / 1e6
+
+    def fps(self):
+        """
+        Achieved frames per second (recent frames).
+        """
+        if not self.intervals:
+            return 0.0
+        return 1e9 * len(self.intervals) / sum(self.intervals)
+
+    def report(self):
+        """
+        Frame interval statistics (ms) over the recent frames.
+        """
+        intervals = sorted(interval / 1e6 for interval in self.intervals)
+        report = {"frames" : self.nb_frames, "missed" : self.nb_missed, \
+                  "target_ms" : self.period_ns / 1e6, "fps" : self.fps()}
+        if intervals:
+            n = len(intervals)
+            mean = sum(intervals) / n
+            report["mean_ms"] = mean
+            report["jitter_ms"] = math.sqrt(sum((i - mean) ** 2 \
+                                  for i in intervals) / n)
+            report["p99_ms"] = intervals[min(n - 1, int(0.99 * n))]
+            report["max_ms"] = intervals[-1]
+        return report
+
+def main():
+    """
+    Function for test purposes only.
+    """
+    pacer = Frame_pacer(25)
+    for i in range(100):
+        pacer.wait()
+    print(pacer.report())
+
+if __name__ == '__main__':
+    main()
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
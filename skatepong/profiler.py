@@ -0,0 +1,179 @@
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import collections
+import cProfile
+import os
+import sys
+import threading
+import time
+import skatepong.log as skt_log
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+logger = skt_log.get_logger("profiler")
+
+MODES = ("cprofile", "sample")
+
+class Stack_sampler():
+    """
+    Low overhead profiler : a background thread records the call stack
+    of the game thread periodically. Saved as collapsed stacks (one
+    line per stack : "frame;frame;... count"), the flame graph format.
+    """
+    def __init__(self, period = 0.005, thread_id = None):
+        self.period = period # Sampling period (s)
+        if thread_id is None:
+            thread_id = threading.get_ident()
+        self.thread_id = thread_id # Thread sampled
+        self.stacks = collections.Counter()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target = self._run, \
+                      name = "profiler-sampler", daemon = True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write("%s %s\n" % (stack, count))
+
+    def _run(self):
+        while not self.stop_event.wait(self.period):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append("%s (%s:%s)" % (code.co_name, \
+                             os.path.basename(code.co_filename), \
+                             code.co_firstlineno))
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+class Frame_profiler():
+    """
+    Profiles the next game frames on request, without restarting the
+    game (operator keys / signal).
+
+    - cprofile : deterministic profile, saved as a pstats file.
+    - sample : stack sampler thread, saved as collapsed stacks.
+    Files are named after the scene profiled and the start time.
+    """
+    def __init__(self, directory, nb_frames = 250, mode = "cprofile", \
+                 sample_period = 0.005):
+        if mode not in MODES:
+            raise ValueError("Unknown profiling mode : " + str(mode))
+        self.directory = directory
+        self.nb_frames = nb_frames # Frames profiled per request
+        self.mode = mode
+        self.sample_period = sample_period # Sampler period (s)
+        self.requested = False
+        self.profile = None # Running profiler
+        self.scene_name = None
+        self.start_time = None
+        self.nb_done = 0
+
+    def toggle(self):
+        """
+        Requests to start profiling, or to stop it if running.
+        Note : only sets a flag (can be called from a signal handler),
+        applied at the next frame.
+        """
+        self.requested = True
+
+    def frame(self, scene_name):
+        """
+        To be called at the start of every frame. A profile only covers
+        one scene : stopped and saved when the scene changes.
+        """
+        if self.requested:
+            self.requested = False
+            if self.profile is None:
+                self.start(scene_name)
+            else:
+                self.stop()
+            return
+        if self.profile is not None:
+            if scene_name != self.scene_name:
+                self.stop()
+                return
+            self.nb_done += 1
+            if self.nb_done >= self.nb_frames:
+                self.stop()
+
+    def start(self, scene_name):
+        self.scene_name = scene_name
+        self.start_time = time.time()
+        self.nb_done = 0
+        if self.mode == "cprofile":
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        else:
+            self.profile = Stack_sampler(self.sample_period)
+            self.profile.start()
+        logger.info("Profiling started (%s mode), %s frames", self.mode, \
+                    self.nb_frames)
+
+    def stop(self):
+        """
+        Stops profiling and saves the results. Returns the file path.
+        """
+        profile = self.profile
+        self.profile = None
+        if self.mode == "cprofile":
+            profile.disable()
+            ext = "pstats"
+        else:
+            profile.stop()
+            ext = "collapsed"
+        path = os.path.join(self.directory, "%s_%s.%s" % (self.scene_name, \
+               time.strftime("%Y%m%d-%H%M%S", \
+                             time.localtime(self.start_time)), ext))
+        try:
+            os.makedirs(self.directory, exist_ok = True)
+            if self.mode == "cprofile":
+                profile.dump_stats(path)
+            else:
+                profile.dump(path)
+        except OSError as err:
+            logger.warning("Profile not saved", \
+                           extra = {"error" : repr(err)})
+            return None
+        logger.info("Profile saved : %s (%s frames)", path, self.nb_done)
+        return path
+
+def main():
+    """
+    Function for test purposes only.
+    """
+    skt_log.setup_logging()
+    for mode in MODES:
+        profiler = Frame_profiler("/tmp/skatepong_profiles", 50, mode)
+        profiler.toggle()
+        for i in range(60):
+            profiler.frame("test" if i < 40 else "other")
+            sum(j * j for j in range(20000))
+            time.sleep(0.001)
+
+if __name__ == '__main__':
+    main()
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
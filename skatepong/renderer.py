@@ -0,0 +1,214 @@
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import argparse
+import time
+import pygame
+import skatepong.log as skt_log
+
+try:
+    from pygame._sdl2 import video
+except ImportError: # pygame 1 / built without SDL2 renderer API
+    video = None
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+logger = skt_log.get_logger("renderer")
+
+BACKENDS = ("software", "texture")
+
+class Software_renderer():
+    """
+    Frames drawn by the CPU on the display surface, regions copied to
+    the screen by pygame.display.update.
+    """
+    NAME = "software"
+    SPRITES = False # Moving objects drawn on the canvas
+
+    def __init__(self, size, full_screen = False, vsync = False, \
+                 title = "Skatepong"):
+        flags = pygame.FULLSCREEN if full_screen else 0
+        self.vsync = False
+        self.surface = None
+        if vsync:
+            try:
+                self.surface = pygame.display.set_mode(size, \
+                               flags | pygame.SCALED, vsync = 1)
+            except pygame.error as err:
+                logger.warning("Vsync not available", \
+                               extra = {"error" : repr(err)})
+            else:
+                self.vsync = True
+        if self.surface is None:
+            self.surface = pygame.display.set_mode(size, flags)
+        if not full_screen:
+            pygame.display.set_caption(title)
+
+    def sprite(self, surf):
+        return surf
+
+    def draw_sprite(self, slot, sprite, rect):
+        self.surface.blit(sprite, rect)
+        return rect.copy()
+
+    def present(self, rects):
+        pygame.display.update(rects)
+
+    def close(self):
+        pass
+
+class Texture_renderer():
+    """
+    Frames composed by the GPU (SDL2 renderer, pygame._sdl2.video).
+
+    - Canvas : the scenes still draw texts / court on a surface, only
+      its regions invalidated are uploaded to a persistent texture.
+    - Sprites : ball and paddles are textures uploaded once, copied at
+      their position on top of the canvas at each presented frame.
+    - Scaling : the game resolution is stretched to the screen by the
+      GPU (full screen at the desktop resolution).
+    driver : SDL render driver name ("opengles2", "software"...), None
+    for the first accelerated one.
+    """
+    NAME = "texture"
+    SPRITES = True # Moving objects composed as textures
+    NB_SLOTS = 3 # Sprites shown at once : ball, left / right paddles
+
+    def __init__(self, size, full_screen = False, vsync = False, \
+                 title = "Skatepong", driver = None):
+        if video is None:
+            raise pygame.error("pygame._sdl2.video not available")
+        index = -1
+        if driver is not None:
+            names = [info.name for info in video.get_drivers()]
+            if driver not in names:
+                raise pygame.error("Unknown render driver : " + driver)
+            index = names.index(driver)
+        self.window = video.Window(title, size, \
+                                   fullscreen_desktop = full_screen)
+        try:
+            self.renderer = video.Renderer(self.window, index = index, \
+                                           vsync = vsync)
+            self.renderer.logical_size = size
+            self.target = video.Texture(self.renderer, size, \
+                                        streaming = True)
+        except pygame.error:
+            self.window.destroy()
+            raise
+        self.vsync = vsync
+        # Canvas format : no display mode set with this renderer
+        self.surface = pygame.Surface(size, 0, 32)
+        self.rect = self.surface.get_rect()
+        self.target.update(self.surface)
+        # Sprites drawn since the last presented frame (per slot)
+        self.shown = [None] * self.NB_SLOTS
+        self.shown_rects = [None] * self.NB_SLOTS
+
+    def sprite(self, surf):
+        """
+        Returns the texture of a sprite surface (black : transparent).
+        """
+        surf = surf.copy()
+        surf.set_colorkey((0, 0, 0))
+        return video.Texture.from_surface(self.renderer, surf)
+
+    def draw_sprite(self, slot, sprite, rect):
+        """
+        Shows a sprite at rect in the next presented frame (replaces the
+        sprite previously drawn in the slot). Returns the rect drawn.
+        """
+        rect = rect.copy()
+        self.shown[slot] = sprite
+        self.shown_rects[slot] = rect
+        return rect
+
+    def present(self, rects):
+        """
+        Uploads the canvas regions changed, composes the frame.
+        """
+        surface = self.surface
+        target = self.target
+        for rect in rects:
+            area = rect.clip(self.rect)
+            if area:
+                target.update(surface.subsurface(area), area)
+        target.draw()
+        shown = self.shown
+        for slot in range(self.NB_SLOTS):
+            if shown[slot] is not None:
+                shown[slot].draw(None, self.shown_rects[slot])
+                shown[slot] = None
+        self.renderer.present()
+
+    def close(self):
+        self.window.destroy()
+
+def create_renderer(backend, size, full_screen = False, vsync = False, \
+                    title = "Skatepong", driver = None):
+    """
+    Returns the renderer of the given backend ("software" / "texture").
+    Falls back to the software renderer if the texture one fails.
+    """
+    if backend not in BACKENDS:
+        raise ValueError("Unknown renderer : " + str(backend))
+    if backend == "texture":
+        try:
+            renderer = Texture_renderer(size, full_screen, vsync, title, \
+                                        driver)
+        except pygame.error as err:
+            logger.warning("Texture renderer not available, software " \
+                           "renderer used", extra = {"error" : repr(err)})
+        else:
+            logger.info("Texture renderer used (%s driver)", \
+                        driver or "default")
+            return renderer
+    return Software_renderer(size, full_screen, vsync, title)
+
+def main():
+    """
+    Function for test purposes only : moving sprite, frames per second.
+    """
+    parser = argparse.ArgumentParser(description = "Skatepong renderer " \
+             "test : a paddle moving on a 1280x720 canvas.")
+    parser.add_argument("--renderer", choices = BACKENDS, \
+                        default = "texture")
+    parser.add_argument("--driver", help = "SDL render driver")
+    parser.add_argument("--frames", type = int, default = 500)
+    args = parser.parse_args()
+    skt_log.setup_logging()
+    pygame.init()
+    renderer = create_renderer(args.renderer, (1280, 720), \
+                               driver = args.driver)
+    pad = pygame.Surface((20, 140))
+    pad.fill((255, 255, 255))
+    sprite = renderer.sprite(pad)
+    rect = pad.get_rect(topleft = (30, 0))
+    prev = rect.copy()
+    start = time.perf_counter()
+    for i in range(args.frames):
+        pygame.event.pump()
+        rect.y = (i * 7) % (720 - rect.h)
+        if not renderer.SPRITES:
+            renderer.surface.fill((0, 0, 0), prev)
+        drawn = renderer.draw_sprite(0, sprite, rect)
+        renderer.present([prev, drawn])
+        prev = drawn
+    print(renderer.NAME, "renderer : %.0f frames/s" \
+          % (args.frames / (time.perf_counter() - start)))
+    renderer.close()
+
+if __name__ == '__main__':
+    main()
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
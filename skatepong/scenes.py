@@ -0,0 +1,837 @@
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import pygame
+import random
+import time
+import skatepong.attract as skt_atr
+import skatepong.gyro as skt_gyro
+import skatepong.assets as skt_ast
+import skatepong.constants as skt_cst
+import skatepong.game_objects as skt_obj
+import skatepong.log as skt_log
+import skatepong.sound as skt_snd
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+logger = skt_log.get_logger("scenes")
+
+class Scene():
+    """
+    One game scene, run frame by frame by Game.step().
+
+    - enter() : scene (re)started, static content drawn.
+    - wait() : waits for the next frame.
+    - update() : game logic of one frame (sets game.game_status to
+      leave the scene).
+    - render() : draws what changed during the frame.
+    - exit() : erases everything the scene displayed.
+
+    Texts / positions are computed once (build_cache) and kept across
+    visits. Only the regions invalidated by the scenes are copied to the
+    screen (game.update_display), transitions included.
+    """
+    SCENE_ID = None
+    REQUESTS = () # Scenes which can be requested by user inputs
+    GOVERNED = False # Rendering quality adapted to the frame load
+    PRECISE = False # Frames started exactly on time (moving ball)
+    # Game objects, in the order of Game.draw_game_objects() rects
+    SLOTS = ("scores", "scores", "pads", "pads", "ball", "line", "line")
+
+    def __init__(self, game):
+        self.game = game
+        self.cache = {}
+        self.static = [] # Static content rects (drawn on enter)
+        self.objects = [None] * len(self.SLOTS) # Rects, as of last render
+        self.new_objects = [None] * len(self.SLOTS) # Rects being drawn
+        self.redraw = [False] * len(self.SLOTS) # Objects redrawn
+        self.rendered = False
+        self.l_score = None # Scores displayed, as of last render
+        self.r_score = None
+
+    def enter(self):
+        if not self.cache:
+            self.build_cache()
+        self.start_time = self.game.now()
+
+    def build_cache(self):
+        pass
+
+    def wait(self):
+        self.game.tick(self.PRECISE)
+
+    def update(self):
+        pass
+
+    def render(self):
+        pass
+
+    def exit(self):
+        self.game.erase(*self.static, *self.objects)
+        self.static = []
+        for i in range(len(self.SLOTS)):
+            self.objects[i] = None
+        self.rendered = False
+        self.l_score = None
+        self.r_score = None
+
+    def text_item(self, font_sz, txt, x, y, color):
+        """
+        Returns a pre-rendered text surface and its rect (centered).
+        """
+        surf = self.game.assets.text(self.game.FT_NM, font_sz, txt, color)
+        return surf, surf.get_rect(center = (x, y))
+
+    def text_box(self, font_sz, x, y, *txts):
+        """
+        Returns the rect covering the largest of the given texts.
+        """
+        max_w_txt = self.game.assets.get_max_w_txt(self.game.FT_NM, \
+                                                   font_sz, *txts)
+        return pygame.Rect(0, 0, max_w_txt, font_sz).move( \
+               x - max_w_txt // 2, y - font_sz // 2)
+
+    def draw_static(self, items):
+        """
+        Draws cached text items, erased on scene exit.
+        """
+        for surf, rect in items:
+            self.game.win.blit(surf, rect)
+            self.static.append(rect)
+        self.game.invalidate(*(rect for surf, rect in items))
+
+    def draw_status(self, boxes, items):
+        """
+        Replaces the texts displayed in the given boxes.
+        """
+        for box in boxes:
+            self.game.win.fill(skt_cst.BLACK, box)
+            if box not in self.static:
+                self.static.append(box)
+        for surf, rect in items:
+            self.game.win.blit(surf, rect)
+        self.game.invalidate(*boxes)
+
+    def render_objects(self, pads = True, ball = True, scores = False, \
+                       line = False, lazy = ()):
+        """
+        Erases game objects previous positions and draws the new ones.
+        Only the objects which moved / changed are invalidated.
+
+        lazy : objects ("scores" / "line") left on screen, only redrawn
+        when changed or partly erased by another object.
+        Note : called every frame, no list / dict created (rects lists
+        reused, swapped at each render).
+        """
+        game = self.game
+        slots = self.SLOTS
+        objects = self.objects
+        new_objects = self.new_objects
+        redraw = self.redraw
+        scores_changed = game.l_score != self.l_score \
+                         or game.r_score != self.r_score
+        for i in range(len(slots)):
+            name = slots[i]
+            if name == "pads":
+                shown = pads
+            elif name == "ball":
+                shown = ball
+            elif name == "scores":
+                shown = scores
+            else:
+                shown = line
+            redraw[i] = shown and (not self.rendered or name not in lazy \
+                        or (name == "scores" and scores_changed) \
+                        or self.is_damaged(name, lazy))
+            new_objects[i] = objects[i]
+            if redraw[i] and objects[i] is not None:
+                game.win.fill(skt_cst.BLACK, objects[i])
+        game.draw_game_objects(new_objects, \
+                               draw_pads = redraw[slots.index("pads")], \
+                               draw_ball = redraw[slots.index("ball")], \
+                               draw_scores = redraw[slots.index("scores")], \
+                               draw_line = redraw[slots.index("line")])
+        dirty = game.dirty
+        for i in range(len(slots)):
+            old_rect = objects[i]
+            new_rect = new_objects[i]
+            if redraw[i] and (old_rect != new_rect \
+            or (slots[i] == "scores" and scores_changed)):
+                if old_rect is not None:
+                    dirty.append(old_rect)
+                if new_rect is not None:
+                    dirty.append(new_rect)
+        self.objects = new_objects
+        self.new_objects = objects
+        self.rendered = True
+        self.l_score = game.l_score
+        self.r_score = game.r_score
+
+    def is_damaged(self, name, lazy):
+        """
+        True if a lazy object is missing or overlaps a moving object
+        (erased at each render).
+        """
+        slots = self.SLOTS
+        objects = self.objects
+        for i in range(len(slots)):
+            if slots[i] != name:
+                continue
+            rect = objects[i]
+            if rect is None:
+                return True
+            for j in range(len(slots)):
+                if objects[j] is not None and slots[j] not in lazy \
+                and rect.colliderect(objects[j]):
+                    return True
+        return False
+
+class Welcome_scene(Scene):
+    """
+    Splash screen at application start.
+    """
+    SCENE_ID = skt_cst.SCENE_WELCOME
+    DISPLAY_RETRIES = 3 # Display reinitializations before giving up
+
+    def enter(self):
+        super().enter()
+        game = self.game
+        # Retry loop : display error that occurs sometimes at startup when
+        # display resolution needs to be reduced.
+        for attempt in range(self.DISPLAY_RETRIES + 1):
+            try:
+                game.draw_splash_screen()
+                game.invalidate(game.win.get_rect())
+                game.update_display()
+                break
+            except pygame.error:
+                if attempt == self.DISPLAY_RETRIES:
+                    raise
+                logger.warning("Reinitializing display...")
+                game.win, game.win_w, game.win_h = game.create_window()
+                game.assets = skt_ast.Asset_manager(game.win_w, \
+                              game.win_h, game.ASSETS_CACHE_DIR)
+        self.static = [game.win.get_rect()]
+
+    def wait(self):
+        # Nothing changes on screen : sleeping until input / deadline
+        self.game.wait_input(self.game.DELAY_WELCOME \
+                             - (self.game.now() - self.start_time))
+
+    def update(self):
+        if self.game.now() - self.start_time >= self.game.DELAY_WELCOME:
+            self.game.game_status = skt_cst.SCENE_WAITING_GYROS
+
+class Wait_gyros_scene(Scene):
+    """
+    Game does not start until both skateboards are connected.
+    Network play : only the skateboard of this site (NET_SIDE).
+    """
+    SCENE_ID = skt_cst.SCENE_WAITING_GYROS
+
+    def build_cache(self):
+        game = self.game
+        ft = game.ft_dic["0.10"]
+        texts = {1 : ("VEUILLEZ CONNECTER LA PLANCHE GAUCHE", \
+                      "PLEASE CONNECT LEFT SKATEBOARD"), \
+                 2 : ("VEUILLEZ CONNECTER LA PLANCHE DROITE", \
+                      "PLEASE CONNECT RIGHT SKATEBOARD"), \
+                 3 : ("VEUILLEZ CONNECTER LES PLANCHES", \
+                      "PLEASE CONNECT SKATEBOARDS")}
+        x = game.x_dic["0.50"]
+        y_fr = game.y_dic["0.40"]
+        y_en = game.y_dic["0.60"]
+        self.cache["boxes"] = [ \
+            self.text_box(ft, x, y_fr, *(fr for fr, en in texts.values())),\
+            self.text_box(ft, x, y_en, *(en for fr, en in texts.values()))]
+        self.cache["status"] = {status : \
+            [self.text_item(ft, fr, x, y_fr, skt_cst.WHITE), \
+             self.text_item(ft, en, x, y_en, skt_cst.GREY)] \
+            for status, (fr, en) in texts.items()}
+
+    def enter(self):
+        super().enter()
+        self.status = 0
+        self.prev_status = 0
+
+    def wait(self):
+        # Connection tested at GYRO_POLL_PERIOD, sleeping in between
+        # (woken up by user inputs)
+        if self.status != 0:
+            self.game.wait_input(self.game.GYRO_POLL_PERIOD)
+
+    def update(self):
+        game = self.game
+        self.prev_status = self.status
+        net_play = game.NET_PEER is not None
+        l_gyro_needed = not net_play or game.NET_SIDE == "left"
+        r_gyro_needed = not net_play or game.NET_SIDE == "right"
+        # Left gyro test :
+        if not l_gyro_needed:
+            game.l_gyro = None # Played on the other site
+            l_gyro_connected = True
+        else:
+            try:
+                game.l_gyro = game.connect_gyro( \
+                              skt_gyro.Gyro_one_axis.I2C_ADDRESS_1)
+            except IOError:
+                l_gyro_connected = False
+            else:
+                l_gyro_connected = True
+        # Right gyro test :
+        if not r_gyro_needed:
+            game.r_gyro = None # Played on the other site
+            r_gyro_connected = True
+        else:
+            try:
+                game.r_gyro = game.connect_gyro( \
+                              skt_gyro.Gyro_one_axis.I2C_ADDRESS_2)
+            except IOError:
+                r_gyro_connected = False
+            else:
+                r_gyro_connected = True
+        # Status summary :
+        if l_gyro_connected and r_gyro_connected:
+            # Persisted offsets restored once both gyros are connected
+            if l_gyro_needed:
+                game.warm_start_gyro(game.l_gyro)
+            if r_gyro_needed:
+                game.warm_start_gyro(game.r_gyro)
+            game.create_game_elements()
+            if net_play:
+                game.game_status = skt_cst.SCENE_NET_PLAY
+            else:
+                game.game_status = skt_cst.SCENE_WAITING_PLAYERS
+        elif r_gyro_connected:
+            self.status = 1
+        elif l_gyro_connected:
+            self.status = 2
+        else:
+            self.status = 3
+
+    def render(self):
+        if self.status != self.prev_status:
+            self.draw_status(self.cache["boxes"], \
+                             self.cache["status"][self.status])
+
+class Wait_players_scene(Scene):
+    """
+    Standby before detection of active players on each skateboard.
+    Note : paddles active.
+    """
+    SCENE_ID = skt_cst.SCENE_WAITING_PLAYERS
+    REQUESTS = (skt_cst.SCENE_CALIBRATION_REQUESTED,)
+
+    def build_cache(self):
+        game = self.game
+        ft = game.ft_dic["0.10"]
+        x = game.x_dic["0.50"]
+        texts = {1 : ("EN ATTENTE DU JOUEUR GAUCHE", \
+                      "WAITING FOR LEFT PLAYER"), \
+                 2 : ("EN ATTENTE DU JOUEUR DROIT", \
+                      "WAITING FOR RIGHT PLAYER"), \
+                 3 : ("EN ATTENTE DES JOUEURS", "WAITING FOR PLAYERS")}
+        y_fr = game.y_dic["0.20"]
+        y_en = game.y_dic["0.70"]
+        # The message below is always displayed until players are ready:
+        self.cache["static"] = [ \
+            self.text_item(game.ft_dic["0.05"], "PIVOTEZ LES PLANCHES " \
+                           "POUR DEBUTER LA PARTIE", x, game.y_dic["0.30"],\
+                           skt_cst.WHITE), \
+            self.text_item(game.ft_dic["0.05"], "MOVE SKATES TO START " \
+                           "GAME", x, game.y_dic["0.80"], skt_cst.GREY)]
+        self.cache["boxes"] = [ \
+            self.text_box(ft, x, y_fr, *(fr for fr, en in texts.values())),\
+            self.text_box(ft, x, y_en, *(en for fr, en in texts.values()))]
+        self.cache["status"] = {status : \
+            [self.text_item(ft, fr, x, y_fr, skt_cst.WHITE), \
+             self.text_item(ft, en, x, y_en, skt_cst.GREY)] \
+            for status, (fr, en) in texts.items()}
+
+    def enter(self):
+        super().enter()
+        self.moving_time = self.game.now()
+        self.status = 0
+        self.prev_status = 0
+        self.left_player_ready = False
+        self.right_player_ready = False
+        self.game.ball.reset()
+        pygame.event.get() # Solves pad calib done twice consecutively
+        self.draw_static(self.cache["static"])
+
+    def update(self):
+        game = self.game
+        self.prev_status = self.status
+        # Reinitializing gyro if necessary (after i2c deconnection)
+        game.reinitialize_gyro_if_needed()
+        # Offsets of gyros reconnected during the game checked now
+        game.run_pending_warm_starts()
+        if self.right_player_ready == True:
+            self.status = 1
+        elif self.left_player_ready == True:
+            self.status = 2
+        else:
+            self.status = 3
+        # Moving objects:
+        vy_l_pad, l_gyro_ratio = game.l_pad.move(game.win_h)
+        vy_r_pad, r_gyro_ratio = game.r_pad.move(game.win_h)
+        if abs(l_gyro_ratio) > game.GYRO_ACTIVE_RATIO:
+            self.left_player_ready = True
+            self.moving_time = game.now()
+        if abs(r_gyro_ratio) > game.GYRO_ACTIVE_RATIO:
+            self.right_player_ready = True
+            self.moving_time = game.now()
+        if game.now() - self.moving_time > game.DELAY_INACT_PLAYER:
+            self.left_player_ready = False
+            self.right_player_ready = False
+        if self.left_player_ready and self.right_player_ready:
+            game.game_status = skt_cst.SCENE_COUNTDOWN
+        elif game.DELAY_ATTRACT is not None \
+        and game.now() - self.moving_time > game.DELAY_ATTRACT:
+            game.game_status = skt_cst.SCENE_ATTRACT
+
+    def render(self):
+        if self.status != self.prev_status:
+            self.draw_status(self.cache["boxes"], \
+                             self.cache["status"][self.status])
+        # Nothing copied to the screen while both skates are steady
+        self.render_objects(pads = True, ball = True)
+
+class Attract_scene(Scene):
+    """
+    Demo game while nobody plays : paddles moved by the AI (ball
+    trajectory predicted), back to the players as soon as a skate moves.
+    Note : no sounds, no match statistics.
+    """
+    SCENE_ID = skt_cst.SCENE_ATTRACT
+    PRECISE = True
+    GOVERNED = True
+    REQUESTS = (skt_cst.SCENE_CALIBRATION_REQUESTED, \
+                skt_cst.SCENE_WAITING_PLAYERS)
+    BALL = Scene.SLOTS.index("ball")
+
+    def build_cache(self):
+        game = self.game
+        x = game.x_dic["0.50"]
+        self.cache["static"] = [ \
+            self.text_item(game.ft_dic["0.05"], "PIVOTEZ LES PLANCHES " \
+                           "POUR JOUER", x, game.y_dic["0.40"], \
+                           skt_cst.WHITE), \
+            self.text_item(game.ft_dic["0.05"], "MOVE SKATES TO PLAY", x, \
+                           game.y_dic["0.60"], skt_cst.GREY)]
+        self.rng = random.Random(game.RANDOM_SEED)
+        speed = game.ATTRACT_PAD_SPEED_RATIO * game.win_h
+        self.players = [skt_atr.Ai_paddle(pad, pad is game.l_pad, \
+                        game.win_h, speed, game.ATTRACT_MISS_RATIO, \
+                        self.rng) for pad in (game.l_pad, game.r_pad)]
+
+    def enter(self):
+        super().enter()
+        game = self.game
+        # Demo : sounds / statistics of the game off
+        game.sound.suspend()
+        game.stats.suspend()
+        self.serve()
+        self.draw_static(self.cache["static"])
+
+    def serve(self):
+        game = self.game
+        game.l_score = 0
+        game.r_score = 0
+        self.goal_to_be = False
+        game.ball.reset()
+        game.ball.vx = self.rng.choice((-1, 1)) * game.ball.vx_straight
+        for player in self.players:
+            player.pad = game.l_pad if player.left else game.r_pad
+            player.incoming = False
+
+    def update(self):
+        game = self.game
+        # Reinitializing gyro if necessary (after i2c deconnection)
+        game.reinitialize_gyro_if_needed()
+        # Boards still read : a player moving takes the paddles back
+        for pad in (game.l_pad, game.r_pad):
+            if abs(pad.read_gyro_ratio()) > game.GYRO_ACTIVE_RATIO:
+                game.game_status = skt_cst.SCENE_WAITING_PLAYERS
+                return
+        for player in self.players:
+            player.update(game.ball)
+        game.ball.move()
+        self.goal_to_be = game.handle_collision(self.goal_to_be)
+        self.goal_to_be = game.detect_goal(self.goal_to_be)
+        if game.l_score >= game.WINNING_SCORE \
+        or game.r_score >= game.WINNING_SCORE:
+            self.serve()
+
+    def render(self):
+        ball_rect = self.objects[self.BALL]
+        self.render_objects(pads = True, ball = True, scores = True, \
+                            lazy = ("scores",))
+        # Texts parts erased with the previous ball drawn again
+        if ball_rect is not None:
+            for surf, rect in self.cache["static"]:
+                area = ball_rect.clip(rect)
+                if area:
+                    self.game.win.blit(surf, area, \
+                                       area.move(-rect.x, -rect.y))
+
+    def exit(self):
+        super().exit()
+        game = self.game
+        game.sound.suspend(False)
+        game.stats.suspend(False)
+        for pad in (game.l_pad, game.r_pad):
+            pad.prev_gyro = None # Rate integration restarted
+        game.l_score = 0
+        game.r_score = 0
+
+class Countdown_scene(Scene):
+    """
+    Starts a countdown before the game actually begins.
+    Note : paddles active.
+    """
+    SCENE_ID = skt_cst.SCENE_COUNTDOWN
+    PRECISE = True
+
+    def build_cache(self):
+        game = self.game
+        self.cache["box"] = self.text_box(game.ft_dic["0.20"], \
+                            game.x_dic["0.50"], game.y_dic["0.25"], "100")
+        self.cache["digits"] = {}
+
+    def enter(self):
+        super().enter()
+        self.time_before_start = 0
+        self.prev_time_before_start = 0
+
+    def digit_item(self, value):
+        """
+        Countdown value text (rendered once per value).
+        """
+        item = self.cache["digits"].get(value)
+        if item is None:
+            game = self.game
+            item = self.text_item(game.ft_dic["0.20"], str(value), \
+                   game.x_dic["0.50"], game.y_dic["0.25"], skt_cst.WHITE)
+            self.cache["digits"][value] = item
+        return item
+
+    def update(self):
+        game = self.game
+        self.prev_time_before_start = self.time_before_start
+        # Reinitializing gyro if necessary (after i2c deconnection)
+        game.reinitialize_gyro_if_needed()
+        # Moving objects:
+        game.l_pad.move(game.win_h)
+        game.r_pad.move(game.win_h)
+        elapsed = game.now() - self.start_time
+        if elapsed >= game.DELAY_COUNTDOWN:
+            game.game_status = skt_cst.SCENE_GAME_ONGOING
+        else:
+            self.time_before_start = game.DELAY_COUNTDOWN - int(elapsed)
+        if self.time_before_start != self.prev_time_before_start:
+            game.sound.play(skt_snd.COUNTDOWN)
+
+    def render(self):
+        # Updating countdown display if needed :
+        if self.time_before_start != self.prev_time_before_start:
+            self.draw_status([self.cache["box"]], \
+                             [self.digit_item(self.time_before_start)])
+        self.render_objects(pads = True, ball = True)
+
+class Game_ongoing_scene(Scene):
+    """
+    Controls the game itself.
+    """
+    SCENE_ID = skt_cst.SCENE_GAME_ONGOING
+    PRECISE = True
+    GOVERNED = True
+    REQUESTS = (skt_cst.SCENE_CALIBRATION_REQUESTED, \
+                skt_cst.SCENE_WAITING_PLAYERS)
+
+    def enter(self):
+        super().enter()
+        game = self.game
+        game.l_score = 0
+        game.r_score = 0
+        self.goal_to_be = False
+        # Determining ball direction at start.
+        if game.rng.randint(1, 2) == 1:
+            game.ball.vx = game.ball.vx_straight # To the right
+        else:
+            game.ball.vx = -game.ball.vx_straight # To the left
+        game.sound.play(skt_snd.START)
+        game.stats.match_start(game)
+
+    def update(self):
+        game = self.game
+        # Reinitializing gyro if necessary (after i2c deconnection)
+        game.reinitialize_gyro_if_needed()
+        # Moving objects:
+        game.l_pad.move(game.win_h)
+        game.r_pad.move(game.win_h)
+        game.ball.move()
+        self.goal_to_be = game.handle_collision(self.goal_to_be)
+        self.goal_to_be = game.detect_goal(self.goal_to_be)
+        if game.l_score >= game.WINNING_SCORE \
+        or game.r_score >= game.WINNING_SCORE:
+            game.game_status = skt_cst.SCENE_GAME_END
+
+    def render(self):
+        level = self.game.governor.level
+        lazy = ()
+        if level >= 2:
+            lazy = ("scores", "line")
+        elif level >= 1:
+            lazy = ("scores",)
+        self.render_objects(pads = True, ball = True, scores = True, \
+                            line = True, lazy = lazy)
+
+class Game_end_scene(Scene):
+    """
+    Announces winner + calib. pads once steady skates bef. next game.
+    Invites players to get down from skateboards before calibration.
+    Note : paddles active.
+    """
+    SCENE_ID = skt_cst.SCENE_GAME_END
+
+    def build_cache(self):
+        game = self.game
+        x = game.x_dic["0.50"]
+        calib = [ \
+            self.text_item(game.ft_dic["0.05"], "CALIBRATION A VENIR - " \
+                           "MERCI DE DESCENDRE DES PLANCHES", x, \
+                           game.y_dic["0.35"], skt_cst.WHITE), \
+            self.text_item(game.ft_dic["0.05"], "CALIBRATION PENDING - " \
+                           "PLEASE GET DOWN FROM SKATEBOARDS", x, \
+                           game.y_dic["0.75"], skt_cst.GREY)]
+        winners = {"left" : ("VICTOIRE DU JOUEUR DE GAUCHE", \
+                             "LEFT PLAYER WON"), \
+                   "right" : ("VICTOIRE DU JOUEUR DE DROITE", \
+                              "RIGHT PLAYER WON")}
+        for winner, (fr, en) in winners.items():
+            self.cache[winner] = [ \
+                self.text_item(game.ft_dic["0.10"], fr, x, \
+                               game.y_dic["0.25"], skt_cst.WHITE), \
+                self.text_item(game.ft_dic["0.10"], en, x, \
+                               game.y_dic["0.65"], skt_cst.GREY)] + calib
+
+    def enter(self):
+        super().enter()
+        game = self.game
+        self.moving_time = game.now()
+        game.ball.reset()
+        game.metrics.games_played.inc()
+        game.stats.match_end(game)
+        # Displaying winner and to get down from skates for calibration:
+        if game.l_score == game.WINNING_SCORE:
+            self.draw_static(self.cache["left"])
+        else:
+            self.draw_static(self.cache["right"])
+
+    def update(self):
+        game = self.game
+        # Reinitializing gyro if necessary (after i2c deconnection)
+        game.reinitialize_gyro_if_needed()
+        # Offsets of gyros reconnected during the game checked now
+        game.run_pending_warm_starts()
+        vy_l_pad, l_gyro_ratio = game.l_pad.move(game.win_h)
+        vy_r_pad, r_gyro_ratio = game.r_pad.move(game.win_h)
+        if (abs(l_gyro_ratio) > game.GYRO_STEADY_RATIO
+        or abs(r_gyro_ratio) > game.GYRO_STEADY_RATIO):
+            self.moving_time = game.now()
+        # This scene will only exit once both skates are steady for a
+        # few seconds or that a maximum time has gone.
+        # Once one of the 2 conditions is fulfilled, pads calib. is done
+        current_time = game.now()
+        if (current_time - self.start_time >= game.DELAY_MAX_GAME_END
+        or current_time - self.moving_time >= game.DELAY_STEADY_BEF_CALIB):
+            # Paddles repositioned in the center of the screen:
+            game.l_pad.move_to_center(game.win_h)
+            game.r_pad.move_to_center(game.win_h)
+            game.save_tracked_offsets()
+            game.game_status = skt_cst.SCENE_WAITING_PLAYERS
+
+    def render(self):
+        self.render_objects(pads = True, ball = True, scores = True)
+
+class Calibration_scene(Scene):
+    """
+    Handles the paddles calibration + offset measurement
+
+    Notes :
+    - No warning indication before calibration is actually started.
+    - Displays that calibration is ongoing (1st frame), then measures
+      the offsets (2nd frame).
+    - Going back to the scene "waiting for players".
+    """
+    SCENE_ID = skt_cst.SCENE_CALIBRATION_REQUESTED
+
+    def build_cache(self):
+        game = self.game
+        x = game.x_dic["0.50"]
+        self.cache["static"] = [ \
+            self.text_item(game.ft_dic["0.05"], "MAINTENIR LES PLANCHES " \
+                           "IMMOBILES EN POSITION NEUTRE", x, \
+                           game.y_dic["0.30"], skt_cst.WHITE), \
+            self.text_item(game.ft_dic["0.05"], "GET SKATES STEADY IN " \
+                           "THEIR NEUTRAL POSITIONS", x, \
+                           game.y_dic["0.80"], skt_cst.GREY), \
+            self.text_item(game.ft_dic["0.10"], "CALIBRATION EN COURS", x, \
+                           game.y_dic["0.20"], skt_cst.WHITE), \
+            self.text_item(game.ft_dic["0.10"], "CALIBRATION ONGOING", x, \
+                           game.y_dic["0.70"], skt_cst.GREY)]
+
+    def enter(self):
+        super().enter()
+        self.displayed = False
+        self.game.ball.reset()
+        self.draw_static(self.cache["static"])
+
+    def update(self):
+        if not self.displayed:
+            self.displayed = True
+            return
+        game = self.game
+        # Gyroscope offset measurement:
+        calib_start = time.perf_counter()
+        for gyro in (game.l_gyro, game.r_gyro):
+            try:
+                gyro.offset = gyro.measure_gyro_offset()
+            except IOError as err:
+                gyro.set_error(err)
+            else:
+                gyro.save_calib(game.calib_store)
+        game.metrics.calib_duration.observe(None, \
+                                           time.perf_counter() - calib_start)
+        # Paddles calibration:
+        game.l_pad.move_to_center(game.win_h)
+        game.r_pad.move_to_center(game.win_h)
+        game.game_status = skt_cst.SCENE_WAITING_PLAYERS
+
+    def render(self):
+        self.render_objects(pads = True, ball = True)
+
+class Net_play_scene(Scene):
+    """
+    Network match (experimental, see netplay.py) : the NET_SIDE paddle
+    is played with the skateboard of this site, the other one on the
+    other site (NET_PEER).
+
+    Notes :
+    - The local paddle velocity is integrated on the match court and
+      sent, the game objects are the match ones scaled to the screen.
+    - Matches played one after the other (scores reset once a player
+      reached WINNING_SCORE), no match statistics.
+    - Match frozen while the other site is late (message displayed).
+    """
+    SCENE_ID = skt_cst.SCENE_NET_PLAY
+    PRECISE = True
+    GOVERNED = True
+
+    def build_cache(self):
+        game = self.game
+        ft = game.ft_dic["0.05"]
+        x = game.x_dic["0.50"]
+        fr = "EN ATTENTE DE L'AUTRE SITE"
+        en = "WAITING FOR THE OTHER SITE"
+        self.cache["boxes"] = [self.text_box(ft, x, game.y_dic["0.30"], fr),\
+                               self.text_box(ft, x, game.y_dic["0.70"], en)]
+        self.cache["status"] = { \
+            True : [self.text_item(ft, fr, x, game.y_dic["0.30"], \
+                                   skt_cst.WHITE), \
+                    self.text_item(ft, en, x, game.y_dic["0.70"], \
+                                   skt_cst.GREY)], \
+            False : []}
+
+    def enter(self):
+        super().enter()
+        # Imported here : netplay imports the game module
+        import skatepong.netplay as skt_net
+        game = self.game
+        if game.NET_SIDE == "left":
+            side = skt_net.LEFT
+            self.local_pad = game.l_pad
+        else:
+            side = skt_net.RIGHT
+            self.local_pad = game.r_pad
+        match = skt_net.Net_match(serve = 1, sound = game.sound)
+        # Local paddle velocity integrated at the match court scale
+        self.input_pad = skt_obj.Paddle(None, match.win_h, 0, 0, \
+                         match.l_pad.w, match.l_pad.h, None, \
+                         self.local_pad.gyro, game.pad_vy_factor, game.FPS)
+        self.site = skt_net.Net_site(side, skt_net.open_link( \
+                    game.NET_PORT, game.NET_PEER), self.read_input, match)
+        self.waiting = False
+        self.prev_waiting = False
+
+    def read_input(self, match):
+        """
+        Local paddle velocity (px of the match court) for the next frame.
+        """
+        self.input_pad.gyro = self.local_pad.gyro # Reconnected gyro
+        vy_pad, gyro_ratio = self.input_pad.compute_pad_velocity()
+        return vy_pad
+
+    def update(self):
+        game = self.game
+        self.prev_waiting = self.waiting
+        # Reinitializing gyro if necessary (after i2c deconnection)
+        game.reinitialize_gyro_if_needed(game.l_gyro is not None, \
+                                         game.r_gyro is not None)
+        self.waiting = not self.site.step()
+        if self.waiting:
+            # Offsets of gyros reconnected during the game checked now
+            game.run_pending_warm_starts()
+        # Match state shown at the screen scale
+        match = self.site.match
+        game.l_pad.rect.top = match.l_pad.rect.top * game.win_h \
+                              // match.win_h
+        game.r_pad.rect.top = match.r_pad.rect.top * game.win_h \
+                              // match.win_h
+        game.ball.rect.center = ( \
+            match.ball.rect.centerx * game.win_w // match.win_w, \
+            match.ball.rect.centery * game.win_h // match.win_h)
+        game.l_score = match.l_score
+        game.r_score = match.r_score
+
+    def render(self):
+        if self.waiting != self.prev_waiting:
+            self.draw_status(self.cache["boxes"], \
+                             self.cache["status"][self.waiting])
+        self.render_objects(pads = True, ball = True, scores = True, \
+                            line = True, lazy = ("scores", "line"))
+
+    def exit(self):
+        super().exit()
+        self.site.link.sock.close()
+        logger.info("Network play stopped", extra = self.site.report( \
+                    max(self.game.now() - self.start_time, 1)))
+        game = self.game
+        game.ball.reset()
+        game.l_score = 0
+        game.r_score = 0
+
+def create_scenes(game):
+    """
+    Returns the scenes of the game : scene id -> scene object.
+    """
+    scenes = [Welcome_scene(game), Wait_gyros_scene(game), \
+              Wait_players_scene(game), Countdown_scene(game), \
+              Game_ongoing_scene(game), Game_end_scene(game), \
+              Calibration_scene(game), Attract_scene(game), \
+              Net_play_scene(game)]
+    return {scene.SCENE_ID : scene for scene in scenes}
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
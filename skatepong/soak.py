@@ -0,0 +1,368 @@
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import argparse
+import collections
+import gc
+import json
+import logging
+import math
+import os
+import random
+import resource
+import time
+import pygame
+import skatepong.bench as skt_bch
+import skatepong.constants as skt_cst
+import skatepong.gyro_sim as skt_sim
+import skatepong.log as skt_log
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+class Fault_injector():
+    """
+    Schedules sensor faults (per i2c address), in simulated time :
+    - i2c error bursts : a few consecutive reads raise IOError.
+    - disconnections : reads and connections fail for a while.
+    - noise bursts : large random noise added to the readings.
+    Rates are given in events per hour of play and per sensor.
+
+    Reconnect latency : time from the first failed read of a sensor to
+    its next successful read (gyro recreated by the game).
+    """
+    def __init__(self, clock, seed = None, error_bursts = 30, \
+                 disconnects = 6, noise_bursts = 30, \
+                 burst_reads = (1, 5), disconnect_s = (1, 20), \
+                 noise_s = (2, 10), noise_amplitude = 30):
+        self.clock = clock
+        self.rng = random.Random(seed)
+        self.rates = {"error" : error_bursts / 3600, \
+                      "disconnect" : disconnects / 3600, \
+                      "noise" : noise_bursts / 3600}
+        self.burst_reads = burst_reads # Failed reads per burst (min, max)
+        self.disconnect_s = disconnect_s # Disconnection (s) (min, max)
+        self.noise_s = noise_s # Noise burst duration (s) (min, max)
+        self.noise_amplitude = noise_amplitude # Std deviation (deg/s)
+        self.last_read = {} # Sensor -> last read time
+        self.burst = collections.Counter() # Sensor -> failed reads left
+        self.disconnected_until = {}
+        self.noisy_until = {}
+        self.fault_start = {} # Sensor -> first failed read time
+        self.nb_faults = collections.Counter() # Fault kind -> count
+        self.reconnect_latencies = []
+
+    def happens(self, kind, dt):
+        if self.rng.random() < self.rates[kind] * dt:
+            self.nb_faults[kind] += 1
+            return True
+        return False
+
+    def connect(self, sensor):
+        """
+        Raises IOError if the sensor is disconnected.
+        """
+        if self.clock() < self.disconnected_until.get(sensor, -math.inf):
+            raise IOError("simulated board disconnected")
+
+    def read(self, sensor):
+        """
+        Called before each sensor read : raises the injected IOErrors.
+        Returns the noise to add to the reading (deg/s).
+        """
+        now = self.clock()
+        dt = now - self.last_read.get(sensor, now)
+        self.last_read[sensor] = now
+        if self.happens("disconnect", dt):
+            self.disconnected_until[sensor] = now + \
+                                    self.rng.uniform(*self.disconnect_s)
+        elif self.happens("error", dt):
+            self.burst[sensor] = self.rng.randint(*self.burst_reads)
+        if self.happens("noise", dt):
+            self.noisy_until[sensor] = now + self.rng.uniform(*self.noise_s)
+        try:
+            self.connect(sensor)
+            if self.burst[sensor] > 0:
+                self.burst[sensor] -= 1
+                raise IOError("simulated i2c error")
+        except IOError:
+            self.fault_start.setdefault(sensor, now)
+            raise
+        if sensor in self.fault_start:
+            self.reconnect_latencies.append(now \
+                                            - self.fault_start.pop(sensor))
+        if now < self.noisy_until.get(sensor, -math.inf):
+            return self.rng.gauss(0, self.noise_amplitude)
+        return 0
+
+class Faulty_gyro(skt_sim.Simulated_gyro):
+    """
+    Simulated gyroscope whose reads go through a fault injector.
+    """
+    def __init__(self, address, faults, **kwargs):
+        self.faults = faults
+        super().__init__(address, **kwargs)
+
+    def get_data(self):
+        noise = self.faults.read(self.name)
+        return super().get_data() + noise
+
+class Soak_game(skt_bch.Bench_game):
+    """
+    Headless game in accelerated time : frames do not wait, the game
+    clock advances by one frame period per frame (idle scenes : by
+    their timeout). Boards are moved by the players during the games,
+    left steady after (calibrations).
+    """
+    WIN_SIZE = (640, 360)
+    PLAYER_FREQ = 0.5 # Board rotation frequency when playing (Hz)
+    PLAYING = (skt_cst.SCENE_WAITING_PLAYERS, skt_cst.SCENE_COUNTDOWN, \
+               skt_cst.SCENE_GAME_ONGOING)
+
+    def __init__(self, seed = None, **faults):
+        self.virtual_time = 0.0
+        self.faults = Fault_injector(self.now, seed, **faults)
+        self.sim_rng = random.Random(seed) # Players / gyros noise
+        self.phases = {} # Sensor -> player rotation phase
+        super().__init__()
+
+    def now(self):
+        return self.virtual_time
+
+    def tick(self, precise = True):
+        self.virtual_time += 1 / self.FPS
+        skt_log.CONTEXT["scene"] = skt_cst.SCENE_NAMES[self.game_status]
+        self.record_gyro_latency(getattr(self, "l_gyro", None), "left")
+        self.record_gyro_latency(getattr(self, "r_gyro", None), "right")
+        return 1000 / self.FPS
+
+    def wait_input(self, timeout):
+        skt_log.CONTEXT["scene"] = skt_cst.SCENE_NAMES[self.game_status]
+        self.virtual_time += max(timeout, 0)
+
+    def board_motion(self, t, phase = 0):
+        if self.game_status not in self.PLAYING:
+            return 0
+        return self.MOTION * math.sin(2 * math.pi * self.PLAYER_FREQ * t \
+                                      + phase)
+
+    def create_gyro(self, address):
+        sensor = hex(address)
+        self.faults.connect(sensor)
+        phase = self.phases.setdefault(sensor, \
+                                       self.sim_rng.uniform(0, \
+                                                            2 * math.pi))
+        gyro = Faulty_gyro(address, self.faults, axis = 'y', \
+                           sensitivity = self.GYRO_SENSITIVITY, \
+                           signal = lambda t: self.board_motion(t, phase), \
+                           seed = self.sim_rng.random(), clock = self.now)
+        if self.GYRO_BIAS_TRACKING:
+            gyro.enable_bias_tracking(self.GYRO_STEADY_RATIO)
+        return gyro
+
+def rss_mb():
+    """
+    Resident memory of the process (MB) : current if known, else peak.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def slope(points):
+    """
+    Least squares slope of [(x, y)] points.
+    """
+    n = len(points)
+    if n < 2:
+        return 0.0
+    mean_x = sum(x for x, y in points) / n
+    mean_y = sum(y for x, y in points) / n
+    var_x = sum((x - mean_x) ** 2 for x, y in points)
+    if var_x == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+
+class Soak_test():
+    """
+    Plays games in a loop (with a calibration every few games) and
+    records memory, Python objects and frame time at each checkpoint.
+
+    Thresholds (flags in the report), after the warm-up :
+    - memory growth over RSS_SLOPE_MAX (MB / hour of play),
+    - Python objects growth over OBJECTS_SLOPE_MAX (/ hour of play),
+    - frame time drift : last / first quarter over DRIFT_MAX,
+    - reconnect latency over RECONNECT_MAX (s), or sensor not back.
+    """
+    RSS_SLOPE_MAX = 2.0
+    OBJECTS_SLOPE_MAX = 1000
+    DRIFT_MAX = 1.25
+    RECONNECT_MAX = 30
+    WARM_UP = 0.1 # Ratio of the run ignored for growth / drift
+
+    def __init__(self, hours = 1, checkpoint = 60, calib_every = 5, \
+                 seed = None, **faults):
+        self.duration = hours * 3600 # Play time simulated (s)
+        self.checkpoint = checkpoint # Play time between checkpoints (s)
+        self.calib_every = calib_every # Games between calibrations
+        self.game = Soak_game(seed, **faults)
+        self.checkpoints = []
+        self.scenes = collections.Counter() # Scene -> times entered
+        self.nb_games = 0
+        self.frame_times = [] # Current checkpoint frames (s, real)
+        self.types_start = None
+
+    def run(self):
+        game = self.game
+        next_checkpoint = self.checkpoint
+        status = None
+        wall = time.perf_counter()
+        while game.now() < self.duration:
+            start = time.perf_counter()
+            game.step()
+            self.frame_times.append(time.perf_counter() - start)
+            if game.game_status != status:
+                # Operator calibration request, every few games
+                if status == skt_cst.SCENE_GAME_END:
+                    self.nb_games += 1
+                    if self.calib_every \
+                    and self.nb_games % self.calib_every == 0:
+                        game.game_status = \
+                            skt_cst.SCENE_CALIBRATION_REQUESTED
+                status = game.game_status
+                self.scenes[skt_cst.SCENE_NAMES[status]] += 1
+            if game.now() >= next_checkpoint:
+                next_checkpoint += self.checkpoint
+                self.record_checkpoint()
+        wall = time.perf_counter() - wall
+        game.metrics_exporter.stop()
+        pygame.quit()
+        return self.report(wall)
+
+    def record_checkpoint(self):
+        gc.collect()
+        objects = gc.get_objects()
+        if self.types_start is None and self.game.now() \
+        >= self.WARM_UP * self.duration:
+            self.types_start = collections.Counter(type(obj).__name__ \
+                                                   for obj in objects)
+        frames = sorted(self.frame_times)
+        self.frame_times = []
+        self.checkpoints.append({"play_s" : self.game.now(), \
+            "rss_mb" : rss_mb(), "objects" : len(objects), \
+            "frame_ms" : 1000 * sum(frames) / max(len(frames), 1), \
+            "frame_p99_ms" : 1000 * frames[int(0.99 * (len(frames) - 1))] \
+                             if frames else 0})
+
+    def report(self, wall):
+        faults = self.game.faults
+        after = [c for c in self.checkpoints \
+                 if c["play_s"] >= self.WARM_UP * self.duration]
+        hours = [(c["play_s"] / 3600, c) for c in after]
+        rss_slope = slope([(h, c["rss_mb"]) for h, c in hours])
+        objects_slope = slope([(h, c["objects"]) for h, c in hours])
+        quarter = max(len(after) // 4, 1)
+        drift = None
+        if len(after) >= 2:
+            first = sum(c["frame_ms"] for c in after[:quarter]) / quarter
+            last = sum(c["frame_ms"] for c in after[-quarter:]) / quarter
+            drift = last / first if first else None
+        latencies = sorted(faults.reconnect_latencies)
+        not_back = [sensor for sensor, start \
+                    in faults.fault_start.items() \
+                    if self.game.now() - start > self.RECONNECT_MAX]
+        types_growth = {}
+        if self.types_start is not None:
+            types_end = collections.Counter(type(obj).__name__ \
+                                            for obj in gc.get_objects())
+            types_end.subtract(self.types_start)
+            types_growth = dict(types_end.most_common(10))
+        flags = []
+        if rss_slope > self.RSS_SLOPE_MAX:
+            flags.append("memory growth %.1f MB/h" % rss_slope)
+        if objects_slope > self.OBJECTS_SLOPE_MAX:
+            flags.append("objects growth %d /h" % objects_slope)
+        if drift is not None and drift > self.DRIFT_MAX:
+            flags.append("frame time drift x%.2f" % drift)
+        if latencies and latencies[-1] > self.RECONNECT_MAX:
+            flags.append("reconnect latency %.1f s" % latencies[-1])
+        if not_back:
+            flags.append("sensors not reconnected : " + ", ".join(not_back))
+        return {"play_hours" : self.game.now() / 3600, "wall_s" : wall, \
+                "games" : self.nb_games, "scenes" : dict(self.scenes), \
+                "faults" : dict(faults.nb_faults), \
+                "reconnects" : len(latencies), \
+                "reconnect_s" : {"p50" : latencies[len(latencies) // 2], \
+                                 "max" : latencies[-1]} \
+                                if latencies else None, \
+                "rss_mb_per_hour" : rss_slope, \
+                "objects_per_hour" : objects_slope, \
+                "objects_growth_by_type" : types_growth, \
+                "frame_time_drift" : drift, \
+                "checkpoints" : self.checkpoints, "flags" : flags}
+
+def main():
+    """
+    Soak test : hours of play in accelerated time, sensor faults.
+    """
+    parser = argparse.ArgumentParser(description = "Skatepong soak test " \
+             "(simulated gyroscopes with faults, accelerated time, no " \
+             "display).")
+    parser.add_argument("--hours", type = float, default = 1, \
+                        help = "play time simulated (h)")
+    parser.add_argument("--checkpoint", type = float, default = 60, \
+                        help = "play time between measurements (s)")
+    parser.add_argument("--calib-every", type = int, default = 5, \
+                        help = "games between calibrations (0 : none)")
+    parser.add_argument("--error-bursts", type = float, default = 30, \
+                        help = "i2c error bursts per hour and sensor")
+    parser.add_argument("--disconnects", type = float, default = 6, \
+                        help = "disconnections per hour and sensor")
+    parser.add_argument("--noise-bursts", type = float, default = 30, \
+                        help = "noise bursts per hour and sensor")
+    parser.add_argument("--seed", type = int, default = None)
+    parser.add_argument("--json", help = "saves the full report (file)")
+    args = parser.parse_args()
+    # Warnings only : the injected faults are logged by the game
+    skt_log.setup_logging(logging.WARNING)
+
+    soak = Soak_test(args.hours, args.checkpoint, args.calib_every, \
+                     args.seed, error_bursts = args.error_bursts, \
+                     disconnects = args.disconnects, \
+                     noise_bursts = args.noise_bursts)
+    report = soak.run()
+    print(round(report["play_hours"], 2), "h of play in", \
+          round(report["wall_s"]), "s :", report["games"], "games,", \
+          report["scenes"].get("calibrate_pads", 0), "calibrations")
+    print("Faults injected :", report["faults"], "/ reconnects :", \
+          report["reconnects"], report["reconnect_s"])
+    print("Memory :", round(report["rss_mb_per_hour"], 2), "MB/h / " \
+          "objects :", round(report["objects_per_hour"]), "/h / frame " \
+          "time drift :", report["frame_time_drift"] \
+          and round(report["frame_time_drift"], 2))
+    for flag in report["flags"]:
+        print("FLAG :", flag)
+    if not report["flags"]:
+        print("No leak / slowdown detected")
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent = 2)
+    if report["flags"]:
+        parser.exit(1)
+
+if __name__ == '__main__':
+    main()
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
@@ -0,0 +1,186 @@
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import argparse
+import array
+import statistics
+import time
+import pygame
+import skatepong.log as skt_log
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+logger = skt_log.get_logger("sound")
+
+# Effects (index of the sound / reserved mixer channel)
+PADDLE = 0
+WALL = 1
+GOAL = 2
+COUNTDOWN = 3
+START = 4
+NAMES = ("paddle", "wall", "goal", "countdown", "start")
+# Synthesized effects : (start freq. (Hz), end freq. (Hz), duration (s))
+TONES = {PADDLE : (520, 520, 0.05), \
+         WALL : (260, 260, 0.035), \
+         GOAL : (660, 220, 0.35), \
+         COUNTDOWN : (880, 880, 0.12), \
+         START : (1320, 1320, 0.3)}
+FREQUENCY = 44100 # Mixer sample rate (Hz)
+
+def pre_init(buffer = 256, frequency = FREQUENCY):
+    """
+    Mixer settings, to be set before pygame.init() : small buffer (mixer
+    latency = buffer / frequency), 16 bits mono.
+    """
+    pygame.mixer.pre_init(frequency, -16, 1, buffer)
+
+def synthesize(start_hz, end_hz, duration, frequency, channels, \
+               volume = 0.5):
+    """
+    Returns the raw samples (16 bits) of a square wave tone, frequency
+    swept from start_hz to end_hz, short attack / linear decay.
+    """
+    nb_samples = int(duration * frequency)
+    samples = array.array("h")
+    amplitude = volume * 32767
+    attack = max(int(0.003 * frequency), 1)
+    phase = 0.0
+    for i in range(nb_samples):
+        hz = start_hz + (end_hz - start_hz) * i / nb_samples
+        phase += hz / frequency
+        envelope = min(i / attack, 1) * (1 - i / nb_samples)
+        value = int(amplitude * envelope * (1 if phase % 1 < 0.5 else -1))
+        for channel in range(channels):
+            samples.append(value)
+    return samples
+
+class Sound_effects():
+    """
+    Game sound effects, played with a minimal latency.
+
+    - Synthesized once at startup into raw mixer buffers (no decoding
+      nor loading during the game).
+    - One reserved mixer channel per effect : play() only restarts the
+      channel (no object created, a sound never waits for a free
+      channel). Silent if disabled or no audio device.
+    - Suspended : silent until resumed (attract mode demo).
+    """
+    def __init__(self, enabled = True, volume = 0.5):
+        self.enabled = False
+        self.suspended = False
+        self.sounds = []
+        self.channels = []
+        self.frequency = FREQUENCY
+        if not enabled:
+            return
+        settings = pygame.mixer.get_init()
+        if settings is None:
+            try:
+                pygame.mixer.init()
+            except pygame.error as err:
+                logger.warning("No audio device : sound disabled", \
+                               extra = {"error" : repr(err)})
+                return
+            settings = pygame.mixer.get_init()
+        frequency, size, channels = settings
+        if abs(size) != 16:
+            logger.warning("Mixer format not supported : sound disabled", \
+                           extra = {"size" : size})
+            return
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(),\
+                                          len(NAMES)))
+        pygame.mixer.set_reserved(len(NAMES))
+        for effect in range(len(NAMES)):
+            start_hz, end_hz, duration = TONES[effect]
+            samples = synthesize(start_hz, end_hz, duration, frequency, \
+                                 channels, volume)
+            self.sounds.append(pygame.mixer.Sound(buffer = samples))
+            self.channels.append(pygame.mixer.Channel(effect))
+        self.frequency = frequency
+        self.enabled = True
+
+    def play(self, effect):
+        """
+        Plays an effect (restarted if already playing).
+        """
+        if self.enabled and not self.suspended:
+            self.channels[effect].play(self.sounds[effect])
+
+    def suspend(self, suspended = True):
+        """
+        Mutes the effects (suspended = True) or unmutes them.
+        """
+        self.suspended = suspended
+
+    def measure_latency(self, buffer, nb_trials = 50):
+        """
+        Trigger to playback latency (s) : delay until the mixer thread
+        mixes a sound triggered (1 sample probe sound, channel free
+        again once mixed) + mixer buffer duration (played afterwards).
+        Note : device / driver buffering not included.
+        """
+        probe = pygame.mixer.Sound(buffer = array.array("h", \
+                                   [0] * pygame.mixer.get_init()[2]))
+        channel = self.channels[PADDLE]
+        latencies = []
+        for i in range(nb_trials):
+            time.sleep(0.011 * (i % 7)) # Varied mixer callback phase
+            start = time.perf_counter()
+            channel.play(probe)
+            while channel.get_busy():
+                if time.perf_counter() - start > 1:
+                    break
+            latencies.append(time.perf_counter() - start \
+                             + buffer / self.frequency)
+        return latencies
+
+def main():
+    """
+    Plays the effects and measures their latency for mixer buffer sizes.
+    """
+    parser = argparse.ArgumentParser(description = "Skatepong sound " \
+             "effects : trigger to playback latency per mixer buffer " \
+             "size (SDL_AUDIODRIVER=dummy without sound card).")
+    parser.add_argument("--buffers", default = "256,512,1024,4096", \
+                        help = "mixer buffer sizes (samples)")
+    parser.add_argument("--trials", type = int, default = 50)
+    parser.add_argument("--play", action = "store_true", \
+                        help = "plays every effect first")
+    args = parser.parse_args()
+    skt_log.setup_logging()
+
+    for buffer in (int(value) for value in args.buffers.split(",")):
+        pygame.mixer.quit()
+        pre_init(buffer)
+        pygame.mixer.init()
+        start = time.perf_counter()
+        effects = Sound_effects()
+        if not effects.enabled:
+            return
+        load_ms = 1000 * (time.perf_counter() - start)
+        if args.play:
+            for effect in range(len(NAMES)):
+                effects.play(effect)
+                time.sleep(TONES[effect][2] + 0.2)
+        latencies = sorted(effects.measure_latency(buffer, args.trials))
+        print("buffer %s : latency p50 %.1f ms / p99 %.1f ms / max " \
+              "%.1f ms (synthesis %.0f ms)" % (buffer, \
+              1000 * statistics.median(latencies), \
+              1000 * latencies[int(0.99 * (len(latencies) - 1))], \
+              1000 * latencies[-1], load_ms))
+
+if __name__ == '__main__':
+    main()
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
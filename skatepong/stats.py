@@ -0,0 +1,505 @@
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import argparse
+import atexit
+import os
+import queue
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+import skatepong.log as skt_log
+import skatepong.metrics as skt_met
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+logger = skt_log.get_logger("stats")
+
+DEFAULT_PATH = os.path.expanduser("~/.skatepong/stats.db")
+
+"""
+Tables :
+- matches : start date (epoch s), duration (s, game clock), scores,
+  winner ("left" / "right", NULL : match abandoned), paddle hits,
+  longest rally (hits in a point), i2c errors / reconnections during
+  the match, gyroscopes offsets at the end of the match.
+- points : scorer, rally length and duration of each point.
+- hits : paddle hit positions (-1 : paddle top, 0 : center, 1 : bottom).
+"""
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    start_time REAL,
+    duration REAL,
+    l_score INTEGER,
+    r_score INTEGER,
+    winner TEXT,
+    nb_hits INTEGER,
+    longest_rally INTEGER,
+    i2c_errors INTEGER,
+    reconnects INTEGER,
+    l_offset REAL,
+    r_offset REAL);
+CREATE TABLE IF NOT EXISTS points (
+    match_id INTEGER,
+    point_nb INTEGER,
+    scorer TEXT,
+    rally INTEGER,
+    duration REAL);
+CREATE TABLE IF NOT EXISTS hits (
+    match_id INTEGER,
+    point_nb INTEGER,
+    side TEXT,
+    position REAL);
+CREATE INDEX IF NOT EXISTS points_match ON points (match_id);
+CREATE INDEX IF NOT EXISTS hits_match ON hits (match_id);
+"""
+# Statements compiled once per connection (sqlite3 statements cache)
+INSERT_MATCH = "INSERT INTO matches (start_time) VALUES (?)"
+UPDATE_MATCH = "UPDATE matches SET duration = ?, l_score = ?, " \
+               "r_score = ?, winner = ?, nb_hits = ?, longest_rally = ?, " \
+               "i2c_errors = ?, reconnects = ?, l_offset = ?, " \
+               "r_offset = ? WHERE id = ?"
+INSERT_POINT = "INSERT INTO points VALUES (?, ?, ?, ?, ?)"
+INSERT_HIT = "INSERT INTO hits VALUES (?, ?, ?, ?)"
+
+# Events queued by the game (tuples, first field : kind)
+START = 0 # (START, date, game time, i2c errors, reconnects)
+HIT = 1 # (HIT, side, position)
+GOAL = 2 # (GOAL, scorer, game time)
+END = 3 # (END, game time, i2c errors, reconnects, l / r offsets)
+
+def connect(path):
+    """
+    Opens (creates) the statistics database, WAL mode : readers (CLI)
+    never block the game writer, commits without full fsync.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok = True)
+    db = sqlite3.connect(path, timeout = 30)
+    db.execute("PRAGMA journal_mode = WAL")
+    db.execute("PRAGMA synchronous = NORMAL")
+    db.executescript(SCHEMA)
+    return db
+
+class Stats_recorder():
+    """
+    Collects the match events of the game, written to SQLite by a
+    background thread (write-behind).
+
+    - Game side : each event is a tuple queued without blocking
+      (dropped if the queue is full), no disk access.
+    - Writer thread : events grouped in batches (BATCH_PERIOD /
+      BATCH_SIZE), one transaction per batch, executemany for points
+      and hits. A slow SD card only delays the thread.
+    Disabled if path is None or the database cannot be opened. Events
+    are ignored while suspended (attract mode demo).
+    """
+    QUEUE_SIZE = 10000 # Events waiting to be written
+    BATCH_SIZE = 500 # Events max per transaction
+    BATCH_PERIOD = 2 # Delay max before writing an event (s)
+    STOP_TIMEOUT = 5 # Wait max for pending events at exit (s)
+
+    def __init__(self, path):
+        self.path = path
+        self.enabled = path is not None
+        self.suspended = False
+        self.queue = queue.Queue(self.QUEUE_SIZE)
+        self.thread = None
+        self.nb_written = 0 # Events committed
+        self.nb_dropped = 0 # Events not queued (writer late)
+        self.nb_errors = 0 # Batches lost (database errors)
+        # Writer state : current match / point
+        self.match_id = None
+        self.match = None
+        self.point_nb = 0
+        self.rally = 0
+        self.point_start = 0
+
+    def start(self):
+        if not self.enabled:
+            return
+        self.thread = threading.Thread(target = self._run, \
+                      name = "stats", daemon = True)
+        self.thread.start()
+        atexit.register(self.stop)
+
+    def suspend(self, suspended = True):
+        """
+        Ignores the next events (suspended = True) or records them again.
+        """
+        self.suspended = suspended
+
+    def _put(self, event):
+        if self.enabled and not self.suspended:
+            try:
+                self.queue.put_nowait(event)
+            except queue.Full:
+                self.nb_dropped += 1
+
+    def match_start(self, game):
+        """
+        Game starts (scores reset).
+        """
+        if self.enabled:
+            metrics = game.metrics
+            self._put((START, time.time(), game.now(), \
+                       sum(metrics.i2c_errors.values.values()), \
+                       sum(metrics.reconnects.values.values())))
+
+    def hit(self, side, position):
+        """
+        Ball hit by a paddle : position on the paddle (-1 : top, 1 :
+        bottom).
+        """
+        if self.enabled:
+            self._put((HIT, side, position))
+
+    def goal(self, scorer, now):
+        if self.enabled:
+            self._put((GOAL, scorer, now))
+
+    def match_end(self, game):
+        """
+        Game won (winning score reached).
+        """
+        if self.enabled:
+            metrics = game.metrics
+            self._put((END, game.now(), \
+                       sum(metrics.i2c_errors.values.values()), \
+                       sum(metrics.reconnects.values.values()), \
+                       game.l_gyro.offset, game.r_gyro.offset))
+
+    def stop(self):
+        """
+        Writes the events queued and stops the thread (STOP_TIMEOUT).
+        """
+        if self.thread is None:
+            return
+        try:
+            self.queue.put(None, timeout = self.STOP_TIMEOUT)
+        except queue.Full:
+            pass
+        self.thread.join(self.STOP_TIMEOUT)
+        if self.thread.is_alive():
+            logger.warning("Statistics not all written", \
+                           extra = {"pending" : self.queue.qsize()})
+        self.thread = None
+
+    def _run(self):
+        try:
+            db = connect(self.path)
+        except (sqlite3.Error, OSError) as err:
+            self.enabled = False
+            logger.warning("Statistics database not available : " \
+                           "statistics disabled", \
+                           extra = {"path" : self.path, \
+                                    "error" : repr(err)})
+            return
+        stopping = False
+        while not stopping:
+            events = [self.queue.get()]
+            deadline = time.monotonic() + self.BATCH_PERIOD
+            while events[-1] is not None and len(events) < self.BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    events.append(self.queue.get(timeout = timeout))
+                except queue.Empty:
+                    break
+            if events[-1] is None:
+                events.pop()
+                stopping = True
+            try:
+                with db:
+                    self.write(db, events)
+            except sqlite3.Error as err:
+                self.nb_errors += 1
+                self.match_id = None # Its row may not exist
+                logger.warning("Statistics not written", \
+                               extra = {"events" : len(events), \
+                                        "error" : repr(err)})
+            else:
+                self.nb_written += len(events)
+        if self.match_id is not None:
+            with db:
+                self.close_match(db)
+        db.close()
+
+    def write(self, db, events):
+        """
+        Writes a batch of events (within a transaction).
+        """
+        points = []
+        hits = []
+        for event in events:
+            kind = event[0]
+            if kind == HIT:
+                if self.match_id is None:
+                    continue
+                self.rally += 1
+                self.match["nb_hits"] += 1
+                hits.append((self.match_id, self.point_nb + 1, event[1], \
+                             event[2]))
+            elif kind == GOAL:
+                if self.match_id is None:
+                    continue
+                self.point_nb += 1
+                self.match[event[1]] += 1
+                self.match["longest_rally"] = max(self.rally, \
+                                              self.match["longest_rally"])
+                points.append((self.match_id, self.point_nb, event[1], \
+                               self.rally, event[2] - self.point_start))
+                self.rally = 0
+                self.point_start = event[2]
+            elif kind == START:
+                if self.match_id is not None: # Previous one abandoned
+                    self.close_match(db)
+                self.match_id = db.execute(INSERT_MATCH, \
+                                           (event[1],)).lastrowid
+                self.match = {"start" : event[2], "left" : 0, "right" : 0, \
+                              "nb_hits" : 0, "longest_rally" : 0, \
+                              "i2c_errors" : event[3], \
+                              "reconnects" : event[4]}
+                self.point_nb = 0
+                self.rally = 0
+                self.point_start = event[2]
+            elif kind == END and self.match_id is not None:
+                self.close_match(db, event)
+        db.executemany(INSERT_POINT, points)
+        db.executemany(INSERT_HIT, hits)
+
+    def close_match(self, db, end = None):
+        """
+        Updates the match row : won (END event) or abandoned.
+        """
+        match = self.match
+        values = [None, match["left"], match["right"], None, \
+                  match["nb_hits"], match["longest_rally"], None, None, \
+                  None, None, self.match_id]
+        if end is not None:
+            values[0] = end[1] - match["start"]
+            values[3] = "left" if match["left"] > match["right"] \
+                        else "right"
+            values[6] = end[2] - match["i2c_errors"]
+            values[7] = end[3] - match["reconnects"]
+            values[8:10] = end[4:6]
+        db.execute(UPDATE_MATCH, values)
+        self.match_id = None
+
+"""
+Leaderboards : name -> (title, query, columns). Won matches only.
+"""
+LEADERBOARDS = { \
+    "rally" : ("Longest rallies", "SELECT id, start_time, longest_rally, " \
+               "l_score, r_score FROM matches WHERE winner IS NOT NULL " \
+               "ORDER BY longest_rally DESC, id LIMIT ?", \
+               ("match", "date", "hits", "left", "right")), \
+    "fastest" : ("Fastest wins", "SELECT id, start_time, duration, " \
+                 "l_score, r_score FROM matches WHERE winner IS NOT NULL " \
+                 "ORDER BY duration, id LIMIT ?", \
+                 ("match", "date", "duration", "left", "right")), \
+    "margin" : ("Biggest margins", "SELECT id, start_time, " \
+                "ABS(l_score - r_score) AS margin, l_score, r_score " \
+                "FROM matches WHERE winner IS NOT NULL " \
+                "ORDER BY margin DESC, id LIMIT ?", \
+                ("match", "date", "margin", "left", "right")), \
+    "hits" : ("Most paddle hits", "SELECT id, start_time, nb_hits, " \
+              "l_score, r_score FROM matches WHERE winner IS NOT NULL " \
+              "ORDER BY nb_hits DESC, id LIMIT ?", \
+              ("match", "date", "hits", "left", "right"))}
+
+class Stats_db():
+    """
+    Read only queries on the statistics database (other process than
+    the game : WAL readers do not block its writer).
+    """
+    def __init__(self, path = DEFAULT_PATH):
+        self.db = sqlite3.connect("file:%s?mode=ro" % path, uri = True)
+
+    def summary(self):
+        """
+        Returns the totals of all matches (dict).
+        """
+        row = self.db.execute("SELECT COUNT(*), COUNT(winner), " \
+              "SUM(winner = 'left'), SUM(winner = 'right'), " \
+              "AVG(duration), SUM(nb_hits), SUM(i2c_errors), " \
+              "SUM(reconnects) FROM matches").fetchone()
+        rally = self.db.execute("SELECT AVG(rally), MAX(rally) " \
+                                "FROM points").fetchone()
+        keys = ("matches", "won", "left_wins", "right_wins", \
+                "duration_mean", "hits", "i2c_errors", "reconnects")
+        result = dict(zip(keys, row))
+        result["rally_mean"], result["rally_max"] = rally
+        return result
+
+    def leaderboard(self, name, limit = 10):
+        """
+        Returns the rows of a leaderboard (LEADERBOARDS).
+        """
+        return self.db.execute(LEADERBOARDS[name][1], (limit,)).fetchall()
+
+    def recent(self, limit = 10):
+        """
+        Returns the last matches : id, date, duration, scores, winner.
+        """
+        return self.db.execute("SELECT id, start_time, duration, " \
+               "l_score, r_score, winner FROM matches " \
+               "ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+
+    def hit_positions(self, nb_bins = 5):
+        """
+        Returns the number of hits per paddle zone (top to bottom) and
+        side : {side : [count per zone]}.
+        """
+        result = {"left" : [0] * nb_bins, "right" : [0] * nb_bins}
+        for side, zone, count in self.db.execute("SELECT side, " \
+            "MIN(CAST((position + 1) / 2 * ? AS INTEGER), ? - 1) AS zone, " \
+            "COUNT(*) FROM hits GROUP BY side, zone", (nb_bins, nb_bins)):
+            if side in result and 0 <= zone < nb_bins:
+                result[side][zone] = count
+        return result
+
+    def close(self):
+        self.db.close()
+
+def stall_test(nb_matches, stall):
+    """
+    Records nb_matches synthetic matches (11 points, 8 hits per point)
+    into a temporary database, each batch write delayed by stall
+    seconds (slow SD card). Returns the durations of the game side
+    calls (s) and the recorder.
+    """
+    path = os.path.join(tempfile.mkdtemp(), "stats.db")
+    recorder = Stats_recorder(path)
+    recorder.BATCH_PERIOD = 0.05
+    write = recorder.write
+
+    def stalled_write(db, events):
+        time.sleep(stall)
+        write(db, events)
+    recorder.write = stalled_write
+    recorder.start()
+
+    class Gyro():
+        offset = -1.25
+
+    class Game():
+        metrics = skt_met.Metrics()
+        l_gyro = r_gyro = Gyro()
+        clock = 0.0
+
+        def now(self):
+            return self.clock
+    game = Game()
+    durations = []
+
+    def timed(call, *args):
+        start = time.perf_counter()
+        call(*args)
+        durations.append(time.perf_counter() - start)
+        time.sleep(0.0005) # Events spread as in a game
+    for match in range(nb_matches):
+        timed(recorder.match_start, game)
+        for point in range(11):
+            for hit in range(8):
+                timed(recorder.hit, ("left", "right")[hit % 2], \
+                      (hit % 5) / 2 - 1)
+            game.clock += 4
+            timed(recorder.goal, ("left", "right")[point % 2 == 0], \
+                  game.clock)
+        timed(recorder.match_end, game)
+    recorder.STOP_TIMEOUT = 60
+    recorder.stop()
+    return durations, recorder, path
+
+def format_row(row):
+    """
+    Row of a query for display (date / durations readable).
+    """
+    values = []
+    for i, value in enumerate(row):
+        if i == 1 and value is not None:
+            value = time.strftime("%Y-%m-%d %H:%M", time.localtime(value))
+        elif isinstance(value, float):
+            value = "%.1f" % value
+        values.append(str(value))
+    return "  ".join(values)
+
+def main():
+    """
+    Prints the match statistics : summary, leaderboards, last matches.
+    """
+    parser = argparse.ArgumentParser(description = "Skatepong match " \
+             "statistics (STATS_DB in game.py).")
+    parser.add_argument("--db", default = DEFAULT_PATH)
+    parser.add_argument("--leaderboard", choices = sorted(LEADERBOARDS))
+    parser.add_argument("--recent", action = "store_true", \
+                        help = "last matches")
+    parser.add_argument("--limit", type = int, default = 10)
+    parser.add_argument("--stall-test", type = float, metavar = "STALL", \
+                        help = "synthetic matches recorded with batch " \
+                        "writes delayed by STALL seconds : game side " \
+                        "call durations")
+    parser.add_argument("--matches", type = int, default = 50, \
+                        help = "stall test : matches recorded")
+    args = parser.parse_args()
+    skt_log.setup_logging()
+
+    if args.stall_test is not None:
+        durations, recorder, path = stall_test(args.matches, \
+                                               args.stall_test)
+        durations.sort()
+        print("Game side calls : %s, p50 %.1f us / p99 %.1f us / max " \
+              "%.1f us" % (len(durations), \
+              1e6 * statistics.median(durations), \
+              1e6 * durations[int(0.99 * (len(durations) - 1))], \
+              1e6 * durations[-1]))
+        print("Events written", recorder.nb_written, "/ dropped", \
+              recorder.nb_dropped, "/ batches lost", recorder.nb_errors)
+        stats_db = Stats_db(path)
+        print("Matches won in database :", stats_db.summary()["won"])
+        stats_db.close()
+        return
+
+    try:
+        stats_db = Stats_db(args.db)
+    except sqlite3.Error as err:
+        parser.error("%s : %s" % (args.db, err))
+    if args.leaderboard is not None:
+        title, query, columns = LEADERBOARDS[args.leaderboard]
+        print(title)
+        print("  ".join(columns))
+        for row in stats_db.leaderboard(args.leaderboard, args.limit):
+            print(format_row(row))
+    elif args.recent:
+        print("match  date  duration  left  right  winner")
+        for row in stats_db.recent(args.limit):
+            print(format_row(row))
+    else:
+        for key, value in stats_db.summary().items():
+            print(key, ":", "%.1f" % value if isinstance(value, float) \
+                  else value)
+        for side, counts in stats_db.hit_positions().items():
+            print("hits per zone (top to bottom),", side, ":", counts)
+    stats_db.close()
+
+if __name__ == '__main__':
+    main()
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
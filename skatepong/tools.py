@@ -9,11 +9,14 @@ Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
 #-----------------------------------------------------------------------
 
 import pygame
+import skatepong.log as skt_log
 
 #-----------------------------------------------------------------------
 # CODE
 #-----------------------------------------------------------------------
 
+logger = skt_log.get_logger("tools")
+
 def draw_text(win, font_nm, font_sz, txt, x, y, color, bg_color = None):
     """
     Draws text on a surface, text center serving as position reference.
@@ -41,15 +44,23 @@ def get_max_w_txt(font_nm, font_sz, *txts):
             max_w_txt = txt_w
     return max_w_txt
 
-def draw_mid_line(win, win_w, win_h, thick, horiz_w_factor, color):
+def comp_mid_line_rects(win_w, win_h, thick, horiz_w_factor):
     """
-    Draws vertical and short horizontals line in the mid screen.
+    Returns the rects of the short horizontal and vertical mid lines.
     """
     # Straight line, with small center cross
     vert_rect = pygame.Rect(0, 0, thick, win_h)
     horiz_rect = pygame.Rect(0, 0, horiz_w_factor * thick, thick)
     vert_rect.center = (win_w // 2, win_h //2)
     horiz_rect.center = (win_w // 2, win_h //2)
+    return horiz_rect, vert_rect
+
+def draw_mid_line(win, win_w, win_h, thick, horiz_w_factor, color):
+    """
+    Draws vertical and short horizontals line in the mid screen.
+    """
+    horiz_rect, vert_rect = comp_mid_line_rects(win_w, win_h, thick, \
+                                                horiz_w_factor)
     mid_line_h_rect = pygame.draw.rect(win, color, horiz_rect)
     mid_line_v_rect = pygame.draw.rect(win, color, vert_rect)
     return mid_line_h_rect, mid_line_v_rect
@@ -101,7 +112,7 @@ def get_cpu_revision():
         f.close()
     except:
         cpu_rev = "not found"
-    print ("cpu revision:", cpu_rev)
+    logger.info("cpu revision: %s", cpu_rev)
     return (cpu_rev)
 
 def is_rpi_4b(cpu_rev):
@@ -125,13 +136,14 @@ def is_rpi_4b(cpu_rev):
         if cpu_rev == rev:
             rpi_4b = True
             break
-    print ("Raspberry Pi 4 :", rpi_4b)
+    logger.info("Raspberry Pi 4 : %s", rpi_4b)
     return rpi_4b
 
 def main():
     """
     Function for test purposes only.
     """
+    skt_log.setup_logging()
     cpu_rev = get_cpu_revision()
     is_rpi_4b(cpu_rev)
     is_rpi_4b("a020d3")
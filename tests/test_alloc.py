@@ -0,0 +1,44 @@
+#!usr/bin/python3
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""
+
+#-----------------------------------------------------------------------
+# IMPORTS
+#-----------------------------------------------------------------------
+
+import unittest
+import skatepong.bench as skt_bch
+
+#-----------------------------------------------------------------------
+# CODE
+#-----------------------------------------------------------------------
+
+class Test_alloc(unittest.TestCase):
+    """
+    Game frames (ball in play, full quality) allocations within budget,
+    measured with tracemalloc after warm-up frames (headless game).
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.report = skt_bch.alloc_report()
+
+    def test_median(self):
+        self.assertLessEqual(self.report["peak_p50_b"], \
+                             skt_bch.ALLOC_BUDGET_B)
+
+    def test_peak(self):
+        self.assertLessEqual(self.report["peak_max_b"], \
+                             skt_bch.ALLOC_PEAK_BUDGET_B)
+
+    def test_growth(self):
+        self.assertLessEqual(self.report["growth_b"], \
+                             skt_bch.ALLOC_GROWTH_BUDGET_B)
+
+if __name__ == '__main__':
+    unittest.main()
+
+"""
+Copyright © 2023 Quentin BENETHUILLERE. All rights reserved.
+"""